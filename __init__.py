@@ -1,21 +1,24 @@
 import sys
+import time
 import aqt
 from aqt import mw, gui_hooks
 from aqt.qt import *
 
 from .panel import CustomTitleBar, OpenEvidencePanel, OnboardingWidget
-from .utils import clean_html_text
-from .reviewer_highlight import setup_highlight_hooks
-from .analytics import init_analytics, try_send_daily_analytics, track_add_to_chat, track_ask_question, track_anki_open
-
-from .analytics import init_analytics, try_send_daily_analytics, track_add_to_chat, track_ask_question, track_anki_open
+from .bridge import get_panel_bridge
+from .card_context import set_current_card
+from .pycmd_router import register_pycmd, on_webview_did_receive_js_message
+from .tutorial import tutorial_event, tutorial_target_rect
+from .reviewer_highlight import setup_highlight_hooks, on_reviewer_paint_pycmd
+from .analytics import init_analytics, try_send_daily_analytics, stop_analytics_uploads, track_add_to_chat, track_ask_question, track_anki_open, track_panel_opened
+from .preload_policy import get_preload_tracker
+from .action_queue import ADD_CONTEXT, ASK_QUERY
+from .analytics_store import setup_analytics_store_hooks
+from .config_store import get_config, get_config_store, setup_config_store_hooks
 from .utils import ADDON_NAME
 
 # Global references
 dock_widget = None
-current_card_question = ""
-current_card_answer = ""
-is_showing_answer = False
 
 # Platform detection
 IS_MAC = sys.platform == "darwin"
@@ -27,7 +30,7 @@ def ensure_platform_defaults():
     On Mac: Meta (⌘) + F/R
     On Windows/Linux: Control + F/R
     """
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
+    config = get_config()
     
     # Check if quick_actions needs platform-specific defaults
     quick_actions = config.get("quick_actions", {})
@@ -48,16 +51,16 @@ def ensure_platform_defaults():
     
     if needs_update:
         if IS_MAC:
-            config["quick_actions"] = {
+            quick_actions = {
                 "add_to_chat": {"keys": ["Meta", "F"]},
                 "ask_question": {"keys": ["Meta", "R"]}
             }
         else:
-            config["quick_actions"] = {
+            quick_actions = {
                 "add_to_chat": {"keys": ["Control", "F"]},
                 "ask_question": {"keys": ["Control", "R"]}
             }
-        mw.addonManager.writeConfig(ADDON_NAME, config)
+        get_config_store().update(quick_actions=quick_actions)
         print(f"OpenEvidence: Set platform-appropriate quick action defaults for {'Mac' if IS_MAC else 'Windows/Linux'}")
 
 
@@ -66,14 +69,16 @@ def create_dock_widget():
     global dock_widget
 
     if dock_widget is None:
+        build_started = time.perf_counter()
+
         # Create the dock widget
         dock_widget = QDockWidget("AI Side Panel", mw)
         dock_widget.setObjectName("AIPanelDock")
 
         # Check if onboarding is complete
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        onboarding_complete = config.get("onboarding_completed", False)
-        tutorial_complete = config.get("tutorial_completed", False)
+        config = get_config()
+        onboarding_complete = config.onboarding_completed
+        tutorial_complete = config.tutorial_completed
 
         # Create the appropriate widget
         if onboarding_complete:
@@ -95,7 +100,7 @@ def create_dock_widget():
         dock_widget.setTitleBarWidget(custom_title)
 
         # Get config for width
-        panel_width = config.get("width", 500)
+        panel_width = config.width
 
         # Set initial size
         dock_widget.setMinimumWidth(300)
@@ -110,12 +115,21 @@ def create_dock_widget():
         # Store reference to prevent garbage collection
         mw.openevidence_dock = dock_widget
 
+        get_preload_tracker().record_build((time.perf_counter() - build_started) * 1000)
+
     return dock_widget
 
 
+def note_panel_opened(requested_at):
+    """Record the panel being shown (for preload policy and usage history)"""
+    track_panel_opened()
+    get_preload_tracker().panel_opened(requested_at)
+
+
 def toggle_panel():
     """Toggle the OpenEvidence dock widget visibility"""
     global dock_widget
+    requested_at = time.perf_counter()
 
     if dock_widget is None:
         create_dock_widget()
@@ -125,7 +139,6 @@ def toggle_panel():
 
         # Notify tutorial that panel was closed
         try:
-            from .tutorial import tutorial_event
             tutorial_event("panel_closed")
         except:
             pass
@@ -137,139 +150,56 @@ def toggle_panel():
 
         dock_widget.show()
         dock_widget.raise_()
+        note_panel_opened(requested_at)
 
         # Notify tutorial that panel was opened
         try:
-            from .tutorial import tutorial_event
             tutorial_event("panel_opened")
         except:
             pass
 
     # Notify tutorial that panel was toggled (fires on both open and close)
     try:
-        from .tutorial import tutorial_event
         tutorial_event("panel_toggled")
     except:
         pass
 
 
-def on_webview_did_receive_js_message(handled, message, context):
-    """Handle pycmd messages from toolbar and highlight bubble"""
-    if message == "openevidence":
-        toggle_panel()
-        return (True, None)
-
-    # Handle tutorial event messages
-    if message.startswith("tutorial:"):
-        event_name = message.replace("tutorial:", "", 1)
-        try:
-            from .tutorial import tutorial_event
-            tutorial_event(event_name)
-        except:
-            pass
-        return (True, None)
-
-    # Handle tutorial events from highlight bubble
-    if message.startswith("openevidence:tutorial_event:"):
-        event_name = message.replace("openevidence:tutorial_event:", "", 1)
-        try:
-            from .tutorial import tutorial_event
-            tutorial_event(event_name)
-        except:
-            pass
-        return (True, None)
-
-    # Handle highlight bubble messages
-    if message.startswith("openevidence:add_context:"):
-        # Extract the selected text
-        selected_text = message.replace("openevidence:add_context:", "", 1)
-        try:
-            from urllib.parse import unquote
-            selected_text = unquote(selected_text)
-        except:
-            pass
-        handle_add_context(selected_text)
-
-        # Notify tutorial that text was highlighted
-        try:
-            from .tutorial import tutorial_event
-            tutorial_event("text_highlighted")
-        except:
-            pass
+def on_tutorial_event_pycmd(payload):
+    """Tutorial progress from the highlight bubble"""
+    get_panel_bridge().tutorialEvent(str(payload.get("event", "")))
 
-        return (True, None)
 
-    if message.startswith("openevidence:ask_query:"):
-        # Extract query and context
-        data = message.replace("openevidence:ask_query:", "", 1)
-        try:
-            from urllib.parse import unquote
-            parts = data.split("|", 1)
-            if len(parts) == 2:
-                query = unquote(parts[0])
-                context = unquote(parts[1])
-                handle_ask_query(query, context)
-                
-                # Notify tutorial that a question was submitted
-                try:
-                    from .tutorial import tutorial_event
-                    tutorial_event("ask_question_submitted")
-                except:
-                    pass
-        except:
-            pass
-        return (True, None)
+def on_tutorial_rect_pycmd(payload):
+    """Tutorial target rect pushed by the toolbar page"""
+    tutorial_target_rect(str(payload.get("target", "")), payload.get("rect"))
 
-    return handled
 
+def on_add_context_pycmd(payload):
+    """'Add to Chat' from the highlight bubble"""
+    get_panel_bridge().addContext(str(payload.get("text", "")))
 
-def store_current_card_text(card):
-    """Store the current card text globally for keybinding access from OpenEvidence panel"""
-    global current_card_question, current_card_answer, is_showing_answer, dock_widget
 
-    try:
-        # Always get both question and answer
-        question_html = card.question()
-        answer_html = card.answer()
-
-        # Clean the question
-        current_card_question = clean_html_text(question_html)
-        
-        # For answer, we need to extract just the back content
-        # In Anki, answer_html includes the question, so we need to get only the back part
-        full_answer_text = clean_html_text(answer_html)
-        
-        # Remove the question portion from the answer to get just the back
-        # This handles cases where the answer includes the question
-        if current_card_question and current_card_question in full_answer_text:
-            # Find where the question ends in the answer and take everything after
-            question_end = full_answer_text.find(current_card_question) + len(current_card_question)
-            current_card_answer = full_answer_text[question_end:].strip()
-        else:
-            # If we can't find the question in the answer, just use the full answer
-            current_card_answer = full_answer_text
+def on_ask_query_pycmd(payload):
+    """'Ask Question' from the highlight bubble"""
+    get_panel_bridge().askQuery(str(payload.get("query", "")), str(payload.get("context", "")))
 
-        # Check which side is showing
-        if mw.reviewer and mw.reviewer.state == "answer":
-            is_showing_answer = True
-        else:
-            is_showing_answer = False
 
-        # Update the JavaScript context with new card texts (using templates)
-        if dock_widget and dock_widget.widget():
-            panel = dock_widget.widget()
-            if hasattr(panel, 'update_card_text_in_js'):
-                panel.update_card_text_in_js()
+def store_current_card_text(card, side=None):
+    """Record the shown card so the panel can request template text on demand"""
+    # Check which side is showing
+    if side is None:
+        side = "answer" if mw.reviewer and mw.reviewer.state == "answer" else "question"
 
-    except:
-        current_card_question = ""
-        current_card_answer = ""
-        is_showing_answer = False
+    # Nothing is rendered or sent to the panel here - the page asks for the
+    # text when a template shortcut fires
+    set_current_card(card, side)
 
 
 def handle_add_context(selected_text):
     """Handle 'Add to Chat' action - populate AI Panel search with selected text"""
     global dock_widget
+    requested_at = time.perf_counter()
 
     # Track Add to Chat usage
     track_add_to_chat()
@@ -282,6 +212,7 @@ def handle_add_context(selected_text):
     if not dock_widget.isVisible():
         dock_widget.show()
         dock_widget.raise_()
+        note_panel_opened(requested_at)
 
     # Get the panel widget
     panel = dock_widget.widget()
@@ -290,59 +221,12 @@ def handle_add_context(selected_text):
         if hasattr(panel, 'show_web_view'):
             panel.show_web_view()
 
-        # Inject the text into the OpenEvidence search box
-        # Priority: 1) Follow-up input (if active conversation), 2) Main search input
-        js_code = """
-        (function() {
-            var newText = %s;
-            var searchInput = null;
-            
-            // First, check for follow-up input (indicates active conversation)
-            // Look for input with "follow-up" in placeholder
-            var followUpInput = document.querySelector('input[placeholder*="follow-up"], input[placeholder*="Follow-up"], textarea[placeholder*="follow-up"]');
-            
-            if (followUpInput) {
-                // Active conversation - use follow-up input
-                searchInput = followUpInput;
-                console.log('Anki: Found follow-up input, using that');
-            } else {
-                // No active conversation - use main search input
-                searchInput = document.querySelector('input[placeholder*="medical"], input[placeholder*="question"], textarea, input[type="text"]');
-                console.log('Anki: No follow-up input, using main search');
-            }
-            
-            if (searchInput) {
-                var existingText = searchInput.value.trim();
-
-                // Append to existing text if present, otherwise just set new text
-                var finalText = existingText ? existingText + ' ' + newText : newText;
-
-                // Use native setter for React compatibility
-                var nativeSetter = Object.getOwnPropertyDescriptor(
-                    searchInput.tagName === 'TEXTAREA' ? window.HTMLTextAreaElement.prototype : window.HTMLInputElement.prototype,
-                    'value'
-                ).set;
-                nativeSetter.call(searchInput, finalText);
-
-                // Dispatch events
-                searchInput.dispatchEvent(new InputEvent('input', { bubbles: true, cancelable: true, inputType: 'insertText', data: finalText }));
-                searchInput.dispatchEvent(new Event('change', { bubbles: true }));
-
-                // Focus the input
-                searchInput.focus();
-
-                console.log('Anki: Added context to search box');
-            } else {
-                console.log('Anki: Could not find search input');
-            }
-        })();
-        """ % repr(selected_text)
-
-        panel.web.page().runJavaScript(js_code)
+        # Page API picks the follow-up input (active conversation) or the main
+        # search; queued until the page is ready
+        panel.queue_action(ADD_CONTEXT, selected_text)
 
         # Notify tutorial that add to chat was used
         try:
-            from .tutorial import tutorial_event
             tutorial_event("add_to_chat")
         except:
             pass
@@ -351,6 +235,7 @@ def handle_add_context(selected_text):
 def handle_ask_query(query, context):
     """Handle 'Ask Question' action - format and auto-submit to AI Panel"""
     global dock_widget
+    requested_at = time.perf_counter()
 
     # Track Ask Question usage
     track_ask_question()
@@ -363,6 +248,7 @@ def handle_ask_query(query, context):
     if not dock_widget.isVisible():
         dock_widget.show()
         dock_widget.raise_()
+        note_panel_opened(requested_at)
 
     # Get the panel widget
     panel = dock_widget.widget()
@@ -374,60 +260,9 @@ def handle_ask_query(query, context):
         # Format the message with query and context
         formatted_message = f"{query}\n\nContext:\n{context}"
 
-        # Inject the formatted message and trigger submit
-        js_code = """
-        (function() {
-            var searchInput = document.querySelector('input[placeholder*="medical"], input[placeholder*="question"], textarea, input[type="text"]');
-            if (searchInput) {
-                var text = %s;
-
-                // Use native setter for React compatibility
-                var nativeSetter = Object.getOwnPropertyDescriptor(
-                    searchInput.tagName === 'TEXTAREA' ? window.HTMLTextAreaElement.prototype : window.HTMLInputElement.prototype,
-                    'value'
-                ).set;
-                nativeSetter.call(searchInput, text);
-
-                // Dispatch events
-                searchInput.dispatchEvent(new InputEvent('input', { bubbles: true, cancelable: true, inputType: 'insertText', data: text }));
-                searchInput.dispatchEvent(new Event('change', { bubbles: true }));
-
-                // Focus the input
-                searchInput.focus();
-
-                // Try to find and click the submit button after a short delay
-                setTimeout(function() {
-                    // Look for common submit button patterns
-                    var submitButton = document.querySelector('button[type="submit"]') ||
-                                     document.querySelector('button:has(svg)') ||
-                                     searchInput.closest('form')?.querySelector('button');
-
-                    if (submitButton) {
-                        submitButton.click();
-                        console.log('Anki: Auto-submitted query');
-                    } else {
-                        // Try simulating Enter key press
-                        var enterEvent = new KeyboardEvent('keydown', {
-                            key: 'Enter',
-                            code: 'Enter',
-                            keyCode: 13,
-                            which: 13,
-                            bubbles: true,
-                            cancelable: true
-                        });
-                        searchInput.dispatchEvent(enterEvent);
-                        console.log('Anki: Simulated Enter key');
-                    }
-                }, 100);
-
-                console.log('Anki: Added query with context to search box');
-            } else {
-                console.log('Anki: Could not find search input');
-            }
-        })();
-        """ % repr(formatted_message)
-
-        panel.web.page().runJavaScript(js_code)
+        # Fill the search box and submit through the page API (queued until
+        # the page is ready)
+        panel.queue_action(ASK_QUERY, formatted_message)
 
 
 def add_toolbar_button(links, toolbar):
@@ -484,10 +319,14 @@ def preload_panel():
     except Exception as e:
         print(f"{ADDON_NAME}: Error starting periodic check: {e}")
 
-    # Wait 500ms after Anki finishes initializing to start preloading
+    # Eager: wait 500ms after Anki finishes initializing to start preloading
     # This ensures Anki's UI is responsive while OpenEvidence loads in background
-    from aqt.qt import QTimer
-    QTimer.singleShot(500, create_dock_widget)
+    # Lazy: the dock is built on first open instead
+    strategy = get_preload_tracker().start(get_config().preload_mode)
+    print(f"{ADDON_NAME}: Panel preload strategy: {strategy} (mode: {get_config().preload_mode})")
+    if strategy == "eager":
+        from aqt.qt import QTimer
+        QTimer.singleShot(500, create_dock_widget)
 
 
 # Global timer for periodic analytics check
@@ -504,23 +343,42 @@ def start_periodic_analytics_check():
     _analytics_timer.start(3600000)
 
 
+def on_question_shown(card):
+    """Called when question is shown - store front text"""
+    store_current_card_text(card, "question")
+
+
 def on_answer_shown(card):
     """Called when answer is shown - store card text and notify tutorial"""
-    store_current_card_text(card)
+    store_current_card_text(card, "answer")
     # Notify tutorial that answer was shown
     try:
-        from .tutorial import tutorial_event
         tutorial_event("answer_shown")
     except:
         pass
 
 
 # Hook registration
+register_pycmd("", lambda payload: toggle_panel())
+register_pycmd("tutorial_event", on_tutorial_event_pycmd)
+register_pycmd("tutorial_rect", on_tutorial_rect_pycmd)
+register_pycmd("add_context", on_add_context_pycmd)
+register_pycmd("ask_query", on_ask_query_pycmd)
+register_pycmd("reviewer_paint", on_reviewer_paint_pycmd)
 gui_hooks.webview_did_receive_js_message.append(on_webview_did_receive_js_message)
+# Reviewer actions arriving through the bridge
+get_panel_bridge().add_context_requested.connect(handle_add_context)
+get_panel_bridge().ask_query_requested.connect(handle_ask_query)
 gui_hooks.top_toolbar_did_init_links.append(add_toolbar_button)
 # Use delayed preloading for better performance
 gui_hooks.main_window_did_init.append(preload_panel)
-gui_hooks.reviewer_did_show_question.append(store_current_card_text)
+gui_hooks.reviewer_did_show_question.append(on_question_shown)
 gui_hooks.reviewer_did_show_answer.append(on_answer_shown)
 # Set up highlight bubble hooks for reviewer
 setup_highlight_hooks()
+# Flush batched analytics on profile close / quit
+setup_analytics_store_hooks()
+# End the analytics upload worker with the profile
+gui_hooks.profile_will_close.append(stop_analytics_uploads)
+# Keep the cached config in sync with edits from Anki's config dialog
+setup_config_store_hooks()
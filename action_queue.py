@@ -0,0 +1,54 @@
+"""
+Action Queue - Ordered buffer for quick actions sent before the page is ready
+
+Add to Chat and Ask Question used to be sent to the page straight away; if it
+was still loading (or reloading after a discard) the page API couldn't find
+the search input and the action was lost. The panel now queues actions until
+the page reports ready and replays them in one ankiPanel.runActions() call.
+
+Consecutive add-context actions are merged into a single insertion, in the
+same way the page would have appended them to the input one by one.
+
+Only actions sent while the page is loading go through the queue, so the
+wait and depth metrics describe actions that were actually held.
+"""
+
+import time
+from typing import List, Tuple
+
+from . import diagnostics
+
+ADD_CONTEXT = "context"
+ASK_QUERY = "query"
+
+
+class ActionQueue:
+    """
+    FIFO of (kind, text) actions waiting for the page.
+    """
+
+    def __init__(self):
+        # [kind, text, queued_at]
+        self._actions: List[list] = []
+
+    def __len__(self):
+        return len(self._actions)
+
+    def push(self, kind: str, text: str):
+        """Queue an action, merging it into a preceding add-context action."""
+        if kind == ADD_CONTEXT and self._actions and self._actions[-1][0] == ADD_CONTEXT:
+            self._actions[-1][1] = f"{self._actions[-1][1]} {text}"
+            diagnostics.increment("action_queue_merged")
+        else:
+            self._actions.append([kind, text, time.perf_counter()])
+        diagnostics.set_value("action_queue_depth", len(self._actions))
+
+    def take(self) -> List[Tuple[str, str]]:
+        """Remove and return all queued actions as (kind, text) pairs, oldest first."""
+        actions, self._actions = self._actions, []
+        if actions:
+            waited_ms = (time.perf_counter() - actions[0][2]) * 1000
+            diagnostics.record_timing("action_queue_wait_ms", waited_ms)
+            diagnostics.record_sample("action_queue_depth_at_flush", len(actions))
+            diagnostics.set_value("action_queue_depth", 0)
+        return [(kind, text) for kind, text, _ in actions]
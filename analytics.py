@@ -1,37 +1,35 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from typing import Dict, Optional
 from aqt import mw
 import sys
-import json
-import threading
+import time
 import uuid
-from urllib import request, error
-
-
-from urllib import request, error
-from .utils import ADDON_NAME
+from .analytics_store import get_analytics_store
+from .analytics_uploader import get_analytics_uploader, UploadJob
+from .analytics_delta import UPLOAD_STATE_KEY, encode_payload, acknowledged_state, reset_state
+from .config_store import get_config
+from .engagement import get_engagement
 
 # Runtime state to track if we've recorded usage for this session
 _session_usage_tracked = False
-_current_session_index = -1  # Index of current session in today's daily_usage list
+_current_session_index = -1  # Index of current session among today's sessions
+_session_day = None  # Day of the current session (YYYY-MM-DD)
+_session_started_at = time.monotonic()  # Anki open, for panel_opened_s
 
 
 def get_analytics_data() -> Dict:
-    """Get current analytics data from config."""
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    return config.get("analytics", {})
+    """Get current analytics data (served from the in-memory store)."""
+    return get_analytics_store().data()
 
 
 def save_analytics_data(analytics: Dict):
-    """Save analytics data to config."""
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    config["analytics"] = analytics
-    mw.addonManager.writeConfig(ADDON_NAME, config)
+    """Replace all analytics data (snapshot rewritten in the next batched flush)."""
+    get_analytics_store().replace(analytics)
 
 
 def init_analytics():
     """Initialize analytics on first run. Returns True if this was a fresh install."""
-    global _current_session_index
+    global _current_session_index, _session_day
     analytics = get_analytics_data()
 
     if not analytics.get("first_install_date"):
@@ -76,8 +74,10 @@ def init_analytics():
             today: [{"time": current_time, "messages": 0}]
         }
         _current_session_index = 0
+        _session_day = today
 
         save_analytics_data(analytics)
+        get_engagement().reload()
         return True  # Fresh install
     
     return False  # Not a fresh install
@@ -95,23 +95,21 @@ def track_auth_button_click(button_type: str):
     Args:
         button_type: "signup" or "login"
     """
-    analytics = get_analytics_data()
+    store = get_analytics_store()
 
     # Only track the first click (whichever comes first)
-    if not analytics.get("auth_button_clicked"):
-        analytics["auth_button_clicked"] = button_type  # "signup" or "login"
-        analytics["auth_button_click_date"] = datetime.now().isoformat()
-        save_analytics_data(analytics)
+    if not store.get("auth_button_clicked"):
+        store.set("auth_button_clicked", button_type)  # "signup" or "login"
+        store.set("auth_button_click_date", datetime.now().isoformat())
 
 
 def track_login_detected():
     """Track when we detect user has logged in."""
-    analytics = get_analytics_data()
+    store = get_analytics_store()
 
-    if not analytics.get("has_logged_in"):
-        analytics["has_logged_in"] = True
-        analytics["first_login_date"] = datetime.now().isoformat()
-        save_analytics_data(analytics)
+    if not store.get("has_logged_in"):
+        store.set("has_logged_in", True)
+        store.set("first_login_date", datetime.now().isoformat())
 
 
 def is_user_logged_in() -> bool:
@@ -122,10 +120,9 @@ def is_user_logged_in() -> bool:
 
 def track_onboarding_completed():
     """Track when user completes onboarding."""
-    analytics = get_analytics_data()
-    if not analytics.get("onboarding_completed"):
-        analytics["onboarding_completed"] = True
-        save_analytics_data(analytics)
+    store = get_analytics_store()
+    if not store.get("onboarding_completed"):
+        store.set("onboarding_completed", True)
 
 
 def track_tutorial_status(status: str):
@@ -135,16 +132,15 @@ def track_tutorial_status(status: str):
     Args:
         status: "completed", "skip", or "skipped_midway"
     """
-    analytics = get_analytics_data()
+    store = get_analytics_store()
 
     # Only update if going from less complete to more complete state
     # null -> skip/skipped_midway/completed
     # skip/skipped_midway -> completed
-    current = analytics.get("tutorial_status")
+    current = store.get("tutorial_status")
 
     if current != "completed":  # Don't downgrade from completed
-        analytics["tutorial_status"] = status
-        save_analytics_data(analytics)
+        store.set("tutorial_status", status)
 
 
 def track_tutorial_step(current: int, total: int):
@@ -155,126 +151,86 @@ def track_tutorial_step(current: int, total: int):
         current: Current step number (e.g., 1)
         total: Total number of steps (e.g., 36)
     """
-    analytics = get_analytics_data()
-    analytics["tutorial_current_step"] = f"{current}/{total}"
-    save_analytics_data(analytics)
+    get_analytics_store().set("tutorial_current_step", f"{current}/{total}")
 
 
 def track_add_to_chat():
     """Track when user uses Add to Chat quick action (Meta+F)."""
-    analytics = get_analytics_data()
-    analytics["add_to_chat_count"] = analytics.get("add_to_chat_count", 0) + 1
-    save_analytics_data(analytics)
+    get_analytics_store().increment("add_to_chat_count")
 
 
 def track_ask_question():
     """Track when user uses Ask Question quick action (Meta+R)."""
-    analytics = get_analytics_data()
-    analytics["ask_question_count"] = analytics.get("ask_question_count", 0) + 1
-    save_analytics_data(analytics)
+    get_analytics_store().increment("ask_question_count")
 
 
 def track_template_used():
     """Track when user uses any template shortcut."""
-    analytics = get_analytics_data()
-    analytics["template_usage_count"] = analytics.get("template_usage_count", 0) + 1
-    save_analytics_data(analytics)
+    get_analytics_store().increment("template_usage_count")
 
 
 def track_template_added():
     """Track when user adds a new template."""
-    analytics = get_analytics_data()
-    analytics["templates_added"] = analytics.get("templates_added", 0) + 1
-    save_analytics_data(analytics)
+    get_analytics_store().increment("templates_added")
 
 
 def track_template_deleted():
     """Track when user deletes a template."""
-    analytics = get_analytics_data()
-    analytics["templates_deleted"] = analytics.get("templates_deleted", 0) + 1
-    save_analytics_data(analytics)
+    get_analytics_store().increment("templates_deleted")
 
 
 def track_message_sent():
     """Track when user sends a message in the chat (per-session)."""
     global _current_session_index
-    analytics = get_analytics_data()
+    store = get_analytics_store()
     today = datetime.now().strftime("%Y-%m-%d")
     
-    daily_usage = analytics.get("daily_usage", {})
-    todays_sessions = daily_usage.get(today, [])
-    
-    # Handle legacy/invalid formats
-    if isinstance(todays_sessions, dict) or isinstance(todays_sessions, int):
-        todays_sessions = []
+    session_count = store.sessions().session_count(today)
     
     # If session index is invalid, try to recover
-    if _current_session_index < 0 or _current_session_index >= len(todays_sessions):
-        if len(todays_sessions) > 0:
+    if _current_session_index < 0 or _current_session_index >= session_count:
+        if session_count > 0:
             # Use the last session for today
-            _current_session_index = len(todays_sessions) - 1
+            _current_session_index = session_count - 1
         else:
             # No sessions today - create one
             current_time = datetime.now().strftime("%H:%M:%S")
-            todays_sessions.append({"time": current_time, "messages": 0})
-            _current_session_index = 0
-            daily_usage[today] = todays_sessions
+            _current_session_index = store.start_session(today, current_time)
+            get_engagement().session_started(today)
     
     # Now update the message count
-    if _current_session_index >= 0 and _current_session_index < len(todays_sessions):
-        todays_sessions[_current_session_index]["messages"] = todays_sessions[_current_session_index].get("messages", 0) + 1
-        daily_usage[today] = todays_sessions
-        analytics["daily_usage"] = daily_usage
-        save_analytics_data(analytics)
-        print(f"AI Panel: Tracked message - session {_current_session_index}, total messages: {todays_sessions[_current_session_index]['messages']}")
+    messages = store.add_message(today, _current_session_index)
+    get_engagement().message_sent(today)
+    print(f"AI Panel: Tracked message - session {_current_session_index}, total messages: {messages}")
 
 
 def track_anki_open():
     """Create a new session for this Anki launch."""
-    global _current_session_index
-    analytics = get_analytics_data()
+    global _current_session_index, _session_day
     
     # Track new session for today
     today = datetime.now().strftime("%Y-%m-%d")
     current_time = datetime.now().strftime("%H:%M:%S")
     
-    daily_usage = analytics.get("daily_usage", {})
-    
-    # Get or initialize today's session list
-    todays_sessions = daily_usage.get(today, [])
-    # Migration: If it's the old dict format, convert/reset it
-    if isinstance(todays_sessions, dict) or isinstance(todays_sessions, int):
-        todays_sessions = []
-        
     # Start new session (messages only - granular actions tracked separately)
-    new_session = {"time": current_time, "messages": 0}
-    todays_sessions.append(new_session)
-    
-    daily_usage[today] = todays_sessions
-    analytics["daily_usage"] = daily_usage
-    
+    # Legacy dict/int formats for today are reset by the store
     # Update global index to point to this new session
-    global _current_session_index
-    _current_session_index = len(todays_sessions) - 1
-    
-    save_analytics_data(analytics)
+    _current_session_index = get_analytics_store().start_session(today, current_time)
+    _session_day = today
+    get_engagement().session_started(today)
 
 
-def cleanup_old_daily_data(analytics: Dict):
-    """Keep only last 90 days of daily usage data."""
-    if "daily_usage" not in analytics:
+def track_panel_opened():
+    """Record how long into this Anki session the panel was first opened."""
+    if _session_day is None or _current_session_index < 0:
         return
+    seconds = int(time.monotonic() - _session_started_at)
+    get_analytics_store().mark_panel_opened(_session_day, _current_session_index, seconds)
 
-    cutoff_date = datetime.now() - timedelta(days=90)
-    cutoff_str = cutoff_date.strftime("%Y-%m-%d")
 
-    # Filter out dates older than 90 days
-    daily_usage = analytics["daily_usage"]
-    analytics["daily_usage"] = {
-        date: count
-        for date, count in daily_usage.items()
-        if date >= cutoff_str
-    }
+def get_current_session():
+    """(day, index) of this launch's session in the session log, or (None, -1)."""
+    return _session_day, _current_session_index
 
 
 def get_locale_info() -> Dict:
@@ -314,91 +270,112 @@ def should_send_analytics() -> bool:
         return True
 
 
+def build_payload(analytics: Dict, preload_mode: str) -> Dict:
+    """Upload payload from an analytics snapshot."""
+    # Note: Server calculates engagement metrics from daily_usage
+    # (total_sessions, sessions_with_messages, etc.)
+    return {
+        # Core metadata
+        "user_id": analytics.get("user_id"),
+        "first_install_date": analytics.get("first_install_date"),
+        "platform": analytics.get("platform"),
+        "locale": analytics.get("locale"),
+        "timezone": analytics.get("timezone"),
+        # Auth
+        "has_logged_in": analytics.get("has_logged_in", False),
+        "auth_button_clicked": analytics.get("auth_button_clicked"),
+        # Onboarding & Tutorial
+        "onboarding_completed": analytics.get("onboarding_completed", False),
+        "tutorial_status": analytics.get("tutorial_status"),
+        "tutorial_current_step": analytics.get("tutorial_current_step"),
+        # Granular usage tracking (non-redundant)
+        "add_to_chat_count": analytics.get("add_to_chat_count", 0),
+        "ask_question_count": analytics.get("ask_question_count", 0),
+        "template_usage_count": analytics.get("template_usage_count", 0),
+        "templates_added": analytics.get("templates_added", 0),
+        "templates_deleted": analytics.get("templates_deleted", 0),
+        # Referral tracking
+        "has_shown_referral": analytics.get("has_shown_referral", False),
+        "referral_modal_status": analytics.get("referral_modal_status"),
+        "referral_modal_seconds_open": analytics.get("referral_modal_seconds_open"),
+        # Review tracking
+        "has_shown_review": analytics.get("has_shown_review", False),
+        "review_modal_status": analytics.get("review_modal_status"),
+        "review_modal_seconds_open": analytics.get("review_modal_seconds_open"),
+        # Panel load performance (loadStarted -> page ready, last sample)
+        "panel_ready_cold_ms": analytics.get("panel_ready_cold_ms"),
+        "panel_ready_warm_ms": analytics.get("panel_ready_warm_ms"),
+        # Preload policy outcomes per mode (see preload_policy)
+        "preload_mode": preload_mode,
+        "preload_metrics": analytics.get("preload_metrics", {}),
+        # Session-based engagement (server calculates totals)
+        "daily_usage": analytics.get("daily_usage", {}),
+    }
+
+
 def send_analytics_background():
-    """Send analytics to Supabase in background thread (non-blocking)."""
-    def _send():
-        try:
-            # Get config for endpoint URL
-            config = mw.addonManager.getConfig(ADDON_NAME) or {}
-            endpoint_url = config.get("analytics_endpoint")
-
-            # Skip if no endpoint configured
-            if not endpoint_url:
-                return
-
-            # Get analytics data
-            analytics = get_analytics_data()
-
-            # Ensure user_id exists (migration for existing users)
-            if not analytics.get("user_id"):
-                analytics["user_id"] = str(uuid.uuid4())
-                save_analytics_data(analytics)
-
-            # Note: Server calculates engagement metrics from daily_usage
-            # (total_sessions, sessions_with_messages, etc.)
-            payload = {
-                # Core metadata
-                "user_id": analytics.get("user_id"),
-                "first_install_date": analytics.get("first_install_date"),
-                "platform": analytics.get("platform"),
-                "locale": analytics.get("locale"),
-                "timezone": analytics.get("timezone"),
-                # Auth
-                "has_logged_in": analytics.get("has_logged_in", False),
-                "auth_button_clicked": analytics.get("auth_button_clicked"),
-                # Onboarding & Tutorial
-                "onboarding_completed": analytics.get("onboarding_completed", False),
-                "tutorial_status": analytics.get("tutorial_status"),
-                "tutorial_current_step": analytics.get("tutorial_current_step"),
-                # Granular usage tracking (non-redundant)
-                "add_to_chat_count": analytics.get("add_to_chat_count", 0),
-                "ask_question_count": analytics.get("ask_question_count", 0),
-                "template_usage_count": analytics.get("template_usage_count", 0),
-                "templates_added": analytics.get("templates_added", 0),
-                "templates_deleted": analytics.get("templates_deleted", 0),
-                # Referral tracking
-                "has_shown_referral": analytics.get("has_shown_referral", False),
-                "referral_modal_status": analytics.get("referral_modal_status"),
-                "referral_modal_seconds_open": analytics.get("referral_modal_seconds_open"),
-                # Review tracking
-                "has_shown_review": analytics.get("has_shown_review", False),
-                "review_modal_status": analytics.get("review_modal_status"),
-                "review_modal_seconds_open": analytics.get("review_modal_seconds_open"),
-                # Session-based engagement (server calculates totals)
-                "daily_usage": analytics.get("daily_usage", {}),
-            }
-
-            # Obfuscated API key (decode at runtime)
-            import base64
-            _k = 'YWlfcGFuZWxfYW5hbHl0aWNzX3NlY3VyZV9rZXlfMjAyNl9wcm9kX3Yx'
-            decoded_key = base64.b64decode(_k).decode()
-
-            # Send POST request with API key
-            req = request.Request(
-                endpoint_url,
-                data=json.dumps(payload).encode('utf-8'),
-                method='POST'
-            )
-
-            # Add headers explicitly (urllib can be finicky with custom headers)
-            req.add_header('Content-Type', 'application/json')
-            req.add_header('User-Agent', 'AI-Panel-Anki-Addon/1.0')
-            req.add_header('Authorization', f'Bearer {decoded_key}')
-
-            # Send with 10 second timeout
-            with request.urlopen(req, timeout=10) as response:
-                if response.status == 200:
-                    # Update last sent timestamp
-                    analytics["last_analytics_sent"] = datetime.now().isoformat()
-                    save_analytics_data(analytics)
-
-        except (error.URLError, error.HTTPError, Exception):
-            # Silently fail on any error
-            pass
-
-    # Run in background thread
-    thread = threading.Thread(target=_send, daemon=True)
-    thread.start()
+    """Queue an analytics upload on the background worker (non-blocking)."""
+    # Get config for endpoint URL (snapshots are immutable, safe to read anywhere)
+    config = get_config()
+    endpoint_url = config.analytics_endpoint
+    # Skip if no endpoint configured
+    if not endpoint_url:
+        return
+
+    # Ensure user_id exists (migration for existing users)
+    store = get_analytics_store()
+    if not store.get("user_id"):
+        store.set("user_id", str(uuid.uuid4()))
+
+    # Snapshot on the main thread - the store is not thread-safe
+    analytics = store.snapshot()
+    payload = build_payload(analytics, config.preload_mode)
+    upload_state = analytics.get(UPLOAD_STATE_KEY)
+
+    # Only what changed since the server's last cursor (full without one)
+    body = encode_payload(payload, upload_state)
+
+    def _mark_sent(response):
+        store = get_analytics_store()
+        store.set(UPLOAD_STATE_KEY, acknowledged_state(payload, response, store.get(UPLOAD_STATE_KEY)))
+        store.set("last_analytics_sent", datetime.now().isoformat())
+
+    def _resend_full():
+        # Server no longer knows our cursor - forget it and send everything
+        store = get_analytics_store()
+        store.set(UPLOAD_STATE_KEY, reset_state(store.get(UPLOAD_STATE_KEY)))
+        send_analytics_background()
+
+    # Obfuscated API key (decode at runtime)
+    import base64
+    _k = 'YWlfcGFuZWxfYW5hbHl0aWNzX3NlY3VyZV9rZXlfMjAyNl9wcm9kX3Yx'
+    decoded_key = base64.b64decode(_k).decode()
+
+    headers = {
+        'User-Agent': 'AI-Panel-Anki-Addon/1.0',
+        'Authorization': f'Bearer {decoded_key}',
+    }
+
+    # Only a delta can be answered with 409 for an unknown cursor; a 409 to a
+    # full upload is a permanent failure, not a reason to resend
+    on_conflict = None
+    if body.get("base_cursor"):
+        on_conflict = lambda: mw.taskman.run_on_main(_resend_full)
+
+    # The worker retries with backoff; the store is only touched on the main thread
+    get_analytics_uploader().submit(UploadJob(
+        endpoint_url,
+        body,
+        headers=headers,
+        on_sent=lambda response: mw.taskman.run_on_main(lambda: _mark_sent(response)),
+        on_conflict=on_conflict,
+        compress=bool((upload_state or {}).get("gzip")),
+    ))
+
+
+def stop_analytics_uploads():
+    """Stop the upload worker when the profile closes (profile_will_close hook)."""
+    get_analytics_uploader().stop()
 
 
 def try_send_daily_analytics():
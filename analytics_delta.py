@@ -0,0 +1,105 @@
+"""
+Analytics Delta - Cursor-based delta encoding of the analytics payload
+
+The daily upload used to repeat the whole 90-day daily_usage map and every
+counter. Once the server has acknowledged an upload with a cursor, the next
+upload only carries what changed since then:
+
+    {"format": "delta", "user_id": ..., "base_cursor": "<cursor>",
+     "fields": {changed top-level fields other than user_id},
+     "daily_usage": {changed days: full session list},
+     "removed_days": [days no longer kept]}
+
+user_id stays at the top level, as in the full payload, because the server
+looks up the base cursor by user.
+
+Without a cursor (first upload, server reset, or a server that doesn't
+return one) the full payload is sent with "format": "full". A server that
+returns a cursor also accepts gzip-compressed bodies; one that answers
+409 Conflict no longer knows the base cursor, and the client falls back to
+a full snapshot.
+
+What the server last acknowledged is kept as a digest per field and per day
+("upload_state" in the analytics store), not as a second copy of the data.
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+# Key in the analytics store holding the acknowledged upload state
+UPLOAD_STATE_KEY = "upload_state"
+
+# At the top level of every payload, changed or not (the server keys
+# uploads and cursors by them)
+IDENTITY_FIELDS = ("user_id",)
+
+
+def digest(value) -> str:
+    """Short stable digest of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def payload_digests(payload: Dict) -> Dict:
+    """Per-field and per-day digests of a full payload."""
+    return {
+        "fields": {
+            name: digest(value) for name, value in payload.items() if name != "daily_usage"
+        },
+        "days": {
+            day: digest(sessions) for day, sessions in payload.get("daily_usage", {}).items()
+        },
+    }
+
+
+def encode_payload(payload: Dict, upload_state: Optional[Dict]) -> Dict:
+    """
+    Encode a full payload against the last acknowledged upload state.
+
+    Returns:
+        A delta payload if the state has a cursor, otherwise the full payload
+    """
+    cursor = (upload_state or {}).get("cursor")
+    if not cursor:
+        return {"format": "full", **payload}
+
+    acked_fields = upload_state.get("fields", {})
+    acked_days = upload_state.get("days", {})
+    daily_usage = payload.get("daily_usage", {})
+
+    fields = {
+        name: value for name, value in payload.items()
+        if name != "daily_usage" and name not in IDENTITY_FIELDS
+        and acked_fields.get(name) != digest(value)
+    }
+    return {
+        "format": "delta",
+        **{name: payload.get(name) for name in IDENTITY_FIELDS},
+        "base_cursor": cursor,
+        "fields": fields,
+        "daily_usage": {
+            day: sessions for day, sessions in daily_usage.items()
+            if acked_days.get(day) != digest(sessions)
+        },
+        "removed_days": sorted(day for day in acked_days if day not in daily_usage),
+    }
+
+
+def acknowledged_state(payload: Dict, response: Optional[Dict], previous: Optional[Dict]) -> Dict:
+    """
+    Upload state after the server accepted `payload` (the full payload).
+
+    The cursor comes from the server response; a response without one means
+    the server only understands full uploads.
+    """
+    cursor = response.get("cursor") if isinstance(response, dict) else None
+    state = {"cursor": cursor, "gzip": bool(cursor) or bool((previous or {}).get("gzip"))}
+    if cursor:
+        state.update(payload_digests(payload))
+    return state
+
+
+def reset_state(previous: Optional[Dict]) -> Dict:
+    """Upload state after the server rejected our cursor (send a full snapshot next)."""
+    return {"cursor": None, "gzip": bool((previous or {}).get("gzip"))}
@@ -0,0 +1,304 @@
+"""
+Analytics Store - Write-behind in-memory cache for analytics data
+
+Counters and sessions are kept in memory and written to disk in a single
+batch. A flush happens on a debounce timer after the first change, when the
+profile closes, and when Anki quits.
+
+Analytics live in their own files under the add-on's user_files folder, so the
+user's settings config stays small and is only written when settings change:
+- snapshot.json: full analytics dict as of the last compaction
+- journal.ndjson: append-only log of changes made since that snapshot
+
+A flush appends one short JSON line per change. When the journal grows past
+COMPACT_THRESHOLD lines it is folded into a fresh snapshot.
+
+Sessions (the old daily_usage map) live in a compact SessionLog stored under
+"sessions" in the snapshot, with retention enforced as sessions are added.
+snapshot() still returns them as daily_usage for the upload payload.
+"""
+
+import copy
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from .session_log import SessionLog
+
+# Batch window: changes made within this period are written in one flush
+FLUSH_DELAY_MS = 30000
+
+# Fold the journal into the snapshot once it has this many lines
+COMPACT_THRESHOLD = 500
+
+# Storage location (user_files survives add-on updates)
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYTICS_DIR = os.path.join(ADDON_DIR, "user_files", "analytics")
+SNAPSHOT_PATH = os.path.join(ANALYTICS_DIR, "snapshot.json")
+JOURNAL_PATH = os.path.join(ANALYTICS_DIR, "journal.ndjson")
+
+
+def apply_op(data: Dict, sessions: SessionLog, op: Dict):
+    """
+    Apply a single journal operation to an analytics dict and its session log.
+
+    Operations:
+    - {"op": "set", "k": key, "v": value}
+    - {"op": "inc", "k": key, "n": amount}
+    - {"op": "session", "d": "YYYY-MM-DD", "t": "HH:MM:SS"}
+    - {"op": "msg", "d": "YYYY-MM-DD", "i": session_index}
+    - {"op": "opened", "d": "YYYY-MM-DD", "i": session_index, "s": seconds}
+    """
+    kind = op.get("op")
+    if kind == "set":
+        data[op["k"]] = op.get("v")
+    elif kind == "inc":
+        data[op["k"]] = data.get(op["k"], 0) + op.get("n", 1)
+    elif kind == "session":
+        sessions.start(op["d"], op["t"])
+    elif kind == "msg":
+        sessions.add_message(op["d"], op["i"])
+    elif kind == "opened":
+        sessions.mark_opened(op["d"], op["i"], op["s"])
+
+
+class AnalyticsStore:
+    """
+    Holds the analytics dictionary in memory and flushes it lazily.
+
+    All reads and writes go through this object, so a click or chat message
+    costs a dictionary update instead of a JSON read and a full config rewrite.
+    """
+
+    def __init__(self):
+        self._data: Optional[Dict] = None
+        self._sessions = SessionLog()
+        self._pending: List[Dict] = []
+        self._needs_compaction = False
+        self._journal_lines = 0
+        self._flush_timer = None
+
+        # Counters for diagnostics/benchmarking
+        self.change_count = 0  # Number of mutations recorded
+        self.write_count = 0   # Number of actual disk writes
+        self.bytes_written = 0
+
+    def data(self) -> Dict:
+        """Return the live analytics dictionary (loaded from disk on first use)."""
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    def sessions(self) -> SessionLog:
+        """Return the live session log (read-only for callers)."""
+        self.data()
+        return self._sessions
+
+    def snapshot(self) -> Dict:
+        """Return a deep copy that is safe to hand to another thread (sessions as daily_usage)."""
+        snapshot = copy.deepcopy(self.data())
+        snapshot["daily_usage"] = self._sessions.to_daily_usage()
+        return snapshot
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data().get(key, default)
+
+    def set(self, key: str, value: Any):
+        """Set a value and schedule a flush."""
+        self._record({"op": "set", "k": key, "v": value})
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """Increment a counter and schedule a flush. Returns the new value."""
+        self._record({"op": "inc", "k": key, "n": amount})
+        return self.data()[key]
+
+    def start_session(self, day: str, time: str) -> int:
+        """Append a new session for a day. Returns its index in that day's list."""
+        self._record({"op": "session", "d": day, "t": time})
+        return self._sessions.session_count(day) - 1
+
+    def add_message(self, day: str, index: int) -> int:
+        """Count a message in a session. Returns the session's new message count."""
+        self._record({"op": "msg", "d": day, "i": index})
+        return self._sessions.session_messages(day, index)
+
+    def mark_panel_opened(self, day: str, index: int, seconds: int):
+        """Record when the panel was first opened in a session (first call wins)."""
+        sessions = self.sessions()
+        if sessions.has_session(day, index) and not sessions.has_opened(day, index):
+            self._record({"op": "opened", "d": day, "i": index, "s": seconds})
+
+    def replace(self, analytics: Dict):
+        """Replace the whole analytics dictionary (rewrites the snapshot on flush)."""
+        if "daily_usage" in analytics:
+            self._sessions = SessionLog.from_daily_usage(analytics.pop("daily_usage"))
+        self._data = analytics
+        self._needs_compaction = True
+        self._mark_dirty()
+
+    def flush(self):
+        """Write pending changes to disk in one batch."""
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+
+        if self._data is None:
+            return
+
+        try:
+            if self._needs_compaction or self._journal_lines + len(self._pending) > COMPACT_THRESHOLD:
+                self.compact()
+            elif self._pending:
+                self._append_journal(self._pending)
+                self._pending = []
+        except Exception as e:
+            print(f"AI Panel: Error flushing analytics: {e}")
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate the journal."""
+        data = self.data()
+        os.makedirs(ANALYTICS_DIR, exist_ok=True)
+
+        # Write atomically so a crash never leaves a half-written snapshot
+        tmp_path = SNAPSHOT_PATH + ".tmp"
+        payload = json.dumps({**data, "sessions": self._sessions.to_json()}, separators=(",", ":"))
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+
+        # Snapshot now contains everything - start an empty journal
+        with open(JOURNAL_PATH, "w", encoding="utf-8"):
+            pass
+
+        self._pending = []
+        self._journal_lines = 0
+        self._needs_compaction = False
+        self.write_count += 1
+        self.bytes_written += len(payload)
+
+    def _record(self, op: Dict):
+        apply_op(self.data(), self._sessions, op)
+        self._pending.append(op)
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        self.change_count += 1
+        self._schedule_flush()
+
+    def _append_journal(self, ops: List[Dict]):
+        os.makedirs(ANALYTICS_DIR, exist_ok=True)
+        lines = "".join(json.dumps(op, separators=(",", ":")) + "\n" for op in ops)
+        with open(JOURNAL_PATH, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self._journal_lines += len(ops)
+        self.write_count += 1
+        self.bytes_written += len(lines)
+
+    def _load(self) -> Dict:
+        """Load snapshot + journal, migrating from the add-on config if needed."""
+        if not os.path.exists(SNAPSHOT_PATH) and not os.path.exists(JOURNAL_PATH):
+            return self._migrate_from_config()
+
+        data = {}
+        try:
+            with open(SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if "daily_usage" in data:
+            # Snapshot from before the session log - convert it once
+            self._sessions = SessionLog.from_daily_usage(data.pop("daily_usage"))
+            self._needs_compaction = True
+        else:
+            self._sessions = SessionLog.from_json(data.pop("sessions", None))
+
+        try:
+            with open(JOURNAL_PATH, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        apply_op(data, self._sessions, json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # Torn last line after a crash - skip it
+                        continue
+                    self._journal_lines += 1
+        except OSError:
+            pass
+
+        # Periodic compaction: keep startup replay short
+        if self._needs_compaction or self._journal_lines > COMPACT_THRESHOLD:
+            self._needs_compaction = True
+            self._schedule_flush()
+
+        return data
+
+    def _migrate_from_config(self) -> Dict:
+        """One-time move of the legacy `analytics` key out of the add-on config."""
+        from .config_store import get_config_store
+
+        store = get_config_store()
+        data = store.snapshot().get("analytics", {})
+        self._sessions = SessionLog.from_daily_usage(data.pop("daily_usage", None))
+
+        if data:
+            # Persist to the new location before removing the old copy
+            self._data = data
+            self.compact()
+            store.remove("analytics")
+            print("AI Panel: Migrated analytics out of config into user_files")
+
+        return data
+
+    def _schedule_flush(self):
+        """Start the debounce timer unless a flush is already pending."""
+        try:
+            from aqt.qt import QTimer
+        except ImportError:
+            return
+
+        if self._flush_timer is None:
+            self._flush_timer = QTimer()
+            self._flush_timer.setSingleShot(True)
+            self._flush_timer.timeout.connect(self.flush)
+
+        # Don't restart an active timer - a steady stream of events would
+        # otherwise postpone the write indefinitely
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(FLUSH_DELAY_MS)
+
+
+# Singleton instance
+_analytics_store = None
+
+
+def get_analytics_store() -> AnalyticsStore:
+    """
+    Get the global AnalyticsStore singleton.
+
+    Returns:
+        AnalyticsStore instance
+    """
+    global _analytics_store
+    if _analytics_store is None:
+        _analytics_store = AnalyticsStore()
+    return _analytics_store
+
+
+def flush_analytics(*args):
+    """Flush pending analytics to disk (safe to use as a hook callback)."""
+    if _analytics_store is not None:
+        _analytics_store.flush()
+
+
+def setup_analytics_store_hooks():
+    """Flush pending analytics when the profile closes and when Anki quits."""
+    from aqt import gui_hooks
+
+    gui_hooks.profile_will_close.append(flush_analytics)
+
+    try:
+        from aqt.qt import QApplication
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(flush_analytics)
+    except Exception as e:
+        print(f"AI Panel: Could not register quit flush: {e}")
@@ -0,0 +1,288 @@
+"""
+Analytics Uploader - One long-lived worker thread for analytics uploads
+
+Each send used to start a new thread and a new HTTPS connection, and a failed
+send was silently dropped until the next hourly check. Uploads now go through
+a single daemon worker:
+- jobs carry a payload built from a snapshot taken on the main thread, so the
+  worker never touches the analytics store, the config or mw
+- the queue is bounded; when it is full the oldest job is dropped (a newer
+  snapshot supersedes it)
+- failures are retried with exponential backoff and full jitter, and a newer
+  job arriving during the backoff replaces the one being retried
+- one HTTP(S) connection per host is kept open and reused between uploads
+- the idle worker blocks on the queue (no periodic wakeups); stop() queues
+  a sentinel that ends it
+- bodies are gzip-compressed when the job asks for it, and a 409 Conflict
+  (the server lost the delta cursor, see analytics_delta) is handed back to
+  the caller of a delta upload instead of being retried
+
+The worker has no Anki dependencies; callers that need the main thread wrap
+their `on_sent` callback (see analytics.send_analytics_background).
+"""
+
+import gzip
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import diagnostics
+
+UPLOAD_QUEUE_SIZE = 4
+REQUEST_TIMEOUT_S = 10
+
+# Backoff: BACKOFF_BASE_S * 2^attempt, capped, with full jitter
+BACKOFF_BASE_S = 5.0
+BACKOFF_MAX_S = 600.0
+MAX_ATTEMPTS = 6
+
+# Responses worth retrying (everything else below 500 is a permanent failure)
+RETRYABLE_STATUSES = (408, 429)
+
+# The server doesn't know the base cursor of a delta upload
+CONFLICT_STATUS = 409
+
+# Queued by stop(): the worker exits when it takes this
+_STOP = object()
+
+
+class UploadJob:
+    """
+    A payload to POST, and what to call with the outcome.
+
+    on_sent receives the decoded JSON response (None if the body isn't JSON);
+    on_conflict is called instead of retrying a 409 response. Both run on
+    the worker thread. Without on_conflict a 409 is a permanent failure.
+    """
+
+    def __init__(self, url: str, payload: Dict, headers: Optional[Dict[str, str]] = None,
+                 on_sent: Optional[Callable[[Optional[Dict]], None]] = None,
+                 on_conflict: Optional[Callable[[], None]] = None, compress: bool = False):
+        self.url = url
+        self.payload = payload
+        self.headers = headers or {}
+        self.on_sent = on_sent
+        self.on_conflict = on_conflict
+        self.compress = compress
+        self.attempts = 0
+
+
+def encode_body(payload: Dict, compress: bool) -> bytes:
+    """JSON-encode a payload, gzip-compressed if requested."""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(body, compresslevel=6) if compress else body
+
+
+def _decode_response(body: bytes) -> Optional[Dict]:
+    try:
+        response = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return response if isinstance(response, dict) else None
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_S, cap: float = BACKOFF_MAX_S) -> float:
+    """Full-jitter delay before retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AnalyticsUploader:
+    """
+    Owns the upload queue, the worker thread and its reusable connections.
+    """
+
+    def __init__(self, queue_size: int = UPLOAD_QUEUE_SIZE, backoff_base: float = BACKOFF_BASE_S,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self._queue: "queue.Queue[UploadJob]" = queue.Queue(maxsize=queue_size)
+        self._backoff_base = backoff_base
+        self._max_attempts = max_attempts
+        self._connections: Dict[Tuple[str, str], http.client.HTTPConnection] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: UploadJob):
+        """Queue a job (never blocks; drops the oldest queued job if full)."""
+        with self._lock:
+            self._put(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="AnalyticsUploader", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout: float = 0.0):
+        """
+        Stop the worker once it reaches the end of the queue (or is waiting
+        out a backoff) and close its connections. Waits up to `timeout`
+        seconds for it to exit. A later submit() starts a new worker.
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._put(_STOP)
+        if timeout > 0:
+            thread.join(timeout)
+
+    def _put(self, item):
+        """Queue an item, dropping the oldest queued one if full (caller holds the lock)."""
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    diagnostics.increment("analytics_upload_superseded")
+                except queue.Empty:
+                    pass
+
+    # ---- Worker thread ----
+
+    def _run(self):
+        try:
+            job = self._queue.get()
+            while True:
+                if job is _STOP:
+                    with self._lock:
+                        # A job submitted after stop() keeps this worker going
+                        if self._queue.empty():
+                            self._exit()
+                            return
+                    job = self._queue.get()
+                    continue
+
+                retry = self._attempt(job)
+                if not retry:
+                    job = self._queue.get()
+                    continue
+
+                # Wait out the backoff, but let a newer snapshot take over
+                delay = backoff_delay(job.attempts - 1, self._backoff_base)
+                diagnostics.increment("analytics_upload_retry")
+                try:
+                    job = self._queue.get(timeout=delay)
+                    if job is not _STOP:
+                        diagnostics.increment("analytics_upload_superseded")
+                except queue.Empty:
+                    pass
+        except Exception as e:
+            print(f"AI Panel: Analytics uploader stopped: {e}")
+            with self._lock:
+                self._exit()
+
+    def _exit(self):
+        """Close connections and forget this worker (caller holds the lock)."""
+        self._close_connections()
+        self._thread = None
+
+    def _attempt(self, job: UploadJob) -> bool:
+        """
+        POST a job once.
+
+        Returns:
+            True if the job should be retried
+        """
+        job.attempts += 1
+        started = time.perf_counter()
+        try:
+            status, response_body = self._post(job)
+        except (OSError, http.client.HTTPException) as e:
+            status = None
+            print(f"AI Panel: Analytics upload failed: {e}")
+
+        if status is not None and 200 <= status < 300:
+            diagnostics.record_timing("analytics_upload_ms", (time.perf_counter() - started) * 1000)
+            diagnostics.increment("analytics_upload_sent")
+            if job.on_sent is not None:
+                job.on_sent(_decode_response(response_body))
+            return False
+
+        if status == CONFLICT_STATUS and job.on_conflict is not None:
+            diagnostics.increment("analytics_upload_conflict")
+            job.on_conflict()
+            return False
+
+        diagnostics.increment("analytics_upload_failed")
+        retryable = status is None or status >= 500 or status in RETRYABLE_STATUSES
+        if not retryable:
+            print(f"AI Panel: Analytics upload rejected with HTTP {status}, not retrying")
+        if not retryable or job.attempts >= self._max_attempts:
+            diagnostics.increment("analytics_upload_dropped")
+            return False
+        return True
+
+    def _post(self, job: UploadJob) -> Tuple[int, bytes]:
+        parts = urlsplit(job.url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        body = encode_body(job.payload, job.compress)
+        headers = {"Content-Type": "application/json", **job.headers}
+        if job.compress:
+            headers["Content-Encoding"] = "gzip"
+        diagnostics.record_sample("analytics_upload_bytes", len(body))
+
+        # A kept-alive connection the server has since closed fails on first
+        # use; retry that once on a fresh connection
+        for fresh in (False, True):
+            connection = self._connection(parts.scheme, parts.netloc, fresh)
+            try:
+                connection.request("POST", path, body=body, headers=headers)
+                response = connection.getresponse()
+                response_body = response.read()
+                if response.will_close:
+                    self._drop_connection(parts.scheme, parts.netloc)
+                return response.status, response_body
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self._drop_connection(parts.scheme, parts.netloc)
+                if fresh:
+                    raise
+            except Exception:
+                self._drop_connection(parts.scheme, parts.netloc)
+                raise
+
+    def _connection(self, scheme: str, netloc: str, fresh: bool) -> http.client.HTTPConnection:
+        key = (scheme, netloc)
+        connection = self._connections.get(key)
+        if connection is None or fresh:
+            if connection is not None:
+                connection.close()
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(netloc, timeout=REQUEST_TIMEOUT_S)
+            self._connections[key] = connection
+            diagnostics.increment("analytics_upload_connections")
+        return connection
+
+    def _drop_connection(self, scheme: str, netloc: str):
+        connection = self._connections.pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def _close_connections(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+
+# Singleton instance
+_uploader = None
+
+
+def get_analytics_uploader() -> AnalyticsUploader:
+    """
+    Get the global AnalyticsUploader singleton.
+
+    Returns:
+        AnalyticsUploader instance
+    """
+    global _uploader
+    if _uploader is None:
+        _uploader = AnalyticsUploader()
+    return _uploader
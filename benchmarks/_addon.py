@@ -0,0 +1,23 @@
+"""
+Import add-on modules outside Anki.
+
+The add-on's __init__ needs a running Anki, so the benchmarks register the
+add-on folder as a bare package and import only the modules they measure.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "ai_side_panel"
+
+
+def load(name):
+    """Import add-on module `name` (e.g. "utils") without the package __init__."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ADDON_DIR]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
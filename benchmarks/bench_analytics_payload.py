@@ -0,0 +1,113 @@
+"""
+Analytics Payload Benchmark - size of the daily upload
+
+Builds 90 days of sessions in a SessionLog (1-6 sessions a day), uploads the
+full payload once, then simulates the next day's use and encodes the next
+upload against the acknowledged state. Reports the request body size for:
+
+- full: the whole payload, as every upload used to send it
+- delta: what changed since the server's cursor
+- each of them gzip-compressed, as sent once the server returned a cursor
+
+Usage:
+    python benchmarks/bench_analytics_payload.py
+"""
+
+import gzip
+import json
+import random
+from datetime import date, timedelta
+
+from _addon import load
+
+analytics_delta = load("analytics_delta")
+session_log = load("session_log")
+
+DAYS = session_log.RETENTION_DAYS
+END_DAY = date(2026, 10, 16)
+
+
+def add_day(log, day, rng):
+    """Sessions for one day, recorded the way the add-on records them."""
+    for _ in range(rng.randint(1, 6)):
+        index = log.start(day, f"{rng.randint(6, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}")
+        for _ in range(rng.randint(0, 25)):
+            log.add_message(day, index)
+        if rng.random() < 0.7:
+            log.mark_opened(day, index, rng.randint(0, 900))
+
+
+def payload_for(log, counters):
+    """Same fields as analytics.build_payload, with the values an active user has."""
+    return {
+        "user_id": "00000000-0000-4000-8000-000000000000",
+        "first_install_date": "2026-01-04T10:12:45.123456",
+        "platform": "darwin",
+        "locale": "en_US",
+        "timezone": "America/New_York",
+        "has_logged_in": True,
+        "auth_button_clicked": "login",
+        "onboarding_completed": True,
+        "tutorial_status": "completed",
+        "tutorial_current_step": "36/36",
+        **counters,
+        "has_shown_referral": True,
+        "referral_modal_status": "dismissed",
+        "referral_modal_seconds_open": 4,
+        "has_shown_review": False,
+        "review_modal_status": None,
+        "review_modal_seconds_open": None,
+        "panel_ready_cold_ms": 1840,
+        "panel_ready_warm_ms": 310,
+        "preload_mode": "adaptive",
+        "preload_metrics": {"adaptive": {"preloads": 41, "used": 37, "wasted_ms": 2210}},
+        "daily_usage": log.to_daily_usage(),
+    }
+
+
+def body_sizes(body):
+    encoded = json.dumps(body).encode("utf-8")
+    return len(encoded), len(gzip.compress(encoded))
+
+
+def main():
+    rng = random.Random(1)
+    log = session_log.SessionLog()
+    start = END_DAY - timedelta(days=DAYS)
+    for offset in range(DAYS):
+        add_day(log, (start + timedelta(days=offset)).isoformat(), rng)
+    counters = {
+        "add_to_chat_count": 412,
+        "ask_question_count": 160,
+        "template_usage_count": 75,
+        "templates_added": 6,
+        "templates_deleted": 1,
+    }
+
+    # Yesterday's upload, acknowledged with a cursor
+    acknowledged = payload_for(log, counters)
+    state = analytics_delta.acknowledged_state(acknowledged, {"cursor": "c1"}, None)
+
+    # One more day of use (the oldest day falls out of retention)
+    add_day(log, END_DAY.isoformat(), rng)
+    counters["add_to_chat_count"] += 9
+    counters["ask_question_count"] += 3
+    payload = payload_for(log, counters)
+
+    full = analytics_delta.encode_payload(payload, None)
+    delta = analytics_delta.encode_payload(payload, state)
+    full_bytes, full_gzip = body_sizes(full)
+    delta_bytes, delta_gzip = body_sizes(delta)
+
+    print(f"{DAYS} days, {len(log)} sessions")
+    print(f"  full          {full_bytes / 1024:8.2f} KB   gzip {full_gzip / 1024:8.2f} KB")
+    print(
+        f"  delta         {delta_bytes / 1024:8.2f} KB   gzip {delta_gzip / 1024:8.2f} KB"
+        f"   ({len(delta['fields'])} fields, {len(delta['daily_usage'])} day(s),"
+        f" {len(delta['removed_days'])} removed)"
+    )
+    print(f"  delta + gzip vs full: {full_bytes / delta_gzip:.0f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Analytics Write Benchmark - disk writes during a review session
+
+Simulates a 200-card review session (~29 minutes, one card every ~8.7s)
+with the quick actions, template shortcuts and chat messages a heavy user
+triggers, on top of 90 days of existing analytics history.
+
+- legacy: every track_* call did a getConfig + writeConfig round trip,
+  i.e. a JSON read and a full meta.json rewrite (re-created here against a
+  meta.json in a temp folder, the way Anki's addonManager stores it)
+- write-behind: AnalyticsStore, flushed FLUSH_DELAY_MS after the first
+  pending change and once more when the profile closes
+
+Reports reads, writes, bytes written and the time spent in tracking calls.
+
+Usage:
+    python benchmarks/bench_analytics_writes.py
+"""
+
+import copy
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from _addon import load
+
+analytics_store = load("analytics_store")
+
+CARDS = 200
+SECONDS_PER_CARD = 8.7
+HISTORY_DAYS = 90
+TODAY = date(2026, 10, 16).isoformat()
+
+# Per-card chance of each action; every chat action also sends a message
+ACTIONS = (
+    ("add_to_chat_count", 0.25),
+    ("ask_question_count", 0.10),
+    ("template_usage_count", 0.05),
+)
+
+
+def session_events(seed=1):
+    """(seconds into the session, event) pairs for one review session."""
+    rng = random.Random(seed)
+    events = [(0.0, ("session",)), (5.0, ("opened",))]
+    for card in range(CARDS):
+        at = card * SECONDS_PER_CARD
+        for key, chance in ACTIONS:
+            if rng.random() < chance:
+                events.append((at + 1.0, ("inc", key)))
+                events.append((at + 2.0, ("msg",)))
+    return events
+
+
+def existing_analytics(seed=2):
+    """Analytics as stored after 90 days of use, with daily_usage."""
+    rng = random.Random(seed)
+    start = date.fromisoformat(TODAY) - timedelta(days=HISTORY_DAYS)
+    daily_usage = {
+        (start + timedelta(days=offset)).isoformat(): [
+            {
+                "time": f"{rng.randint(6, 23):02d}:{rng.randint(0, 59):02d}:00",
+                "messages": rng.randint(0, 30),
+                "panel_opened_s": rng.randint(0, 600),
+            }
+            for _ in range(rng.randint(1, 4))
+        ]
+        for offset in range(HISTORY_DAYS)
+    }
+    return {
+        "user_id": "00000000-0000-4000-8000-000000000000",
+        "has_logged_in": True,
+        "onboarding_completed": True,
+        "add_to_chat_count": 412,
+        "ask_question_count": 160,
+        "template_usage_count": 75,
+        "daily_usage": daily_usage,
+    }
+
+
+class LegacyConfig:
+    """getConfig/writeConfig against a meta.json, counting reads and writes."""
+
+    def __init__(self, path, config):
+        self.path = path
+        self.reads = 0
+        self.writes = 0
+        self.bytes_written = 0
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"config": config}, f)
+
+    def get_config(self):
+        self.reads += 1
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)["config"]
+
+    def write_config(self, config):
+        payload = json.dumps({"config": config})
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        self.writes += 1
+        self.bytes_written += len(payload)
+
+
+def run_legacy(folder, settings, events):
+    """One config round trip per tracked event, as analytics.py used to do."""
+    legacy = LegacyConfig(os.path.join(folder, "meta.json"), {**settings, "analytics": existing_analytics()})
+    index = -1
+    started = time.perf_counter()
+    for _, event in events:
+        config = legacy.get_config()
+        analytics = config.setdefault("analytics", {})
+        today = analytics.setdefault("daily_usage", {}).setdefault(TODAY, [])
+        if event[0] == "session":
+            today.append({"time": "09:00:00", "messages": 0})
+            index = len(today) - 1
+        elif event[0] == "opened":
+            today[index].setdefault("panel_opened_s", 5)
+        elif event[0] == "inc":
+            analytics[event[1]] = analytics.get(event[1], 0) + 1
+        elif event[0] == "msg":
+            today[index]["messages"] += 1
+        legacy.write_config(config)
+    elapsed = time.perf_counter() - started
+    return legacy.reads, legacy.writes, legacy.bytes_written, elapsed
+
+
+def use_folder(folder):
+    analytics_store.ANALYTICS_DIR = folder
+    analytics_store.SNAPSHOT_PATH = os.path.join(folder, "snapshot.json")
+    analytics_store.JOURNAL_PATH = os.path.join(folder, "journal.ndjson")
+
+
+def new_store():
+    store = analytics_store.AnalyticsStore()
+    # The debounce timer needs Qt - flushes are driven from the simulated clock
+    store._schedule_flush = lambda: None
+    return store
+
+
+def run_write_behind(folder, events):
+    """Store calls as the track_* functions make them, flushed on the debounce schedule."""
+    use_folder(folder)
+    seed = new_store()
+    seed.replace(copy.deepcopy(existing_analytics()))
+    seed.flush()
+
+    store = new_store()
+    delay = analytics_store.FLUSH_DELAY_MS / 1000
+    flush_at = None
+    index = -1
+    flushes = 0
+    started = time.perf_counter()
+    for at, event in events:
+        if flush_at is not None and at >= flush_at:
+            store.flush()
+            flushes += 1
+            flush_at = None
+        if event[0] == "session":
+            index = store.start_session(TODAY, "09:00:00")
+        elif event[0] == "opened":
+            store.mark_panel_opened(TODAY, index, 5)
+        elif event[0] == "inc":
+            store.increment(event[1])
+        elif event[0] == "msg":
+            store.add_message(TODAY, index)
+        if flush_at is None:
+            flush_at = at + delay
+    # profile_will_close
+    store.flush()
+    flushes += 1
+    elapsed = time.perf_counter() - started
+    # Reads: one snapshot + journal load when the store is first used
+    return 1, store.write_count, store.bytes_written, elapsed, flushes
+
+
+def main():
+    with open(os.path.join(analytics_store.ADDON_DIR, "config.json"), encoding="utf-8") as f:
+        settings = json.load(f)
+
+    events = session_events()
+    minutes = events[-1][0] / 60
+    print(f"{CARDS} cards, {minutes:.0f} min, {len(events)} tracked events, {HISTORY_DAYS} days of history")
+
+    with tempfile.TemporaryDirectory() as folder:
+        reads, writes, written, elapsed = run_legacy(folder, settings, events)
+    print(
+        f"  legacy        {reads:4d} reads  {writes:4d} writes  {written / 1024:8.1f} KB written"
+        f"  {elapsed * 1000:7.1f} ms"
+    )
+
+    with tempfile.TemporaryDirectory() as folder:
+        reads, writes, written, elapsed, flushes = run_write_behind(folder, events)
+    print(
+        f"  write-behind  {reads:4d} reads  {writes:4d} writes  {written / 1024:8.1f} KB written"
+        f"  {elapsed * 1000:7.1f} ms  ({flushes} flushes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
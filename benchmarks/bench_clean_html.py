@@ -0,0 +1,70 @@
+"""
+Clean HTML Benchmark - clean_html_text vs the old regex chain
+
+Runs both over a synthetic corpus of pathological cards (inline base64
+images, big tables, unclosed <style>, bare "<" in text, deep nesting) and
+prints the average time per card.
+
+Usage:
+    python benchmarks/bench_clean_html.py
+"""
+
+import html
+import re
+import time
+
+from _addon import load
+
+utils = load("utils")
+
+
+def legacy_clean_html_text(html_text):
+    """The implementation clean_html_text replaced (four uncompiled passes)."""
+    text = re.sub(r'<style[^>]*>.*?</style>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub('<[^<]+?>', '', text)
+    text = html.unescape(text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def build_corpus():
+    image = "QUJD" * 100000
+    return {
+        "plain card": (
+            "<div>What is the first-line treatment for <b>hypertension</b>?</div>"
+            "<hr id=answer>Thiazides &amp; ACE inhibitors"
+        ),
+        "base64 images (3 x 400 KB)": (
+            "<div>Identify:</div>"
+            + "".join(f'<img src="data:image/png;base64,{image}">' for _ in range(3))
+            + "<div>Answer</div>"
+        ),
+        "table 300 x 6": "<table>" + "".join(
+            "<tr>" + "".join(f"<td>r{row}c{col} <i>x</i></td>" for col in range(6)) + "</tr>"
+            for row in range(300)
+        ) + "</table>",
+        "unclosed <style> x 200": "<style>.a{}" * 200 + "<p>text</p>" * 200,
+        "bare '<' in text x 5000": "<div>" + "a < b and " * 5000 + "</div>",
+        "nesting depth 2000": "<span>" * 2000 + "core" + "</span>" * 2000,
+    }
+
+
+def time_per_call_ms(function, text, budget_chars=200_000):
+    runs = max(1, budget_chars // max(len(text), 1000))
+    started = time.perf_counter()
+    for _ in range(runs):
+        function(text)
+    return (time.perf_counter() - started) / runs * 1000
+
+
+def main():
+    print(f"{'card':30s} {'size':>9s} {'legacy':>11s} {'current':>11s}")
+    for name, text in build_corpus().items():
+        legacy_ms = time_per_call_ms(legacy_clean_html_text, text)
+        current_ms = time_per_call_ms(utils.clean_html_text, text)
+        print(f"{name:30s} {len(text) / 1024:6.0f} KB {legacy_ms:8.3f} ms {current_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Loading Spinner Benchmark - startup cost of the panel's loading indicator
+
+Compares the old loader (a second QWebEngineView rendering the CSS rolling
+dots) with the native LoadingSpinner. Each run is a fresh process that
+builds the panel's web container the way setup_ui does (loader first, then
+the panel web view) and loads a local page in the panel view. Reported per
+variant, as medians over the runs:
+
+- ready: ms from building the container to the panel page's loadFinished
+- process: resident memory of this process at ready
+- renderers: resident memory of the web views' renderer processes at ready
+
+Needs Qt WebEngine and aqt (run it with the Python Anki runs on). Headless:
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_loading_spinner.py
+
+Usage:
+    python benchmarks/bench_loading_spinner.py [runs]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+TIMEOUT_MS = 30000
+VARIANTS = ("overlay", "spinner")
+
+# Stand-in for the panel page: static, local, no network
+PANEL_HTML = "<!DOCTYPE html><html><body>" + "<p>OpenEvidence</p>" * 200 + "</body></html>"
+
+# ThemeManager.get_loading_html() as it was before the native spinner (light palette)
+OVERLAY_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<style>
+    body { margin: 0; padding: 0; background: #ffffff; display: flex; justify-content: center;
+           align-items: center; height: 100vh; overflow: hidden; }
+    .loader { width: 10px; height: 10px; border-radius: 50%; display: block; position: relative;
+              color: #111827; left: -100px; box-sizing: border-box;
+              animation: shadowRolling 2s linear infinite; }
+    @keyframes shadowRolling {
+        0% { box-shadow: 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0); }
+        12% { box-shadow: 100px 0 #111827, 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0); }
+        25% { box-shadow: 110px 0 #111827, 100px 0 #111827, 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0); }
+        36% { box-shadow: 120px 0 #111827, 110px 0 #111827, 100px 0 #111827, 0px 0 rgba(255, 255, 255, 0); }
+        50% { box-shadow: 130px 0 #111827, 120px 0 #111827, 110px 0 #111827, 100px 0 #111827; }
+        62% { box-shadow: 200px 0 rgba(255, 255, 255, 0), 130px 0 #111827, 120px 0 #111827, 110px 0 #111827; }
+        75% { box-shadow: 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 130px 0 #111827, 120px 0 #111827; }
+        87% { box-shadow: 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 130px 0 #111827; }
+        100% { box-shadow: 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0); }
+    }
+</style>
+</head>
+<body><span class="loader"></span></body>
+</html>
+"""
+
+
+def measure(variant):
+    """Build the container with one loader variant; returns the numbers at ready."""
+    try:
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
+        from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout
+        from PyQt6.QtCore import QTimer
+    except ImportError:
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
+        from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout
+        from PyQt5.QtCore import QTimer
+
+    from _addon import load
+
+    diagnostics = load("diagnostics")
+    app = QApplication(sys.argv)
+    result = {}
+
+    started = time.perf_counter()
+    container = QWidget()
+    container.resize(400, 700)
+    layout = QVBoxLayout(container)
+    layout.setContentsMargins(0, 0, 0, 0)
+
+    # Same order as setup_ui: the loader first, on top in z-order
+    if variant == "overlay":
+        loader = QWebEngineView(container)
+        loader.setHtml(OVERLAY_HTML)
+        renderer_views = [loader]
+    else:
+        loader = load("loading_spinner").LoadingSpinner(container)
+        renderer_views = []
+    web = QWebEngineView(container)
+    renderer_views.append(web)
+    layout.addWidget(web)
+    loader.setGeometry(container.rect())
+    loader.raise_()
+    container.show()
+
+    def on_ready(ok):
+        result["ready_ms"] = (time.perf_counter() - started) * 1000
+        result["process_mb"] = diagnostics.resident_memory_mb()
+        pids = {view.page().renderProcessPid() for view in renderer_views}
+        sizes = [diagnostics.resident_memory_mb(pid) for pid in pids if pid]
+        result["renderers_mb"] = sum(size for size in sizes if size is not None)
+        result["ok"] = ok
+        loader.hide()
+        app.quit()
+
+    web.loadFinished.connect(on_ready)
+    web.setHtml(PANEL_HTML)
+    QTimer.singleShot(TIMEOUT_MS, app.quit)
+    app.exec()
+    return result
+
+
+def run(variant):
+    """One measurement in a fresh process (startup memory depends on it)."""
+    child = subprocess.run(
+        [sys.executable, __file__, "--variant", variant],
+        capture_output=True, text=True,
+    )
+    if child.returncode != 0:
+        sys.exit(f"{variant} run failed:\n{child.stderr}")
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--variant":
+        print(json.dumps(measure(sys.argv[2])))
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+    results = {variant: [] for variant in VARIANTS}
+    # Interleaved so both variants see the same disk cache and system load
+    for _ in range(runs):
+        for variant in VARIANTS:
+            results[variant].append(run(variant))
+
+    print(f"{runs} runs per variant (medians)")
+    for variant in VARIANTS:
+        samples = [sample for sample in results[variant] if sample.get("ok")]
+        if not samples:
+            print(f"  {variant:8s} panel page never became ready")
+            continue
+        ready = statistics.median(sample["ready_ms"] for sample in samples)
+        process = statistics.median(sample["process_mb"] or 0 for sample in samples)
+        renderers = statistics.median(sample["renderers_mb"] for sample in samples)
+        print(
+            f"  {variant:8s} ready {ready:7.1f} ms   process {process:6.1f} MB"
+            f"   renderers {renderers:6.1f} MB   total {process + renderers:6.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Session Log Benchmark - size and memory of the analytics session history
+
+Simulates 1 and 3 years of heavy use (8 sessions a day) and compares the
+legacy daily_usage dict with the SessionLog holding the same sessions
+(retention disabled) and with retention enforced on write, as in the add-on.
+Reports serialized JSON size and traced Python memory.
+
+Usage:
+    python benchmarks/bench_session_log.py
+"""
+
+import json
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from _addon import load
+
+session_log = load("session_log")
+SessionLog = session_log.SessionLog
+
+SESSIONS_PER_DAY = 8
+END_DAY = date(2026, 10, 16)
+
+
+def legacy_history(days, seed):
+    """daily_usage as the add-on used to store it."""
+    rng = random.Random(seed)
+    start = END_DAY - timedelta(days=days - 1)
+    daily_usage = {}
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        daily_usage[day] = [
+            {
+                "time": f"{rng.randint(6, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+                "messages": rng.randint(0, 40),
+                "panel_opened_s": rng.randint(0, 3000),
+            }
+            for _ in range(SESSIONS_PER_DAY)
+        ]
+    return daily_usage
+
+
+def json_kb(value):
+    return len(json.dumps(value, separators=(",", ":"))) / 1024
+
+
+def traced_kb(build):
+    """Memory held by the object build() returns, in KB."""
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size / 1024
+
+
+def log_with_retention(daily_usage):
+    """Replay the sessions through start()/add_message(), as recorded live."""
+    log = SessionLog()
+    for day in sorted(daily_usage):
+        for session in daily_usage[day]:
+            index = log.start(day, session["time"])
+            for _ in range(session["messages"]):
+                log.add_message(day, index)
+    return log
+
+
+def main():
+    for years in (1, 3):
+        daily_usage = legacy_history(365 * years, seed=years)
+        sessions = sum(len(day_sessions) for day_sessions in daily_usage.values())
+        serialized = json.dumps(daily_usage)
+
+        _, legacy_kb = traced_kb(lambda: json.loads(serialized))
+
+        retention = session_log.RETENTION_DAYS
+        session_log.RETENTION_DAYS = 10 ** 6
+        try:
+            full_log, full_kb = traced_kb(lambda: SessionLog.from_daily_usage(daily_usage))
+        finally:
+            session_log.RETENTION_DAYS = retention
+
+        kept_log, kept_kb = traced_kb(lambda: log_with_retention(daily_usage))
+
+        # Timed separately: tracing slows allocation-heavy code down
+        writes = sessions + sum(
+            session["messages"] for day_sessions in daily_usage.values() for session in day_sessions
+        )
+        started = time.perf_counter()
+        log_with_retention(daily_usage)
+        write_us = (time.perf_counter() - started) * 1e6 / writes
+
+        print(f"{years} year(s), {len(daily_usage)} days, {sessions} sessions")
+        print(f"  legacy daily_usage     json {json_kb(daily_usage):8.1f} KB   memory {legacy_kb:8.1f} KB")
+        print(f"  SessionLog, all days   json {json_kb(full_log.to_json()):8.1f} KB   memory {full_kb:8.1f} KB")
+        print(
+            f"  SessionLog, retention  json {json_kb(kept_log.to_json()):8.1f} KB   memory {kept_kb:8.1f} KB"
+            f"   ({len(kept_log)} sessions kept, days_total {kept_log.days_total},"
+            f" {write_us:.2f} us per write)"
+        )
+
+
+if __name__ == "__main__":
+    main()
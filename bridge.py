@@ -0,0 +1,120 @@
+"""
+Bridge - Typed Python API for the add-on's page scripts
+
+A single PanelBridge object is exposed to the OpenEvidence page over
+QWebChannel (in an isolated JavaScript world, so the site's own scripts can't
+reach it) and is also the target of the reviewer's pycmd messages. Each
+action is a typed slot instead of a string parsed out of console output.
+
+Actions that need the panel widget or the dock (showing overlays, opening
+the panel) are re-emitted as signals and connected by their owners.
+"""
+
+try:
+    from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+except ImportError:
+    from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from . import analytics
+from . import diagnostics
+from .tutorial import tutorial_event
+
+
+class PanelBridge(QObject):
+    """
+    Python endpoint for page JavaScript.
+
+    Signals:
+        add_context_requested(str): Reviewer asked to add text to the chat
+        ask_query_requested(str, str): Reviewer asked a question (query, context)
+        message_sent(): User sent a chat message in the panel
+        page_ready(): Panel page finished rendering
+        login_detected(): Panel page shows the signed-in UI
+    """
+
+    add_context_requested = pyqtSignal(str)
+    ask_query_requested = pyqtSignal(str, str)
+    message_sent = pyqtSignal()
+    page_ready = pyqtSignal()
+    login_detected = pyqtSignal()
+
+    # ---- Reviewer highlight bubble ----
+
+    @pyqtSlot(str)
+    def addContext(self, text):
+        """Add highlighted card text to the chat input."""
+        self.add_context_requested.emit(text)
+        self.tutorialEvent("text_highlighted")
+
+    @pyqtSlot(str, str)
+    def askQuery(self, query, context):
+        """Ask a question about highlighted card text and submit it."""
+        self.ask_query_requested.emit(query, context)
+        self.tutorialEvent("ask_question_submitted")
+
+    # ---- Shared ----
+
+    @pyqtSlot(str)
+    def tutorialEvent(self, event_name):
+        try:
+            tutorial_event(event_name)
+        except:
+            pass
+
+    # ---- Panel page ----
+
+    @pyqtSlot(int, result=str)
+    def cardText(self, index):
+        """Render template shortcut `index` for the current card."""
+        with diagnostics.timed("card_text_request_ms"):
+            try:
+                from .card_context import render_keybinding_text
+                text = render_keybinding_text(index)
+            except Exception as e:
+                print(f"OpenEvidence: Error rendering card text: {e}")
+                text = ""
+        return text
+
+    @pyqtSlot(str)
+    def templateUsed(self, keys):
+        """A template shortcut filled the chat input (keys joined with '+')."""
+        analytics.track_template_used()
+
+    @pyqtSlot()
+    def messageSent(self):
+        try:
+            analytics.track_message_sent()
+        except Exception as e:
+            print(f"AI Panel: Error in message tracking: {e}")
+        self.message_sent.emit()
+
+    @pyqtSlot(str)
+    def authButtonClicked(self, button_type):
+        """Sign up / Log in button clicked ("signup" or "login")."""
+        if button_type in ("signup", "login"):
+            analytics.track_auth_button_click(button_type)
+
+    @pyqtSlot()
+    def pageReady(self):
+        self.page_ready.emit()
+
+    @pyqtSlot()
+    def loggedIn(self):
+        self.login_detected.emit()
+
+
+# Singleton instance
+_panel_bridge = None
+
+
+def get_panel_bridge() -> PanelBridge:
+    """
+    Get the global PanelBridge singleton.
+
+    Returns:
+        PanelBridge instance
+    """
+    global _panel_bridge
+    if _panel_bridge is None:
+        _panel_bridge = PanelBridge()
+    return _panel_bridge
@@ -0,0 +1,211 @@
+"""
+Card Context - Lazy extraction of card text for templates
+
+Only the side that is currently showing is rendered and cleaned. Results are
+kept in a small LRU cache keyed by note revision and side, so the question
+text extracted on the front is reused when the answer is shown.
+
+The back text is split from the rendered answer deterministically, in order:
+1. Everything after Anki's <hr id=answer> divider
+2. Everything after the rendered front, when the answer starts with it ({{FrontSide}})
+3. The note fields that only the answer template references (not for cloze
+   cards: the revealed cloze is in a field the front uses too)
+4. Legacy fallback: text after the first occurrence of the front text
+"""
+
+import re
+from collections import OrderedDict
+
+from anki.consts import MODEL_CLOZE
+
+from . import diagnostics
+from .config_store import get_config
+from .utils import clean_html_text
+
+# A handful of entries covers the current card plus undo/redo back-and-forth
+CACHE_SIZE = 16
+
+QUESTION = "question"
+ANSWER = "answer"
+
+
+class CardTextCache:
+    """Small LRU cache of cleaned card text."""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_cache = CardTextCache()
+
+# Card currently shown in the reviewer. Flips only record it - text is
+# extracted when the panel asks for it
+_current_card = None
+_current_side = QUESTION
+
+
+# Anki's standard divider between {{FrontSide}} and the back content
+_ANSWER_DIVIDER_RE = re.compile(r'<hr[^>]*?\bid\s*=\s*["\']?answer\b[^>]*>', re.IGNORECASE)
+
+# {{Field}}, {{text:Field}}, {{#Field}} ... - captures the raw reference
+_FIELD_REF_RE = re.compile(r'{{([^}]+)}}')
+
+# A field rendered through the cloze filter ({{cloze:Text}}, {{text:cloze:Text}})
+_CLOZE_REF_RE = re.compile(r'{{[^}]*\bcloze:', re.IGNORECASE)
+
+
+def _cache_key(card, side):
+    # Edits bump the note mod time and template edits bump the note type's,
+    # so either invalidates the entry
+    note = card.note()
+    return (note.id, note.mod, card.ord, card.note_type().get("mod"), side)
+
+
+def get_question_text(card) -> str:
+    """Get the cleaned front text of a card (renders the question side only)."""
+    key = _cache_key(card, QUESTION)
+    text = _cache.get(key)
+    if text is None:
+        text = clean_html_text(card.question())
+        _cache.put(key, text)
+    return text
+
+
+def get_answer_text(card) -> str:
+    """Get the cleaned back text of a card, without the repeated front."""
+    key = _cache_key(card, ANSWER)
+    text = _cache.get(key)
+    if text is not None:
+        return text
+
+    text, mode = _split_back_text(card)
+    diagnostics.increment(f"card_back_split_{mode}")
+
+    _cache.put(key, text)
+    return text
+
+
+def _split_back_text(card):
+    """Extract just the back content. Returns (text, mode used)."""
+    answer_html = card.answer()
+
+    divider = _ANSWER_DIVIDER_RE.search(answer_html)
+    if divider:
+        return clean_html_text(answer_html[divider.end():]), "divider"
+
+    question_html = card.question()
+    if question_html and answer_html.startswith(question_html):
+        return clean_html_text(answer_html[len(question_html):]), "front_side"
+
+    back_fields = _answer_only_fields(card)
+    if back_fields:
+        note = card.note()
+        values = [clean_html_text(note[name]) for name in back_fields if name in note]
+        text = "\n".join(value for value in values if value)
+        if text:
+            return text, "fields"
+
+    # In Anki, the answer HTML usually includes the question ({{FrontSide}}),
+    # so strip everything up to the end of the question text
+    question_text = get_question_text(card)
+    full_answer_text = clean_html_text(answer_html)
+    if question_text and question_text in full_answer_text:
+        question_end = full_answer_text.find(question_text) + len(question_text)
+        return full_answer_text[question_end:].strip(), "substring"
+
+    # If we can't find the question in the answer, just use the full answer
+    return full_answer_text, "full"
+
+
+def _template_fields(template: str):
+    """Names of the note fields a card template references."""
+    names = []
+    for ref in _FIELD_REF_RE.findall(template or ""):
+        name = ref.strip().lstrip("#^/").split(":")[-1].strip()
+        if name and name != "FrontSide" and name not in names:
+            names.append(name)
+    return names
+
+
+def _answer_only_fields(card):
+    """
+    Fields shown on the back that the front template doesn't use.
+
+    Empty for cloze cards: the answer is the cloze field itself, which the
+    front references too, so the split falls through to the text modes.
+    """
+    try:
+        if card.note_type().get("type") == MODEL_CLOZE:
+            return []
+        template = card.template()
+    except Exception:
+        return []
+    question_format = template.get("qfmt", "")
+    answer_format = template.get("afmt", "")
+    if _CLOZE_REF_RE.search(question_format) or _CLOZE_REF_RE.search(answer_format):
+        return []
+    front_fields = set(_template_fields(question_format))
+    return [name for name in _template_fields(answer_format) if name not in front_fields]
+
+
+def set_current_card(card, side: str):
+    """Remember which card and side the reviewer is showing (no rendering)."""
+    global _current_card, _current_side
+    _current_card = card
+    _current_side = side
+
+
+def render_keybinding_text(index: int) -> str:
+    """
+    Render a template shortcut for the current card.
+
+    Only the sides the template actually references are extracted, and the
+    result is memoized per card revision, side and template.
+    """
+    keybindings = get_config().keybindings
+    card = _current_card
+    if card is None or not 0 <= index < len(keybindings):
+        return ""
+
+    kb = keybindings[index]
+    showing_answer = _current_side == ANSWER
+    template = kb.answer_template if showing_answer else kb.question_template
+
+    key = _cache_key(card, _current_side) + (template,)
+    text = _cache.get(key)
+    if text is not None:
+        return text
+
+    text = template
+    if "{front}" in text:
+        text = text.replace("{front}", get_question_text(card))
+    if showing_answer and "{back}" in text:
+        text = text.replace("{back}", get_answer_text(card))
+
+    _cache.put(key, text)
+    return text
+
+
+def get_cache() -> CardTextCache:
+    """Get the shared card text cache (for diagnostics)."""
+    return _cache
@@ -0,0 +1,301 @@
+"""
+Config Store - Cached, typed access to the add-on config
+
+Anki re-reads meta.json from disk on every getConfig() call. This module
+loads the config once and serves immutable snapshots from memory. Writes go
+through the store, replace the snapshot in one step and emit a `changed`
+signal carrying the set of keys whose values actually changed, so listeners
+(panel JS, reviewer bubble) only re-push what they depend on.
+"""
+
+import copy
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from aqt import mw
+
+try:
+    from PyQt6.QtCore import QObject, pyqtSignal
+except ImportError:
+    from PyQt5.QtCore import QObject, pyqtSignal
+
+from .utils import ADDON_NAME
+
+
+# Defaults used when the config has no keybindings
+DEFAULT_KEYBINDINGS = [
+    {
+        "name": "Standard Explain",
+        "keys": ["Control", "Shift", "S"],
+        "question_template": "Can you explain this to me:\n\n{front}",
+        "answer_template": "Can you explain this to me:\n\nQuestion:\n{front}\n\nAnswer:\n{back}"
+    },
+    {
+        "name": "Front/Back",
+        "keys": ["Control", "Shift", "Q"],
+        "question_template": "{front}",
+        "answer_template": "{front}"
+    },
+    {
+        "name": "Back Only",
+        "keys": ["Control", "Shift", "A"],
+        "question_template": "",
+        "answer_template": "{back}"
+    }
+]
+
+# Panel preloading: "eager" (load at startup), "lazy" (on first open) or
+# "adaptive" (decided from recent usage, see preload_policy)
+DEFAULT_PRELOAD_MODE = "adaptive"
+PRELOAD_MODES = ("eager", "lazy", "adaptive")
+
+# Hidden-panel page lifecycle (seconds; 0 disables), see page_lifecycle
+DEFAULT_LIFECYCLE_FREEZE_AFTER_S = 120
+DEFAULT_LIFECYCLE_DISCARD_AFTER_S = 1800
+
+# HTTP cache cap for the panel's web profile, see webengine_storage
+DEFAULT_HTTP_CACHE_MAX_MB = 50
+
+# Third-party hosts the panel page may not load from (subdomains included),
+# and exceptions to them, see request_filter
+DEFAULT_REQUEST_BLOCK_LIST = [
+    "google-analytics.com",
+    "analytics.google.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "connect.facebook.net",
+    "bat.bing.com",
+    "clarity.ms",
+    "px.ads.linkedin.com",
+    "snap.licdn.com",
+    "hotjar.com",
+    "segment.io",
+    "cdn.segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "js.driftt.com",
+    "fonts.googleapis.com",
+    "fonts.gstatic.com",
+    "use.typekit.net"
+]
+DEFAULT_REQUEST_ALLOW_LIST = [
+    "openevidence.com"
+]
+
+DEFAULT_QUICK_ACTIONS = {
+    "add_to_chat": {"keys": ["Meta", "F"]},
+    "ask_question": {"keys": ["Meta", "R"]}
+}
+
+
+@dataclass(frozen=True)
+class Keybinding:
+    """A single template shortcut."""
+    name: str
+    keys: Tuple[str, ...]
+    question_template: str
+    answer_template: str
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Keybinding":
+        return cls(
+            name=data.get("name", ""),
+            keys=tuple(data.get("keys", [])),
+            question_template=data.get("question_template", ""),
+            answer_template=data.get("answer_template", ""),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "keys": list(self.keys),
+            "question_template": self.question_template,
+            "answer_template": self.answer_template,
+        }
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Immutable view of the add-on config at a given revision.
+
+    Frequently used settings are exposed as typed attributes. Anything else
+    can be read with get(), which returns a copy so callers can't mutate
+    the cached state.
+    """
+    revision: int
+    keybindings: Tuple[Keybinding, ...]
+    quick_actions: Mapping[str, Tuple[str, ...]]
+    width: int
+    onboarding_completed: bool
+    tutorial_completed: bool
+    analytics_endpoint: Optional[str]
+    preload_mode: str
+    lifecycle_freeze_after_s: int
+    lifecycle_discard_after_s: int
+    http_cache_max_mb: int
+    request_blocking_enabled: bool
+    request_block_list: Tuple[str, ...]
+    request_allow_list: Tuple[str, ...]
+    _raw: Mapping[str, Any]
+
+    @classmethod
+    def from_dict(cls, config: Dict, revision: int) -> "ConfigSnapshot":
+        raw = copy.deepcopy(config)
+
+        keybindings = raw.get("keybindings") or DEFAULT_KEYBINDINGS
+        quick_actions = raw.get("quick_actions") or DEFAULT_QUICK_ACTIONS
+        preload_mode = raw.get("preload_mode")
+        if preload_mode not in PRELOAD_MODES:
+            preload_mode = DEFAULT_PRELOAD_MODE
+
+        return cls(
+            revision=revision,
+            keybindings=tuple(Keybinding.from_dict(kb) for kb in keybindings),
+            quick_actions=MappingProxyType({
+                name: tuple(action.get("keys", []))
+                for name, action in quick_actions.items()
+            }),
+            width=raw.get("width", 500),
+            onboarding_completed=raw.get("onboarding_completed", False),
+            tutorial_completed=raw.get("tutorial_completed", False),
+            analytics_endpoint=raw.get("analytics_endpoint"),
+            preload_mode=preload_mode,
+            lifecycle_freeze_after_s=raw.get("lifecycle_freeze_after_s", DEFAULT_LIFECYCLE_FREEZE_AFTER_S),
+            lifecycle_discard_after_s=raw.get("lifecycle_discard_after_s", DEFAULT_LIFECYCLE_DISCARD_AFTER_S),
+            http_cache_max_mb=raw.get("http_cache_max_mb", DEFAULT_HTTP_CACHE_MAX_MB),
+            request_blocking_enabled=raw.get("request_blocking_enabled", True),
+            request_block_list=tuple(raw.get("request_block_list", DEFAULT_REQUEST_BLOCK_LIST)),
+            request_allow_list=tuple(raw.get("request_allow_list", DEFAULT_REQUEST_ALLOW_LIST)),
+            _raw=MappingProxyType(raw),
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a copy of any config value."""
+        return copy.deepcopy(self._raw.get(key, default))
+
+    def to_dict(self) -> Dict:
+        """Get a mutable deep copy of the whole config."""
+        return copy.deepcopy(dict(self._raw))
+
+    def keybinding_dicts(self):
+        """Get keybindings as a list of plain (mutable) dicts."""
+        return [kb.to_dict() for kb in self.keybindings]
+
+    def quick_action_keys(self, action: str) -> Tuple[str, ...]:
+        return self.quick_actions.get(action, tuple(DEFAULT_QUICK_ACTIONS[action]["keys"]))
+
+
+class ConfigStore(QObject):
+    """
+    Single owner of the add-on config.
+
+    Signals:
+        changed(frozenset): Emitted after a write or external reload with the
+            names of the top-level keys whose values changed.
+    """
+
+    changed = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._revision = 0
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Return the current config snapshot (loaded from disk once)."""
+        if self._snapshot is None:
+            config = mw.addonManager.getConfig(ADDON_NAME) or {}
+            self._snapshot = ConfigSnapshot.from_dict(config, self._revision)
+        return self._snapshot
+
+    def update(self, **changes) -> FrozenSet[str]:
+        """
+        Write one or more top-level keys through to disk.
+
+        The new snapshot only replaces the old one after the write succeeds.
+
+        Returns:
+            frozenset of keys whose values actually changed
+        """
+        current = self.snapshot()
+        config = current.to_dict()
+        changed_keys = frozenset(
+            key for key, value in changes.items() if current._raw.get(key) != value
+        )
+        if not changed_keys:
+            return changed_keys
+
+        for key in changed_keys:
+            config[key] = copy.deepcopy(changes[key])
+
+        mw.addonManager.writeConfig(ADDON_NAME, config)
+        self._install(config, changed_keys)
+        return changed_keys
+
+    def remove(self, *keys: str) -> FrozenSet[str]:
+        """Delete top-level keys from the config (used by one-time migrations)."""
+        current = self.snapshot()
+        config = current.to_dict()
+        removed_keys = frozenset(key for key in keys if key in config)
+        if not removed_keys:
+            return removed_keys
+
+        for key in removed_keys:
+            del config[key]
+
+        mw.addonManager.writeConfig(ADDON_NAME, config)
+        self._install(config, removed_keys)
+        return removed_keys
+
+    def reload(self, config: Optional[Dict] = None):
+        """Re-read the config (e.g. after the user edits it in Anki's config dialog)."""
+        if config is None:
+            config = mw.addonManager.getConfig(ADDON_NAME) or {}
+
+        old = self.snapshot()._raw
+        changed_keys = frozenset(
+            key for key in set(old) | set(config) if old.get(key) != config.get(key)
+        )
+        if changed_keys:
+            self._install(config, changed_keys)
+
+    def _install(self, config: Dict, changed_keys: FrozenSet[str]):
+        self._revision += 1
+        self._snapshot = ConfigSnapshot.from_dict(config, self._revision)
+        self.changed.emit(changed_keys)
+
+
+# Singleton instance
+_config_store = None
+
+
+def get_config_store() -> ConfigStore:
+    """
+    Get the global ConfigStore singleton.
+
+    Returns:
+        ConfigStore instance
+    """
+    global _config_store
+    if _config_store is None:
+        _config_store = ConfigStore()
+    return _config_store
+
+
+def get_config() -> ConfigSnapshot:
+    """Shortcut for get_config_store().snapshot()."""
+    return get_config_store().snapshot()
+
+
+def setup_config_store_hooks():
+    """Pick up edits made through Tools > Add-ons > Config."""
+    def on_config_updated(config):
+        get_config_store().reload(config)
+
+    mw.addonManager.setConfigUpdatedAction(ADDON_NAME, on_config_updated)
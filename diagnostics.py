@@ -0,0 +1,115 @@
+"""
+Diagnostics - Lightweight in-memory performance counters
+
+Modules record timings, counters and values here so they can be inspected
+at runtime without adding I/O to hot paths. Nothing in this module is
+persisted or sent anywhere.
+"""
+
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+_counters: Dict[str, int] = {}
+_timings: Dict[str, Dict[str, float]] = {}
+_samples: Dict[str, Dict[str, float]] = {}
+_values: Dict[str, Any] = {}
+
+
+def increment(name: str, amount: int = 1):
+    """Increment a named counter."""
+    _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_value(name: str, value: Any):
+    """Record the latest value of a named metric."""
+    _values[name] = value
+
+
+def record_timing(name: str, ms: float):
+    """Record one duration sample (in milliseconds) for a named timing."""
+    stats = _timings.get(name)
+    if stats is None:
+        stats = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+        _timings[name] = stats
+    stats["count"] += 1
+    stats["total_ms"] += ms
+    stats["last_ms"] = ms
+    if ms > stats["max_ms"]:
+        stats["max_ms"] = ms
+
+
+def record_sample(name: str, value: float):
+    """Record one sample of a non-time quantity (e.g. bytes per card)."""
+    stats = _samples.get(name)
+    if stats is None:
+        stats = {"count": 0, "total": 0, "max": 0, "last": 0}
+        _samples[name] = stats
+    stats["count"] += 1
+    stats["total"] += value
+    stats["last"] = value
+    if value > stats["max"]:
+        stats["max"] = value
+
+
+class timed:
+    """
+    Context manager that records how long a block took.
+
+    Usage:
+        with diagnostics.timed("card_text_request_ms"):
+            ...
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_timing(self.name, (time.perf_counter() - self._start) * 1000)
+        return False
+
+
+def resident_memory_mb(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Best-effort resident set size of a process in MB (default: Anki itself).
+
+    Uses /proc where available (any pid). Elsewhere only the current process
+    can be measured, via its peak RSS; returns None if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if pid is not None:
+        return None
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
+
+
+def snapshot() -> Dict[str, Any]:
+    """Get a copy of all recorded metrics."""
+    timings = {}
+    for name, stats in _timings.items():
+        timings[name] = dict(stats, avg_ms=stats["total_ms"] / stats["count"])
+    samples = {}
+    for name, stats in _samples.items():
+        samples[name] = dict(stats, avg=stats["total"] / stats["count"])
+    return {
+        "counters": dict(_counters),
+        "timings": timings,
+        "samples": samples,
+        "values": dict(_values),
+    }
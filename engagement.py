@@ -0,0 +1,154 @@
+"""
+Engagement - In-memory engagement counters for referral/review eligibility
+
+Every sent message checks whether the referral or review overlay should
+show. Both checks used to read the config and recount days active and
+today's messages. This service keeps those numbers up to date as sessions
+and messages are tracked (see analytics), caches the thresholds until the
+config changes, and answers eligibility with a few comparisons.
+
+Counters are seeded once from the analytics session log on first use. The
+update methods are called after the store has recorded the change, so the
+call that seeds the counters doesn't apply its change a second time.
+"""
+
+from datetime import date
+from typing import Optional
+
+from .analytics_store import get_analytics_store
+from .config_store import get_config, get_config_store
+
+THRESHOLD_KEYS = (
+    "referral_days_threshold",
+    "referral_threshold",
+    "review_days_threshold",
+    "review_message_threshold",
+)
+
+
+def _today() -> str:
+    return date.today().isoformat()
+
+
+class EngagementMetrics:
+    """
+    days_active / messages_today plus the eligibility rules that use them.
+    """
+
+    def __init__(self):
+        self._loaded = False
+        self.days_active = 0
+        self.messages_today = 0
+        self._today: Optional[str] = None
+        self._last_active_day: Optional[str] = None
+        self.has_shown_referral = False
+        self.has_shown_review = False
+
+        self.referral_days = 3
+        self.referral_messages = 4
+        self.review_days = 8
+        self.review_messages = 3
+        self._load_thresholds()
+        get_config_store().changed.connect(self.on_config_changed)
+
+    # ---- Updates (called from analytics) ----
+
+    def session_started(self, day: str):
+        if self._ensure_loaded():
+            return
+        if day != self._last_active_day:
+            self._last_active_day = day
+            self.days_active += 1
+        self._roll_day(day)
+
+    def message_sent(self, day: str):
+        if self._ensure_loaded():
+            return
+        self._roll_day(day)
+        self.messages_today += 1
+
+    def mark_shown(self, overlay: str):
+        """Record that the "referral" or "review" overlay was shown."""
+        self._ensure_loaded()
+        if overlay == "referral":
+            self.has_shown_referral = True
+        elif overlay == "review":
+            self.has_shown_review = True
+
+    def reload(self):
+        """Re-seed the counters from the analytics store (e.g. after it was replaced)."""
+        self._loaded = False
+
+    # ---- Eligibility ----
+
+    def referral_eligible(self) -> bool:
+        """Days active and today's messages reached the referral thresholds, not shown yet."""
+        self._ensure_loaded()
+        self._roll_day(_today())
+        return (
+            not self.has_shown_referral
+            and self.days_active >= self.referral_days
+            and self.messages_today >= self.referral_messages
+        )
+
+    def review_eligible(self) -> bool:
+        """Referral already shown, review not yet, and the review thresholds reached."""
+        self._ensure_loaded()
+        self._roll_day(_today())
+        return (
+            self.has_shown_referral
+            and not self.has_shown_review
+            and self.days_active >= self.review_days
+            and self.messages_today >= self.review_messages
+        )
+
+    # ---- Internals ----
+
+    def on_config_changed(self, changed_keys):
+        if changed_keys & set(THRESHOLD_KEYS):
+            self._load_thresholds()
+
+    def _load_thresholds(self):
+        config = get_config()
+        self.referral_days = config.get("referral_days_threshold", 3)
+        self.referral_messages = config.get("referral_threshold", 4)
+        self.review_days = config.get("review_days_threshold", 8)
+        self.review_messages = config.get("review_message_threshold", 3)
+
+    def _roll_day(self, day: str):
+        if day != self._today:
+            self._today = day
+            self.messages_today = 0
+
+    def _ensure_loaded(self) -> bool:
+        """Seed the counters from the store if needed. Returns True if it just did."""
+        if self._loaded:
+            return False
+        self._loaded = True
+        store = get_analytics_store()
+        sessions = store.sessions()
+        today = _today()
+        self.days_active = sessions.days_total
+        self._last_active_day = sessions.last_day()
+        self._today = today
+        self.messages_today = sessions.messages_on(today)
+        self.has_shown_referral = bool(store.get("has_shown_referral", False))
+        self.has_shown_review = bool(store.get("has_shown_review", False))
+        return True
+
+
+# Singleton instance
+_engagement = None
+
+
+def get_engagement() -> EngagementMetrics:
+    """
+    Get the global EngagementMetrics singleton.
+
+    Returns:
+        EngagementMetrics instance
+    """
+    global _engagement
+    if _engagement is None:
+        _engagement = EngagementMetrics()
+    return _engagement
@@ -0,0 +1,104 @@
+"""
+Loading Spinner - Native "rolling dots" loader shown while the panel page loads
+
+Painted with QPainter and driven by a QVariantAnimation, so showing a loader
+doesn't cost a second QWebEngineView (and its Chromium renderer). The motion
+matches the CSS animation it replaces: four dots roll in from the left, hold
+in a row, and roll out to the right over two seconds.
+"""
+
+from bisect import bisect_right
+
+try:
+    from PyQt6.QtWidgets import QWidget
+    from PyQt6.QtCore import Qt, QVariantAnimation, QRectF
+    from PyQt6.QtGui import QPainter, QColor
+except ImportError:
+    from PyQt5.QtWidgets import QWidget
+    from PyQt5.QtCore import Qt, QVariantAnimation, QRectF
+    from PyQt5.QtGui import QPainter, QColor
+
+from .theme_manager import ThemeManager
+
+CYCLE_MS = 2000
+DOT_SIZE = 10
+
+# Keyframe positions (fraction of a cycle) and, per dot, (x offset, opacity)
+# at each keyframe; a dot enters at offset 0 fully transparent and leaves
+# toward offset 200 fading out, exactly as the old box-shadow keyframes
+_KEYFRAMES = (0.0, 0.12, 0.25, 0.36, 0.50, 0.62, 0.75, 0.87, 1.0)
+_DOT_TRACKS = (
+    ((0, 0), (100, 1), (110, 1), (120, 1), (130, 1), (200, 0), (200, 0), (200, 0), (200, 0)),
+    ((0, 0), (0, 0), (100, 1), (110, 1), (120, 1), (130, 1), (200, 0), (200, 0), (200, 0)),
+    ((0, 0), (0, 0), (0, 0), (100, 1), (110, 1), (120, 1), (130, 1), (200, 0), (200, 0)),
+    ((0, 0), (0, 0), (0, 0), (0, 0), (100, 1), (110, 1), (120, 1), (130, 1), (200, 0)),
+)
+
+# The dots travel from -100px to +30px around the centre of the widget
+_TRACK_ORIGIN = -100
+
+
+class LoadingSpinner(QWidget):
+    """
+    Full-size loader in the theme palette.
+
+    The animation only runs while the widget is visible.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._progress = 0.0
+        self._background = QColor()
+        self._dot_color = QColor()
+        self._apply_theme()
+
+        self._animation = QVariantAnimation(self)
+        self._animation.setStartValue(0.0)
+        self._animation.setEndValue(1.0)
+        self._animation.setDuration(CYCLE_MS)
+        self._animation.setLoopCount(-1)
+        self._animation.valueChanged.connect(self._on_progress)
+
+    def _apply_theme(self):
+        c = ThemeManager.get_palette()
+        self._background = QColor(c['background'])
+        # Text color so the dots are visible on white
+        self._dot_color = QColor(c['text'])
+
+    def _on_progress(self, value):
+        self._progress = value
+        self.update()
+
+    def showEvent(self, event):
+        # Pick up theme changes made while hidden
+        self._apply_theme()
+        self._animation.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._animation.stop()
+        super().hideEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self._background)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+
+        segment = min(bisect_right(_KEYFRAMES, self._progress) - 1, len(_KEYFRAMES) - 2)
+        start, end = _KEYFRAMES[segment], _KEYFRAMES[segment + 1]
+        t = (self._progress - start) / (end - start)
+
+        center_x = self.width() / 2 - DOT_SIZE / 2 + _TRACK_ORIGIN
+        top = self.height() / 2 - DOT_SIZE / 2
+        for track in _DOT_TRACKS:
+            (x0, a0), (x1, a1) = track[segment], track[segment + 1]
+            opacity = a0 + (a1 - a0) * t
+            if opacity <= 0:
+                continue
+            color = QColor(self._dot_color)
+            color.setAlphaF(opacity)
+            painter.setBrush(color)
+            x = x0 + (x1 - x0) * t
+            painter.drawEllipse(QRectF(center_x + x, top, DOT_SIZE, DOT_SIZE))
+        painter.end()
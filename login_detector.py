@@ -0,0 +1,109 @@
+"""
+Login Detector - Event-driven detection of an OpenEvidence login
+
+Two sources, whichever fires first:
+- The profile's cookie store: an auth/session cookie for openevidence.com
+  (persisted cookies are replayed once at startup via loadAllCookies)
+- The page API's login watcher (see panel_js): a throttled MutationObserver
+  that looks for signed-in UI without serializing the page text
+
+Detection is reported once, after which both sources are disconnected.
+Nothing runs at all for users who are already known to be logged in.
+"""
+
+import re
+
+try:
+    from PyQt6.QtCore import QObject, pyqtSignal
+except ImportError:
+    from PyQt5.QtCore import QObject, pyqtSignal
+
+from . import diagnostics
+
+LOGIN_DOMAIN = "openevidence.com"
+
+# Cookie names that only exist for a signed-in user (Auth0 appSession,
+# NextAuth session-token, Supabase sb-*-auth-token, raw OAuth tokens)
+_AUTH_COOKIE_RE = re.compile(
+    r'appsession|session[-_.]?token|auth[-_.]?token|access[-_.]?token|id[-_.]?token|refresh[-_.]?token',
+    re.IGNORECASE
+)
+
+
+def is_auth_cookie(name: str, domain: str) -> bool:
+    """Check whether a cookie indicates a signed-in OpenEvidence session."""
+    host = domain.lower().lstrip(".")
+    if host != LOGIN_DOMAIN and not host.endswith("." + LOGIN_DOMAIN):
+        return False
+    if "csrf" in name.lower():
+        return False
+    return bool(_AUTH_COOKIE_RE.search(name))
+
+
+class LoginDetector(QObject):
+    """
+    Reports a login once, from cookie or page events.
+
+    Signals:
+        logged_in(): Emitted the first time a login is detected.
+    """
+
+    logged_in = pyqtSignal()
+
+    def __init__(self, profile=None, parent=None):
+        super().__init__(parent)
+        self._profile = profile
+        self._cookie_store = None
+        self.reported = False
+
+    def start(self) -> bool:
+        """
+        Begin listening, unless the user is already known to be logged in.
+
+        Returns:
+            True if the detector is active
+        """
+        from .analytics import is_user_logged_in
+        if is_user_logged_in():
+            self.reported = True
+            return False
+
+        if self._profile is not None:
+            try:
+                self._cookie_store = self._profile.cookieStore()
+                self._cookie_store.cookieAdded.connect(self._on_cookie_added)
+                # Replays persisted cookies through cookieAdded
+                self._cookie_store.loadAllCookies()
+            except Exception as e:
+                self._cookie_store = None
+                print(f"AI Panel: Could not watch cookies for login: {e}")
+        return True
+
+    def report(self, source: str):
+        """Record a detected login (source: "cookie" or "page")."""
+        if self.reported:
+            return
+        self.reported = True
+        self._disconnect_cookies()
+
+        from .analytics import track_login_detected
+        track_login_detected()
+        diagnostics.increment(f"login_detected_{source}")
+        self.logged_in.emit()
+
+    def _on_cookie_added(self, cookie):
+        try:
+            name = bytes(cookie.name()).decode("utf-8", errors="ignore")
+            domain = cookie.domain() or ""
+        except Exception:
+            return
+        if is_auth_cookie(name, domain):
+            self.report("cookie")
+
+    def _disconnect_cookies(self):
+        if self._cookie_store is not None:
+            try:
+                self._cookie_store.cookieAdded.disconnect(self._on_cookie_added)
+            except Exception:
+                pass
+            self._cookie_store = None
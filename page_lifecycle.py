@@ -0,0 +1,161 @@
+"""
+Page Lifecycle - Freeze and discard the panel page while the dock is hidden
+
+A hidden panel doesn't need a live page. After `lifecycle_freeze_after_s`
+hidden the page is Frozen (scripts and timers stop, memory stays), and after
+`lifecycle_discard_after_s` it is Discarded (the renderer drops the page and
+its memory). Showing the panel makes the page Active again; a discarded page
+reloads at the URL it was on and the unsent draft in the chat box is put back.
+
+Needs Qt 5.14+ (QWebEnginePage.setLifecycleState); on older Qt this is a no-op.
+"""
+
+try:
+    from PyQt6.QtCore import QObject, QTimer, QUrl, pyqtSignal
+    from PyQt6.QtWebEngineCore import QWebEnginePage
+except ImportError:
+    from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+    from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+from . import diagnostics
+from .panel_js import call_js, PANEL_WORLD_ID
+
+# Measure memory this long after a state change, once the renderer has let go
+MEMORY_SETTLE_MS = 3000
+
+
+def _lifecycle_state(name):
+    """QWebEnginePage.LifecycleState member by name (None if unsupported)."""
+    states = getattr(QWebEnginePage, "LifecycleState", None)
+    return getattr(states, name, None) if states is not None else None
+
+
+class PageLifecycle(QObject):
+    """
+    Drives one page through Active -> Frozen -> Discarded while hidden.
+
+    Signals:
+        restoring(): A discarded page is reloading on show (show a loader)
+    """
+
+    restoring = pyqtSignal()
+
+    def __init__(self, page, freeze_after_s, discard_after_s, parent=None):
+        super().__init__(parent)
+        self._page = page
+        self._freeze_after_ms = int(freeze_after_s * 1000)
+        self._discard_after_ms = int(discard_after_s * 1000)
+        self._saved_url = None
+        self._saved_draft = None
+        self._pending_draft = None
+        self._hidden = False
+
+        self.supported = (
+            hasattr(page, "setLifecycleState") and _lifecycle_state("Frozen") is not None
+        )
+
+        self._freeze_timer = QTimer(self)
+        self._freeze_timer.setSingleShot(True)
+        self._freeze_timer.timeout.connect(self._freeze)
+        self._discard_timer = QTimer(self)
+        self._discard_timer.setSingleShot(True)
+        self._discard_timer.timeout.connect(self._discard)
+
+    @property
+    def state(self) -> str:
+        """Current state: "active", "frozen" or "discarded"."""
+        if not self.supported:
+            return "active"
+        current = self._page.lifecycleState()
+        if current == _lifecycle_state("Discarded"):
+            return "discarded"
+        if current == _lifecycle_state("Frozen"):
+            return "frozen"
+        return "active"
+
+    def page_hidden(self):
+        """The page is no longer visible - start the idle countdown."""
+        self._hidden = True
+        if not self.supported or self._freeze_after_ms <= 0:
+            return
+        if self.state == "active" and not self._freeze_timer.isActive():
+            self._freeze_timer.start(self._freeze_after_ms)
+
+    def page_shown(self):
+        """The page is visible again - bring it back to Active."""
+        self._hidden = False
+        self._freeze_timer.stop()
+        self._discard_timer.stop()
+        if not self.supported:
+            return
+
+        state = self.state
+        if state == "active":
+            return
+
+        diagnostics.increment(f"lifecycle_restore_{state}")
+        if state == "discarded":
+            self._pending_draft = self._saved_draft
+            self.restoring.emit()
+        self._page.setLifecycleState(_lifecycle_state("Active"))
+
+        # Active reloads a discarded page at its last URL; load it ourselves
+        # if the URL was lost
+        if state == "discarded" and self._saved_url and self._page.url().isEmpty():
+            self._page.load(QUrl(self._saved_url))
+        diagnostics.set_value("lifecycle_state", "active")
+
+    def take_pending_draft(self):
+        """Draft to put back once the reloaded page is ready (returned once)."""
+        draft, self._pending_draft = self._pending_draft, None
+        return draft
+
+    def _freeze(self):
+        """Save the URL and draft while scripts still run, then freeze."""
+        self._saved_url = self._page.url().toString()
+
+        def on_draft(draft):
+            self._saved_draft = draft or None
+            # Shown again while the draft was being read
+            if not self._hidden:
+                return
+            self._set_state("Frozen", "frozen")
+            if self._discard_after_ms > self._freeze_after_ms:
+                self._discard_timer.start(self._discard_after_ms - self._freeze_after_ms)
+
+        try:
+            self._page.runJavaScript(call_js("getDraft"), PANEL_WORLD_ID, on_draft)
+        except Exception:
+            on_draft(None)
+
+    def _discard(self):
+        if not self._hidden or self.state != "frozen":
+            return
+        self._set_state("Discarded", "discarded")
+
+    def _set_state(self, name, label):
+        before = self._memory_mb()
+        self._page.setLifecycleState(_lifecycle_state(name))
+        diagnostics.increment(f"lifecycle_{label}")
+        diagnostics.set_value("lifecycle_state", label)
+
+        def record_freed():
+            after = self._memory_mb()
+            if before is not None and after is not None:
+                freed = max(before - after, 0.0)
+                diagnostics.record_sample(f"lifecycle_{label}_freed_mb", round(freed, 1))
+        QTimer.singleShot(MEMORY_SETTLE_MS, record_freed)
+
+    def _memory_mb(self):
+        """Renderer plus Anki resident memory (a discarded renderer counts as 0)."""
+        anki_mb = diagnostics.resident_memory_mb()
+        if anki_mb is None:
+            return None
+        renderer_mb = 0.0
+        try:
+            pid = self._page.renderProcessPid()
+            if pid:
+                renderer_mb = diagnostics.resident_memory_mb(pid) or 0.0
+        except AttributeError:
+            pass
+        return anki_mb + renderer_mb
@@ -1,10 +1,10 @@
-import json
+import time
 import webbrowser
-from aqt import mw
 from aqt.qt import *
 
 from aqt.qt import *
-from .utils import ADDON_NAME
+from .config_store import get_config, get_config_store
+from . import diagnostics
 
 try:
     from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
@@ -40,69 +40,28 @@ except ImportError:
 
 from .settings import SettingsHomeView, SettingsListView, SettingsEditorView
 from .theme_manager import ThemeManager
-import os
+from .panel_js import call_js, install_panel_api, PANEL_WORLD_ID, BRIDGE_OBJECT_NAME
+from .login_detector import LoginDetector
+from .loading_spinner import LoadingSpinner
+from .bridge import get_panel_bridge
+from .preload_policy import get_preload_tracker
+from .page_lifecycle import PageLifecycle
+from .webengine_storage import prepare_storage, get_cache_path
+from .request_filter import install_request_filter, get_request_filter
+from .action_queue import ActionQueue
+from .engagement import get_engagement
 
+try:
+    from PyQt6.QtWebChannel import QWebChannel
+except ImportError:
+    try:
+        from PyQt5.QtWebChannel import QWebChannel
+    except ImportError:
+        QWebChannel = None
 
-# Custom WebEnginePage to intercept console messages for tutorial events
-class TutorialAwarePage(QWebEnginePage):
-    """Custom page that intercepts JavaScript console messages to trigger tutorial events"""
 
-    def javaScriptConsoleMessage(self, level, message, lineNumber, sourceID):
-        """Override to catch special tutorial messages from JavaScript"""
-        # Check for our special tutorial trigger messages
-        if message == "ANKI_TUTORIAL:shortcut_used":
-            try:
-                from .tutorial import tutorial_event
-                tutorial_event("shortcut_used")
-            except:
-                pass
-        # Track template usage (any template)
-        elif message.startswith("ANKI_ANALYTICS:template_used"):
-            try:
-                from .analytics import track_template_used
-                track_template_used()
-            except:
-                pass
-        elif message == "ANKI_TUTORIAL:template_used":
-            try:
-                from .tutorial import tutorial_event
-                tutorial_event("template_used")
-            except:
-                pass
-        # Check for auth button click tracking
-        elif message == "ANKI_ANALYTICS:signup_clicked":
-            try:
-                from .analytics import track_auth_button_click
-                track_auth_button_click("signup")
-            except:
-                pass
-        elif message == "ANKI_ANALYTICS:login_clicked":
-            try:
-                from .analytics import track_auth_button_click
-                track_auth_button_click("login")
-            except:
-                pass
-        # Track when user sends a message in the chat
-        elif message == "ANKI_ANALYTICS:message_sent":
-            try:
-                from .analytics import track_message_sent
-                track_message_sent()
-                
-                # Check if we should show referral overlay (after tracking message)
-                from .referral import show_referral_overlay_if_eligible
-                # Check if we should show review overlay (after referral)
-                from .review import show_review_overlay_if_eligible
-                # Use QTimer to show overlay after JS processing completes
-                from aqt.qt import QTimer
-                # Get the parent OpenEvidencePanel widget
-                panel = self.parent()
-                if panel:
-                    # Try referral first, then review (only one will show based on eligibility)
-                    QTimer.singleShot(500, lambda: show_referral_overlay_if_eligible(panel) or show_review_overlay_if_eligible(panel))
-            except Exception as e:
-                print(f"AI Panel: Error in message tracking: {e}")
-        # Call parent implementation for normal logging
-        super().javaScriptConsoleMessage(level, message, lineNumber, sourceID)
+# Give up waiting for the page's ready signal after this long
+PAGE_READY_TIMEOUT_MS = 30000
 
 
 # Global persistent profile - must be kept alive for the entire session
@@ -134,18 +93,28 @@ def get_persistent_profile():
             except:
                 pass
 
-        # Set explicit storage paths to ensure persistence
+        # Set explicit storage paths to ensure persistence (outside the add-on
+        # folder, migrated and trimmed before Chromium opens it)
         try:
-            addon_dir = os.path.dirname(os.path.abspath(__file__))
-            storage_path = os.path.join(addon_dir, "webengine_data")
-            os.makedirs(storage_path, exist_ok=True)
+            max_cache_mb = get_config().http_cache_max_mb
+            storage_path = prepare_storage(max_cache_mb)
 
             # Set persistent storage path for cookies and other data
             _persistent_profile.setPersistentStoragePath(storage_path)
-            _persistent_profile.setCachePath(os.path.join(storage_path, "cache"))
-        except:
+            _persistent_profile.setCachePath(get_cache_path(storage_path))
+            _persistent_profile.setHttpCacheMaximumSize(max_cache_mb * 1024 * 1024)
+        except Exception as e:
             # If setting custom paths fails, continue with default paths
-            pass
+            print(f"OpenEvidence: Could not set up web storage: {e}")
+
+        # Drop analytics, fonts and widgets the panel doesn't need
+        try:
+            install_request_filter(_persistent_profile)
+        except Exception as e:
+            print(f"OpenEvidence: Could not install request filter: {e}")
+
+        # Page-side API, present from document creation on every load
+        install_panel_api(_persistent_profile.scripts())
 
         return _persistent_profile
     except Exception as e:
@@ -403,26 +372,48 @@ class OpenEvidencePanel(QWidget):
         web_layout = QVBoxLayout(self.web_container)
         web_layout.setContentsMargins(0, 0, 0, 0)
 
-        # Create loading overlay first (so it's on top in z-order)
-        # Create loading overlay first (so it's on top in z-order)
-        self.loading_overlay = QWebEngineView(self.web_container)
-        
-        # Use ThemeManager for style
-        c = ThemeManager.get_palette()
-        self.loading_overlay.setStyleSheet(f"QWebEngineView {{ background: {c['background']}; }}")
-        
-        # Loading HTML with rolling dots animation (dynamically colored)
-        self.loading_overlay.setHtml(ThemeManager.get_loading_html())
-        
+        # Create loading overlay first (so it's on top in z-order) - a native
+        # painted widget, not a second web view
+        self.loading_overlay = LoadingSpinner(self.web_container)
+
         # Create web view for OpenEvidence
         self.web = QWebEngineView(self.web_container)
 
         # Set up persistent profile for cookies/session storage
         persistent_profile = get_persistent_profile()
+
+        # Login detection from cookie and page events (no periodic checks)
+        self.login_detector = LoginDetector(persistent_profile, self)
+        self.login_detector.logged_in.connect(lambda: self.run_panel_api("stopLoginWatch"))
+        self.login_detector.start()
         if persistent_profile and QWebEnginePage:
-            # Create a custom page with the persistent profile that can intercept console messages
-            page = TutorialAwarePage(persistent_profile, self.web)
-            self.web.setPage(page)
+            # Create a page with the persistent profile
+            self.web.setPage(QWebEnginePage(persistent_profile, self.web))
+        else:
+            # Default profile - register the page API on this page only
+            install_panel_api(self.web.page().scripts())
+
+        # Typed bridge for the page API, in its isolated world only
+        bridge = get_panel_bridge()
+        self.web_channel = None
+        if QWebChannel is not None:
+            try:
+                self.web_channel = QWebChannel(self.web.page())
+                self.web_channel.registerObject(BRIDGE_OBJECT_NAME, bridge)
+                self.web.page().setWebChannel(self.web_channel, PANEL_WORLD_ID)
+            except Exception as e:
+                self.web_channel = None
+                print(f"OpenEvidence: Could not set up web channel: {e}")
+        bridge.page_ready.connect(self.on_page_ready)
+        bridge.login_detected.connect(lambda: self.login_detector.report("page"))
+        bridge.message_sent.connect(self.on_message_sent)
+
+        # Freeze, then discard, the page while the dock is hidden
+        config = get_config()
+        self.lifecycle = PageLifecycle(
+            self.web.page(), config.lifecycle_freeze_after_s, config.lifecycle_discard_after_s, self
+        )
+        self.lifecycle.restoring.connect(self._show_loading_overlay)
 
         # Configure settings for faster loading and better preloading
         if QWebEngineSettings:
@@ -450,7 +441,17 @@ class OpenEvidencePanel(QWidget):
         self.loading_overlay.show()
         self.loading_overlay.raise_()
 
-        # Connect to load finished to check if page is ready
+        # Readiness is reported by the page itself (see panel_js); Python only
+        # times the load and gives up after PAGE_READY_TIMEOUT_MS
+        self.load_state = "loading"
+        self._load_started_at = None
+        self._has_been_ready = False
+        # Quick actions wait here until the page is ready
+        self.action_queue = ActionQueue()
+        self.load_timeout_timer = QTimer(self)
+        self.load_timeout_timer.setSingleShot(True)
+        self.load_timeout_timer.timeout.connect(self.on_page_load_timeout)
+        self.web.loadStarted.connect(self.on_page_load_started)
         self.web.loadFinished.connect(self.on_page_load_finished)
         
         # Start loading OpenEvidence immediately (even though panel is hidden)
@@ -468,142 +469,156 @@ class OpenEvidencePanel(QWidget):
         # Start with web view
         self.stacked_widget.setCurrentIndex(0)
 
-        # Set up auth detection timer (check every 30 seconds)
-        self.auth_check_timer = QTimer(self)
-        self.auth_check_timer.timeout.connect(self.check_auth_status)
-        self.auth_check_timer.start(300000)  # 5 minutes
+        # Re-push keybindings only when they actually change
+        get_config_store().changed.connect(self.on_config_changed)
+
+
+    def on_page_load_started(self):
+        """Start timing a page load and arm the failed-load timeout"""
+        self.load_state = "loading"
+        self._load_started_at = time.perf_counter()
+        self.load_timeout_timer.start(PAGE_READY_TIMEOUT_MS)
 
     def on_page_load_finished(self, ok):
-        """Called when page HTML is loaded - check if fully ready"""
+        """Called when page HTML is loaded - readiness itself comes from the page"""
         if not ok:
-            # Load failed, hide overlay anyway
-            if hasattr(self, 'loading_overlay'):
-                self.loading_overlay.hide()
+            self._set_load_failed("load error")
             return
 
-        # Add a small delay before first JavaScript call to ensure profile is initialized
-        # This prevents crashes with custom profiles
-        QTimer.singleShot(100, self._check_page_ready)
-
-    def _check_page_ready(self):
-        """Check if page is ready (called after small delay)"""
-        # Check if page is truly ready (all resources loaded)
-        check_ready_js = """
-        (function() {
-            // Check if document is fully loaded and OpenEvidence elements exist
-            if (document.readyState === 'complete') {
-                // Check for OpenEvidence specific elements that indicate page is ready
-                var searchInput = document.querySelector('input[placeholder*="medical"], input[placeholder*="question"], textarea');
-                var logo = document.querySelector('img, svg');
-
-                // If we found key elements, page is ready
-                if (searchInput || logo) {
-                    return true;
-                }
-            }
-            return false;
-        })();
-        """
-
-        # Check if page is ready with error handling
-        try:
-            self.web.page().runJavaScript(check_ready_js, self.handle_ready_check)
-        except Exception as e:
-            print(f"OpenEvidence: Error checking page ready: {e}")
-            # Fallback - just hide loader and show web view
-            if hasattr(self, 'loading_overlay'):
-                self.loading_overlay.hide()
-            self.web.show()
-    
-    def handle_ready_check(self, is_ready):
-        """Handle the result of page ready check"""
-        if is_ready:
-            # Page is ready - hide loader, show web view
-            if hasattr(self, 'loading_overlay'):
-                self.loading_overlay.hide()
-            self.web.show()
-            self.inject_shift_key_listener()
-            self.inject_auth_button_listener()
-            self.inject_message_tracking_listener()
-            # Check auth status when page is ready
-            QTimer.singleShot(2000, self.check_auth_status)  # Wait 2 seconds for tokens to load
+        # Without the web channel there is no ready signal, so treat the
+        # finished load as ready
+        if self.web_channel is None:
+            self.on_page_ready()
+
+    def on_page_ready(self):
+        """The page API reported the app is rendered - reveal it"""
+        self.load_timeout_timer.stop()
+        first_ready = self.load_state != "ready"
+        self.load_state = "ready"
+
+        if first_ready and self._load_started_at is not None:
+            elapsed_ms = (time.perf_counter() - self._load_started_at) * 1000
+            # Cold: first load in this Anki session; warm: later reloads
+            kind = "warm" if self._has_been_ready else "cold"
+            diagnostics.record_timing(f"panel_ready_{kind}_ms", elapsed_ms)
+            # Split by request blocking so both settings can be compared
+            request_filter = get_request_filter()
+            blocking = "on" if request_filter is not None and request_filter.enabled else "off"
+            diagnostics.record_timing(f"panel_ready_{kind}_blocking_{blocking}_ms", elapsed_ms)
+            self._record_memory(kind)
+            try:
+                from .analytics_store import get_analytics_store
+                get_analytics_store().set(f"panel_ready_{kind}_ms", round(elapsed_ms))
+            except Exception:
+                pass
+            self._load_started_at = None
+        self._has_been_ready = True
+        get_preload_tracker().panel_ready()
+
+        if hasattr(self, 'loading_overlay'):
+            self.loading_overlay.hide()
+        self.web.show()
+        # Page API is preinstalled - it only needs the current keybindings
+        self.update_keybindings_in_js()
+        if not self.login_detector.reported:
+            self.run_panel_api("watchLogin")
+
+        # Put back the draft of a page that was discarded while hidden
+        draft = self.lifecycle.take_pending_draft()
+        if draft:
+            self.run_panel_api("restoreDraft", draft)
+        self._flush_actions()
+        # Preloaded in the background - start the idle countdown right away
+        if not self.isVisible():
+            self.lifecycle.page_hidden()
+
+    def queue_action(self, kind, text):
+        """Send a quick action to the page, or hold it until the page is ready"""
+        # The queue is flushed whenever loading ends, so it's empty here
+        # unless the page is still loading
+        if self.load_state == "loading":
+            self.action_queue.push(kind, text)
         else:
-            # Not ready yet, check again after a short delay
-            QTimer.singleShot(200, lambda: self.web.page().runJavaScript(
-                """
-                (function() {
-                    if (document.readyState === 'complete') {
-                        var searchInput = document.querySelector('input[placeholder*="medical"], input[placeholder*="question"], textarea');
-                        var logo = document.querySelector('img, svg');
-                        if (searchInput || logo) return true;
-                    }
-                    return false;
-                })();
-                """,
-                self.handle_ready_check
-            ))
-
-    def check_auth_status(self):
-        """Check if user is authenticated on OpenEvidence"""
-        # Skip if already detected
-        from .analytics import is_user_logged_in
-        if is_user_logged_in():
-            # Already logged in, stop checking
-            if hasattr(self, 'auth_check_timer'):
-                self.auth_check_timer.stop()
-            return
+            self.run_panel_api("runActions", [[kind, text]])
+
+    def _flush_actions(self):
+        """Replay queued actions in order with one page API call"""
+        actions = self.action_queue.take()
+        if actions:
+            self.run_panel_api("runActions", [list(action) for action in actions])
+
+    def _show_loading_overlay(self):
+        """Cover the web view while a discarded page reloads"""
+        # Hold quick actions until the reloaded page is ready
+        self.load_state = "loading"
+        self.web.hide()
+        self.loading_overlay.show()
+        self.loading_overlay.raise_()
 
-        # JavaScript to check for authentication by DOM elements (not tokens)
-        # More reliable - checks if Login/SignUp buttons are present (logged out)
-        # vs if Avatar/Sidebar elements are present (logged in)
-        auth_check_js = """
-        (function() {
-            try {
-                // 1. Check if Login/SignUp buttons exist (means NOT logged in)
-                var buttons = Array.from(document.querySelectorAll('button'));
-                var loginButton = buttons.find(function(el) { 
-                    return el.innerText && el.innerText.includes('Log In'); 
-                });
-                var signupButton = buttons.find(function(el) { 
-                    return el.innerText && el.innerText.includes('Sign Up'); 
-                });
-                
-                // If both login buttons are present, user is NOT logged in
-                if (loginButton && signupButton) {
-                    return false;
-                }
-                
-                // 2. Check for logged-in indicators (Avatar, Drawer/Sidebar)
-                var hasAvatar = !!document.querySelector('.MuiAvatar-root, [class*="Avatar"]');
-                var hasDrawer = !!document.querySelector('.MuiDrawer-root, [class*="Drawer"], [class*="Sidebar"]');
-                
-                // 3. Check for user profile text (e.g., user name or email)
-                var allText = document.body.innerText || '';
-                var hasEmailPattern = /@[a-zA-Z0-9.-]+\\.[a-zA-Z]{2,}/.test(allText);
-                
-                // User is logged in if: no login buttons AND (has avatar OR has drawer OR has email)
-                var isLoggedIn = !loginButton && !signupButton && (hasAvatar || hasDrawer || hasEmailPattern);
-                
-                return isLoggedIn;
-            } catch(e) {
-                return false;
-            }
-        })();
-        """
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.lifecycle.page_shown()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.lifecycle.page_hidden()
 
+    def _record_memory(self, kind):
+        """Resident memory of Anki and the panel's renderer when ready"""
+        anki_mb = diagnostics.resident_memory_mb()
+        if anki_mb is not None:
+            diagnostics.set_value(f"anki_rss_at_ready_{kind}_mb", round(anki_mb, 1))
         try:
-            self.web.page().runJavaScript(auth_check_js, self.handle_auth_check)
-        except Exception as e:
-            print(f"AI Panel: Error checking auth status: {e}")
+            renderer_mb = diagnostics.resident_memory_mb(self.web.page().renderProcessPid())
+        except AttributeError:
+            # renderProcessPid needs Qt 5.15+
+            renderer_mb = None
+        if renderer_mb is not None:
+            diagnostics.set_value(f"renderer_rss_at_ready_{kind}_mb", round(renderer_mb, 1))
+
+    def on_page_load_timeout(self):
+        """No ready signal in time - check once (same-document navigations
+        don't re-run the page API) and otherwise mark the load as failed"""
+        def handle_result(is_ready):
+            if is_ready:
+                self.on_page_ready()
+            else:
+                self._set_load_failed("timed out")
+
+        try:
+            self.web.page().runJavaScript(
+                "!!(window.ankiPanel && window.ankiPanel.isReady())", PANEL_WORLD_ID, handle_result
+            )
+        except Exception:
+            self._set_load_failed("timed out")
+
+    def _set_load_failed(self, reason):
+        """Explicit failed-load state: stop waiting and show whatever loaded"""
+        self.load_timeout_timer.stop()
+        self.load_state = "failed"
+        self._load_started_at = None
+        diagnostics.increment("panel_load_failed")
+        print(f"OpenEvidence: Page load failed ({reason})")
+        # Best effort - the page API waits a while for the input to appear
+        self._flush_actions()
+
+        if hasattr(self, 'loading_overlay'):
+            self.loading_overlay.hide()
+        self.web.show()
+
+    def on_message_sent(self):
+        """User sent a chat message - maybe show the referral or review overlay"""
+        # Counted in memory - most messages stop here without scheduling anything
+        engagement = get_engagement()
+        if not (engagement.referral_eligible() or engagement.review_eligible()):
+            return
 
-    def handle_auth_check(self, is_authenticated):
-        """Handle result of authentication check"""
-        if is_authenticated:
-            from .analytics import track_login_detected
-            track_login_detected()
-            # Stop the timer since we detected login
-            if hasattr(self, 'auth_check_timer'):
-                self.auth_check_timer.stop()
+        from .referral import show_referral_overlay_if_eligible
+        from .review import show_review_overlay_if_eligible
+        web = self.web
+        # After JS processing completes; referral first, then review (only one
+        # will show based on eligibility)
+        QTimer.singleShot(500, lambda: show_referral_overlay_if_eligible(web) or show_review_overlay_if_eligible(web))
 
     def _update_title_bar(self, is_settings):
         """Update title bar state"""
@@ -623,6 +638,7 @@ class OpenEvidencePanel(QWidget):
             # Import here to avoid circular import at module level
             from .settings import SettingsEditorView, SettingsListView, SettingsHomeView
             from .settings_quick_actions import QuickActionsSettingsView
+            from .settings_diagnostics import DiagnosticsSettingsView
 
             if isinstance(current_widget, SettingsEditorView):
                 # In editor view, discard changes and go back to templates list view
@@ -645,8 +661,8 @@ class OpenEvidencePanel(QWidget):
                     tutorial_event("settings_back_to_home")
                 except:
                     pass
-            elif isinstance(current_widget, QuickActionsSettingsView):
-                # In quick actions view, go back to settings home
+            elif isinstance(current_widget, (QuickActionsSettingsView, DiagnosticsSettingsView)):
+                # In quick actions or diagnostics view, go back to settings home
                 self.show_home_view()
                 # Notify tutorial
                 try:
@@ -761,6 +777,22 @@ class OpenEvidencePanel(QWidget):
         self.stacked_widget.setCurrentIndex(1)
         self._update_title_bar(True)
 
+    def show_diagnostics_view(self):
+        """Show the diagnostics view (always rebuilt with fresh figures)"""
+        current_widget = self.stacked_widget.widget(1)
+
+        # Import here to avoid circular import at module level
+        from .settings_diagnostics import DiagnosticsSettingsView
+
+        if current_widget:
+            self.stacked_widget.removeWidget(current_widget)
+            current_widget.deleteLater()
+
+        self.settings_view = DiagnosticsSettingsView(self)
+        self.stacked_widget.addWidget(self.settings_view)
+        self.stacked_widget.setCurrentIndex(1)
+        self._update_title_bar(True)
+
     def show_list_view(self):
         """Show the settings list view (alias for show_templates_view for backward compatibility)"""
         self.show_templates_view()
@@ -776,420 +808,24 @@ class OpenEvidencePanel(QWidget):
         self.stacked_widget.setCurrentIndex(1)
         self._update_title_bar(True)
 
-    def inject_auth_button_listener(self):
-        """Inject JavaScript to track clicks on Sign up / Log in buttons"""
-        listener_js = """
-        (function() {
-            // Only inject if not already injected
-            if (window.ankiAuthButtonListenerInjected) {
-                console.log('Anki: Auth button listener already exists, skipping injection');
-                return;
-            }
-
-            console.log('Anki: Injecting auth button click tracker');
-            window.ankiAuthButtonListenerInjected = true;
-
-            // Use event delegation to catch clicks on dynamically loaded buttons
-            document.addEventListener('click', function(event) {
-                var target = event.target;
-
-                // Traverse up to find the actual button/link (in case user clicks on text inside)
-                var clickedElement = target;
-                for (var i = 0; i < 5 && clickedElement; i++) {
-                    // Only check actual interactive elements (buttons, links)
-                    var tagName = clickedElement.tagName ? clickedElement.tagName.toLowerCase() : '';
-                    if (tagName !== 'button' && tagName !== 'a') {
-                        clickedElement = clickedElement.parentElement;
-                        continue;
-                    }
-
-                    var text = (clickedElement.textContent || '').toLowerCase().trim();
-                    var href = (clickedElement.href || '').toLowerCase();
-
-                    // Check for "Sign up" button - must be exact match or in href
-                    if (text === 'sign up' || text === 'sign up for free access' ||
-                        href.includes('/signup') || href.includes('/register')) {
-                        console.log('ANKI_ANALYTICS:signup_clicked');
-                        break;
-                    }
-
-                    // Check for "Log in" button - must be exact match or in href
-                    if (text === 'log in' || text === 'login' || text === 'log in here' ||
-                        href.includes('/login') || href.includes('/signin')) {
-                        console.log('ANKI_ANALYTICS:login_clicked');
-                        break;
-                    }
-
-                    // Move up to parent element
-                    clickedElement = clickedElement.parentElement;
-                }
-            }, true);  // Use capture phase to catch all clicks
-        })();
-        """
-
-        try:
-            self.web.page().runJavaScript(listener_js)
-        except Exception as e:
-            print(f"AI Panel: Error injecting auth button listener: {e}")
-
-    def inject_message_tracking_listener(self):
-        """Inject JavaScript to track when user submits a message in the chat"""
-        listener_js = """
-        (function() {
-            // Only inject if not already injected
-            if (window.ankiMessageTrackingInjected) {
-                console.log('Anki: Message tracking already exists, skipping injection');
-                return;
-            }
-            
-            console.log('Anki: Injecting message tracking listener');
-            window.ankiMessageTrackingInjected = true;
-            
-            // Debounce to prevent double-counting (Enter key + form submit can fire close together)
-            var lastMessageTime = 0;
-            function trackMessage() {
-                var now = Date.now();
-                if (now - lastMessageTime > 200) {  // 200ms debounce
-                    lastMessageTime = now;
-                    console.log('ANKI_ANALYTICS:message_sent');
-                }
-            }
-            
-            // Track form submissions
-            document.addEventListener('submit', function(event) {
-                trackMessage();
-            }, true);
-            
-            // Track Enter key in input/textarea (common chat pattern)
-            document.addEventListener('keydown', function(event) {
-                if (event.key === 'Enter' && !event.shiftKey) {
-                    var target = event.target;
-                    var tagName = target.tagName.toLowerCase();
-                    // Only track if in input or textarea that looks like a chat input
-                    if (tagName === 'input' || tagName === 'textarea') {
-                        var placeholder = (target.placeholder || '').toLowerCase();
-                        var value = (target.value || '').trim();
-                        // Check if it looks like a chat/search input OR has content to send
-                        if (placeholder.includes('question') || placeholder.includes('search') || 
-                            placeholder.includes('ask') || placeholder.includes('message') ||
-                            placeholder.includes('medical') || placeholder.includes('follow') ||
-                            value.length > 0) {
-                            trackMessage();
-                        }
-                    }
-                }
-            }, true);
-            
-            // Track clicks on send/submit buttons (including icon-only buttons)
-            document.addEventListener('click', function(event) {
-                var target = event.target;
-                // Walk up to find button (also check for SVG clicks inside buttons)
-                while (target && target.tagName !== 'BUTTON' && target !== document.body) {
-                    target = target.parentElement;
-                }
-                if (target && target.tagName === 'BUTTON') {
-                    var buttonText = (target.textContent || '').toLowerCase();
-                    var ariaLabel = (target.getAttribute('aria-label') || '').toLowerCase();
-                    var buttonType = (target.getAttribute('type') || '').toLowerCase();
-                    var hasSvg = target.querySelector('svg') !== null;
-                    var className = (target.className || '').toLowerCase();
-                    
-                    // Check if it's a send/submit button (text, aria-label, type, or icon button)
-                    if (buttonText.includes('send') || buttonText.includes('submit') ||
-                        buttonText.includes('ask') || ariaLabel.includes('send') ||
-                        ariaLabel.includes('submit') || buttonType === 'submit' ||
-                        (hasSvg && (className.includes('send') || className.includes('submit') || 
-                         className.includes('primary') || className.includes('action')))) {
-                        trackMessage();
-                    }
-                    
-                    // Also track if button is near an input/textarea (likely a send button)
-                    var parent = target.parentElement;
-                    if (parent) {
-                        var hasInputSibling = parent.querySelector('input, textarea') !== null;
-                        if (hasInputSibling && hasSvg) {
-                            trackMessage();
-                        }
-                    }
-                }
-            }, true);
-        })();
-        """
-        
-        try:
-            self.web.page().runJavaScript(listener_js)
-        except Exception as e:
-            print(f"AI Panel: Error injecting message tracking listener: {e}")
-
-    def inject_shift_key_listener(self):
-        """Inject JavaScript to listen for custom keybindings"""
-        # First, update the keybindings in the global variable
-        self.update_keybindings_in_js()
-
-        # Only inject the listener once - it will read from window.ankiKeybindings
-        listener_js = """
-        (function() {
-            // Only inject if not already injected
-            if (window.ankiKeybindingListenerInjected) {
-                console.log('Anki: Keybinding listener already exists, skipping injection');
-                return;
-            }
-
-            console.log('Anki: Injecting custom keybinding listener for OpenEvidence');
-            window.ankiKeybindingListenerInjected = true;
-
-            // Helper to check if pressed keys match keybinding
-            function keysMatch(event, requiredKeys) {
-                var pressedKeys = {};
-
-                if (event.shiftKey) pressedKeys['Shift'] = true;
-                
-                // On macOS, browser events have the keys correct:
-                // - event.metaKey = Cmd key (⌘) → should match "Meta"
-                // - event.ctrlKey = Control key (⌃) → should match "Control"
-                // On other platforms, treat them the same for cross-platform compatibility
-                var isMac = navigator.platform.toUpperCase().indexOf('MAC') >= 0;
-                if (isMac) {
-                    if (event.ctrlKey) pressedKeys['Control'] = true;
-                    if (event.metaKey) pressedKeys['Meta'] = true;
-                } else {
-                    if (event.ctrlKey || event.metaKey) pressedKeys['Control/Meta'] = true;
-                }
-                
-                if (event.altKey) pressedKeys['Alt'] = true;
-
-                // Add regular key if present
-                if (event.key && event.key.length === 1) {
-                    pressedKeys[event.key.toUpperCase()] = true;
-                }
-
-                // Check if all required keys are pressed
-                for (var i = 0; i < requiredKeys.length; i++) {
-                    if (!pressedKeys[requiredKeys[i]]) {
-                        return false;
-                    }
-                }
-
-                // Check we don't have extra modifier keys
-                var expectedCount = requiredKeys.length;
-                var actualCount = Object.keys(pressedKeys).length;
-
-                return actualCount === expectedCount;
-            }
-
-            // Helper to insert text at cursor position
-            function fillInputField(activeElement, text) {
-                // Get current value and cursor position
-                var currentValue = activeElement.value || '';
-                var cursorPos = activeElement.selectionStart || 0;
-
-                // Insert text at cursor position
-                var newValue = currentValue.substring(0, cursorPos) + text + currentValue.substring(activeElement.selectionEnd || cursorPos);
-
-                // Use proper setter that React/Vue can detect
-                var nativeInputValueSetter = Object.getOwnPropertyDescriptor(
-                    window.HTMLInputElement.prototype,
-                    'value'
-                ).set;
-                var nativeTextAreaValueSetter = Object.getOwnPropertyDescriptor(
-                    window.HTMLTextAreaElement.prototype,
-                    'value'
-                ).set;
-
-                if (activeElement.tagName === 'INPUT') {
-                    nativeInputValueSetter.call(activeElement, newValue);
-                } else if (activeElement.tagName === 'TEXTAREA') {
-                    nativeTextAreaValueSetter.call(activeElement, newValue);
-                }
-
-                // Set cursor position after inserted text
-                var newCursorPos = cursorPos + text.length;
-                activeElement.setSelectionRange(newCursorPos, newCursorPos);
-
-                // Dispatch proper input event that React recognizes
-                var inputEvent = new InputEvent('input', {
-                    bubbles: true,
-                    cancelable: true,
-                    inputType: 'insertText',
-                    data: text
-                });
-                activeElement.dispatchEvent(inputEvent);
-
-                // Also dispatch change event
-                var changeEvent = new Event('change', { bubbles: true });
-                activeElement.dispatchEvent(changeEvent);
-
-                // Dispatch keyup event to trigger any validation
-                var keyupEvent = new KeyboardEvent('keyup', {
-                    bubbles: true,
-                    cancelable: true,
-                    key: ' ',
-                    code: 'Space'
-                });
-                activeElement.dispatchEvent(keyupEvent);
-            }
-
-            // Listen for keyboard shortcuts on the entire document
-            document.addEventListener('keydown', function(event) {
-                // Check if the ACTIVE ELEMENT is specifically the OpenEvidence search input
-                var activeElement = document.activeElement;
-
-                // Make sure we're in an input/textarea element
-                var isInputElement = activeElement && (
-                    activeElement.tagName === 'INPUT' ||
-                    activeElement.tagName === 'TEXTAREA'
-                );
-
-                // Make sure it's specifically the OpenEvidence search box
-                var isOpenEvidenceSearchBox = false;
-                if (isInputElement) {
-                    var placeholder = activeElement.placeholder || '';
-                    var type = activeElement.type || '';
-
-                    isOpenEvidenceSearchBox = (
-                        placeholder.toLowerCase().includes('medical') ||
-                        placeholder.toLowerCase().includes('question') ||
-                        type === 'text' ||
-                        activeElement.tagName === 'TEXTAREA'
-                    );
-                }
-
-                // Only proceed if in OpenEvidence search box
-                if (!isInputElement || !isOpenEvidenceSearchBox) {
-                    return;
-                }
-
-                // Read keybindings from global variable (updated from Python)
-                var keybindings = window.ankiKeybindings || [];
-
-                // Check each keybinding
-                for (var i = 0; i < keybindings.length; i++) {
-                    var binding = keybindings[i];
-
-                    if (keysMatch(event, binding.keys)) {
-                        console.log('Anki: Keybinding "' + binding.name + '" triggered');
-                        event.preventDefault();
-
-                        // Get the appropriate text for this keybinding
-                        if (window.ankiCardTexts && window.ankiCardTexts[i]) {
-                            fillInputField(activeElement, window.ankiCardTexts[i]);
-                            console.log('Anki: Filled search box with card text using React-compatible events');
-
-                            // Notify tutorial that shortcut was used (via console message)
-                            console.log('ANKI_TUTORIAL:shortcut_used');
-                            
-                            // Track template usage with specific shortcut for analytics
-                            console.log('ANKI_ANALYTICS:template_used:' + binding.keys.join('+'));
-                        } else {
-                            console.log('Anki: No card text available for this keybinding');
-                        }
-
-                        break; // Only trigger first matching keybinding
-                    }
-                }
-            }, true);
-        })();
-        """
-
+    def run_panel_api(self, function, *args):
+        """Call a method of the preinstalled window.ankiPanel page API"""
         try:
-            self.web.page().runJavaScript(listener_js)
+            self.web.page().runJavaScript(call_js(function, *args), PANEL_WORLD_ID)
         except Exception as e:
-            print(f"OpenEvidence: Error injecting listener: {e}")
+            print(f"OpenEvidence: Error calling ankiPanel.{function}: {e}")
 
-        # Also inject the current card texts
-        self.update_card_text_in_js()
+    def on_config_changed(self, changed_keys):
+        """Refresh page-side keybindings after a keybinding edit"""
+        if "keybindings" in changed_keys:
+            self.update_keybindings_in_js()
 
     def update_keybindings_in_js(self):
-        """Update the keybindings in the JavaScript context without re-injecting the listener"""
-        # Get keybindings from config
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        keybindings = config.get("keybindings", [])
-
-        # If no keybindings, add default
-        if not keybindings:
-            keybindings = [
-                {
-                    "name": "Standard Explain",
-                    "keys": ["Control", "Shift", "S"],
-                    "question_template": "Can you explain this to me:\n\n{front}",
-                    "answer_template": "Can you explain this to me:\n\nQuestion:\n{front}\n\nAnswer:\n{back}"
-                },
-                {
-                    "name": "Front/Back",
-                    "keys": ["Control", "Shift", "Q"],
-                    "question_template": "{front}",
-                    "answer_template": "{front}"
-                },
-                {
-                    "name": "Back Only",
-                    "keys": ["Control", "Shift", "A"],
-                    "question_template": "",
-                    "answer_template": "{back}"
-                }
-            ]
-
-        # Convert keybindings to JSON and inject
-        keybindings_json = json.dumps(keybindings)
-        js_code = f"window.ankiKeybindings = {keybindings_json};"
-        try:
-            self.web.page().runJavaScript(js_code)
-        except Exception as e:
-            print(f"OpenEvidence: Error updating keybindings: {e}")
-
-    def update_card_text_in_js(self):
-        """Update the card texts in the JavaScript context for all keybindings"""
-        # Import here to avoid circular imports
-        from . import current_card_question, current_card_answer, is_showing_answer
-
-        # Get keybindings from config
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        keybindings = config.get("keybindings", [])
-
-        # If no keybindings, add default
-        if not keybindings:
-            keybindings = [
-                {
-                    "name": "Standard Explain",
-                    "keys": ["Control", "Shift", "S"],
-                    "question_template": "Can you explain this to me:\n\n{front}",
-                    "answer_template": "Can you explain this to me:\n\nQuestion:\n{front}\n\nAnswer:\n{back}"
-                },
-                {
-                    "name": "Front/Back",
-                    "keys": ["Control", "Shift", "Q"],
-                    "question_template": "{front}",
-                    "answer_template": "{front}"
-                },
-                {
-                    "name": "Back Only",
-                    "keys": ["Control", "Shift", "A"],
-                    "question_template": "",
-                    "answer_template": "{back}"
-                }
-            ]
-
-        # Generate text for each keybinding
-        card_texts = []
-        for kb in keybindings:
-            if is_showing_answer:
-                # Use answer template
-                template = kb.get("answer_template", "")
-                text = template.replace("{front}", current_card_question).replace("{back}", current_card_answer)
-            else:
-                # Use question template
-                template = kb.get("question_template", "")
-                text = template.replace("{front}", current_card_question)
-
-            card_texts.append(text)
+        """Send the current keybindings to the page API"""
+        # Get keybindings from the cached config (defaults applied by the store)
+        keybindings = get_config().keybinding_dicts()
 
-        # Convert to JSON and inject
-        if card_texts:
-            texts_json = json.dumps(card_texts)
-            js_code = f"window.ankiCardTexts = {texts_json};"
-            try:
-                self.web.page().runJavaScript(js_code)
-            except Exception as e:
-                print(f"OpenEvidence: Error updating card texts: {e}")
+        self.run_panel_api("setKeybindings", keybindings)
 
 
 class OnboardingWidget(QWidget):
@@ -1493,20 +1129,13 @@ class OnboardingWidget(QWidget):
         """Complete onboarding and show the panel"""
         # Save config - ensure it's properly saved
         try:
-            config = mw.addonManager.getConfig(ADDON_NAME) or {}
-            config["onboarding_completed"] = True
-            mw.addonManager.writeConfig(ADDON_NAME, config)
+            get_config_store().update(onboarding_completed=True)
             
             # Track onboarding completion in analytics
             from .analytics import track_onboarding_completed
             track_onboarding_completed()
             
-            # Verify it was saved
-            saved_config = mw.addonManager.getConfig(ADDON_NAME) or {}
-            if saved_config.get("onboarding_completed"):
-                print(f"OpenEvidence: Onboarding completed successfully, config saved")
-            else:
-                print(f"OpenEvidence: WARNING - Config may not have saved correctly")
+            print(f"OpenEvidence: Onboarding completed successfully, config saved")
         except Exception as e:
             print(f"OpenEvidence: Error saving onboarding config: {e}")
 
@@ -0,0 +1,608 @@
+"""
+Panel JS - Versioned page-side API for the OpenEvidence panel
+
+All JavaScript the add-on needs inside the OpenEvidence page lives here as a
+single `window.ankiPanel` object. It is registered once per profile as a
+QWebEngineScript at DocumentCreation, so every page load already has it before
+any Python action arrives. Python then only sends tiny calls such as
+`ankiPanel.addContext("...")` built with call_js().
+
+The script runs in the ApplicationWorld: it shares the DOM with the site but
+not its JavaScript globals, so the site can't see `ankiPanel` or the
+QWebChannel `ankiBridge` object it uses to call back into Python (see bridge).
+Python calls into it with runJavaScript(..., PANEL_WORLD_ID).
+"""
+
+import json
+
+try:
+    from PyQt6.QtCore import QFile, QIODevice
+    from PyQt6.QtWebEngineCore import QWebEngineScript
+except ImportError:
+    try:
+        from PyQt5.QtCore import QFile, QIODevice
+        from PyQt5.QtWebEngineWidgets import QWebEngineScript
+    except ImportError:
+        QWebEngineScript = None
+
+
+# Bump when PANEL_API_JS changes so stale copies are replaced
+PANEL_API_VERSION = 6
+
+SCRIPT_NAME = "ankiPanel"
+
+# QWebEngineScript.ScriptWorldId.ApplicationWorld
+PANEL_WORLD_ID = 1
+
+# Name the bridge object is registered under in the QWebChannel
+BRIDGE_OBJECT_NAME = "ankiBridge"
+
+_QWEBCHANNEL_JS_RESOURCE = ":/qtwebchannel/qwebchannel.js"
+
+PANEL_API_JS = """
+(function() {
+    var VERSION = %(version)d;
+    if (window.ankiPanel && window.ankiPanel.version >= VERSION) {
+        return;
+    }
+
+    var SEARCH_INPUT_SELECTOR = 'input[placeholder*="medical"], input[placeholder*="question"], textarea, input[type="text"]';
+    var FOLLOW_UP_SELECTOR = 'input[placeholder*="follow-up"], input[placeholder*="Follow-up"], textarea[placeholder*="follow-up"]';
+
+    // Any of these means the app has rendered enough to be used
+    var READY_SELECTOR = 'input[placeholder*="medical"], input[placeholder*="question"], textarea, img, svg';
+
+    // Signed-in UI, and the buttons only shown to signed-out users
+    var LOGGED_IN_SELECTOR = '.MuiAvatar-root, [class*="Avatar"], .MuiDrawer-root, [class*="Drawer"], [class*="Sidebar"]';
+    var LOGIN_CHECK_THROTTLE_MS = 1000;
+
+    // Let a submitted query clear the input before the next queued action
+    var QUERY_SETTLE_MS = 300;
+
+    var keybindings = [];
+    var pendingCardText = null;
+    var isReady = false;
+    var loginObserver = null;
+    var loginCheckScheduled = false;
+
+    // ---- Bridge to Python ----
+
+    // Calls made before the channel connects are queued and replayed
+    var bridge = null;
+    var bridgeQueue = [];
+
+    function callBridge(method) {
+        var args = Array.prototype.slice.call(arguments, 1);
+        if (bridge) {
+            bridge[method].apply(bridge, args);
+        } else {
+            bridgeQueue.push([method, args]);
+        }
+    }
+
+    function connectBridge() {
+        if (bridge || typeof QWebChannel === 'undefined' || !window.qt || !qt.webChannelTransport) {
+            return false;
+        }
+        new QWebChannel(qt.webChannelTransport, function(channel) {
+            bridge = channel.objects.%(bridge)s;
+            var queued = bridgeQueue;
+            bridgeQueue = [];
+            for (var i = 0; i < queued.length; i++) {
+                bridge[queued[i][0]].apply(bridge, queued[i][1]);
+            }
+        });
+        return true;
+    }
+
+    // The transport may only be attached once the document exists
+    if (!connectBridge()) {
+        document.addEventListener('DOMContentLoaded', connectBridge);
+    }
+
+    // ---- Helpers ----
+
+    // Set a value in a way React/Vue can detect
+    function setNativeValue(element, value) {
+        var prototype = element.tagName === 'TEXTAREA' ? window.HTMLTextAreaElement.prototype : window.HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, value);
+    }
+
+    // Run callback with the first element matching selector, waiting for it
+    // to be rendered if needed (actions can arrive before the app hydrates)
+    function whenElement(selector, callback, timeoutMs) {
+        var element = document.querySelector(selector);
+        if (element) {
+            callback(element);
+            return;
+        }
+        var observer = new MutationObserver(function() {
+            var found = document.querySelector(selector);
+            if (found) {
+                observer.disconnect();
+                clearTimeout(timer);
+                callback(found);
+            }
+        });
+        var timer = setTimeout(function() {
+            observer.disconnect();
+            console.log('Anki: Could not find search input');
+        }, timeoutMs || 10000);
+        observer.observe(document.documentElement, {childList: true, subtree: true});
+    }
+
+    // Helper to check if pressed keys match keybinding
+    function keysMatch(event, requiredKeys) {
+        var pressedKeys = {};
+
+        if (event.shiftKey) pressedKeys['Shift'] = true;
+
+        // On macOS, browser events have the keys correct:
+        // - event.metaKey = Cmd key (⌘) → should match "Meta"
+        // - event.ctrlKey = Control key (⌃) → should match "Control"
+        // On other platforms, treat them the same for cross-platform compatibility
+        var isMac = navigator.platform.toUpperCase().indexOf('MAC') >= 0;
+        if (isMac) {
+            if (event.ctrlKey) pressedKeys['Control'] = true;
+            if (event.metaKey) pressedKeys['Meta'] = true;
+        } else {
+            if (event.ctrlKey || event.metaKey) pressedKeys['Control/Meta'] = true;
+        }
+
+        if (event.altKey) pressedKeys['Alt'] = true;
+
+        // Add regular key if present
+        if (event.key && event.key.length === 1) {
+            pressedKeys[event.key.toUpperCase()] = true;
+        }
+
+        // Check if all required keys are pressed
+        for (var i = 0; i < requiredKeys.length; i++) {
+            if (!pressedKeys[requiredKeys[i]]) {
+                return false;
+            }
+        }
+
+        // Check we don't have extra modifier keys
+        return Object.keys(pressedKeys).length === requiredKeys.length;
+    }
+
+    // Insert text at the cursor position with React-compatible events
+    function fillInputField(activeElement, text) {
+        var currentValue = activeElement.value || '';
+        var cursorPos = activeElement.selectionStart || 0;
+        var newValue = currentValue.substring(0, cursorPos) + text + currentValue.substring(activeElement.selectionEnd || cursorPos);
+
+        setNativeValue(activeElement, newValue);
+
+        // Set cursor position after inserted text
+        var newCursorPos = cursorPos + text.length;
+        activeElement.setSelectionRange(newCursorPos, newCursorPos);
+
+        activeElement.dispatchEvent(new InputEvent('input', {
+            bubbles: true,
+            cancelable: true,
+            inputType: 'insertText',
+            data: text
+        }));
+        activeElement.dispatchEvent(new Event('change', { bubbles: true }));
+
+        // Dispatch keyup event to trigger any validation
+        activeElement.dispatchEvent(new KeyboardEvent('keyup', {
+            bubbles: true,
+            cancelable: true,
+            key: ' ',
+            code: 'Space'
+        }));
+    }
+
+    // ---- Readiness ----
+
+    // Signal Anki once the DOM is parsed and the app has rendered, instead of
+    // Python polling the page
+    function checkReady() {
+        if (isReady || document.readyState === 'loading' || !document.querySelector(READY_SELECTOR)) {
+            return isReady;
+        }
+        isReady = true;
+        readyObserver.disconnect();
+        callBridge('pageReady');
+        return true;
+    }
+
+    var readyObserver = new MutationObserver(checkReady);
+
+    function watchReadiness() {
+        if (!checkReady()) {
+            readyObserver.observe(document.documentElement, {childList: true, subtree: true});
+        }
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', watchReadiness);
+    } else {
+        watchReadiness();
+    }
+
+    // ---- Login detection ----
+
+    // Targeted check: selector lookups and button labels only (textContent,
+    // so no layout or full-page text serialization)
+    function looksLoggedIn() {
+        if (!document.querySelector(LOGGED_IN_SELECTOR)) {
+            return false;
+        }
+        var buttons = document.getElementsByTagName('button');
+        for (var i = 0; i < buttons.length; i++) {
+            var text = buttons[i].textContent || '';
+            if (text.indexOf('Log In') >= 0 || text.indexOf('Sign Up') >= 0) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    function stopLoginWatch() {
+        if (loginObserver) {
+            loginObserver.disconnect();
+            loginObserver = null;
+        }
+    }
+
+    function reportLoginIfDetected() {
+        if (looksLoggedIn()) {
+            stopLoginWatch();
+            callBridge('loggedIn');
+            return true;
+        }
+        return false;
+    }
+
+    // ---- Template shortcuts ----
+
+    document.addEventListener('keydown', function(event) {
+        var activeElement = document.activeElement;
+
+        // Make sure we're in an input/textarea element
+        var isInputElement = activeElement && (
+            activeElement.tagName === 'INPUT' ||
+            activeElement.tagName === 'TEXTAREA'
+        );
+        if (!isInputElement) {
+            return;
+        }
+
+        // Make sure it's specifically the OpenEvidence search box
+        var placeholder = (activeElement.placeholder || '').toLowerCase();
+        var isOpenEvidenceSearchBox = (
+            placeholder.includes('medical') ||
+            placeholder.includes('question') ||
+            (activeElement.type || '') === 'text' ||
+            activeElement.tagName === 'TEXTAREA'
+        );
+        if (!isOpenEvidenceSearchBox) {
+            return;
+        }
+
+        for (var i = 0; i < keybindings.length; i++) {
+            var binding = keybindings[i];
+            if (keysMatch(event, binding.keys)) {
+                console.log('Anki: Keybinding "' + binding.name + '" triggered');
+                event.preventDefault();
+
+                // Ask Anki for the text of this template
+                pendingCardText = {index: i, element: activeElement, keys: binding.keys};
+                callBridge('cardText', i, receiveCardText.bind(null, i));
+                break; // Only trigger first matching keybinding
+            }
+        }
+    }, true);
+
+    // ---- Auth button click tracking ----
+
+    document.addEventListener('click', function(event) {
+        // Traverse up to find the actual button/link (in case user clicks on text inside)
+        var clickedElement = event.target;
+        for (var i = 0; i < 5 && clickedElement; i++) {
+            var tagName = clickedElement.tagName ? clickedElement.tagName.toLowerCase() : '';
+            if (tagName !== 'button' && tagName !== 'a') {
+                clickedElement = clickedElement.parentElement;
+                continue;
+            }
+
+            var text = (clickedElement.textContent || '').toLowerCase().trim();
+            var href = (clickedElement.href || '').toLowerCase();
+
+            if (text === 'sign up' || text === 'sign up for free access' ||
+                href.includes('/signup') || href.includes('/register')) {
+                callBridge('authButtonClicked', 'signup');
+                break;
+            }
+
+            if (text === 'log in' || text === 'login' || text === 'log in here' ||
+                href.includes('/login') || href.includes('/signin')) {
+                callBridge('authButtonClicked', 'login');
+                break;
+            }
+
+            clickedElement = clickedElement.parentElement;
+        }
+    }, true);
+
+    // ---- Message tracking ----
+
+    // Debounce to prevent double-counting (Enter key + form submit can fire close together)
+    var lastMessageTime = 0;
+    function trackMessage() {
+        var now = Date.now();
+        if (now - lastMessageTime > 200) {
+            lastMessageTime = now;
+            callBridge('messageSent');
+        }
+    }
+
+    document.addEventListener('submit', function() {
+        trackMessage();
+    }, true);
+
+    // Enter key in a chat-like input/textarea
+    document.addEventListener('keydown', function(event) {
+        if (event.key !== 'Enter' || event.shiftKey) {
+            return;
+        }
+        var target = event.target;
+        var tagName = target.tagName.toLowerCase();
+        if (tagName === 'input' || tagName === 'textarea') {
+            var placeholder = (target.placeholder || '').toLowerCase();
+            var value = (target.value || '').trim();
+            if (placeholder.includes('question') || placeholder.includes('search') ||
+                placeholder.includes('ask') || placeholder.includes('message') ||
+                placeholder.includes('medical') || placeholder.includes('follow') ||
+                value.length > 0) {
+                trackMessage();
+            }
+        }
+    }, true);
+
+    // Clicks on send/submit buttons (including icon-only buttons)
+    document.addEventListener('click', function(event) {
+        var target = event.target;
+        while (target && target.tagName !== 'BUTTON' && target !== document.body) {
+            target = target.parentElement;
+        }
+        if (!target || target.tagName !== 'BUTTON') {
+            return;
+        }
+
+        var buttonText = (target.textContent || '').toLowerCase();
+        var ariaLabel = (target.getAttribute('aria-label') || '').toLowerCase();
+        var buttonType = (target.getAttribute('type') || '').toLowerCase();
+        var hasSvg = target.querySelector('svg') !== null;
+        var className = (target.className || '').toString().toLowerCase();
+
+        if (buttonText.includes('send') || buttonText.includes('submit') ||
+            buttonText.includes('ask') || ariaLabel.includes('send') ||
+            ariaLabel.includes('submit') || buttonType === 'submit' ||
+            (hasSvg && (className.includes('send') || className.includes('submit') ||
+             className.includes('primary') || className.includes('action')))) {
+            trackMessage();
+        }
+
+        // Also track if button is near an input/textarea (likely a send button)
+        var parent = target.parentElement;
+        if (parent && hasSvg && parent.querySelector('input, textarea') !== null) {
+            trackMessage();
+        }
+    }, true);
+
+    // Answer to a cardText request
+    function receiveCardText(index, text) {
+        var pending = pendingCardText;
+        pendingCardText = null;
+        if (!pending || pending.index !== index) {
+            return;
+        }
+
+        if (text) {
+            fillInputField(pending.element, text);
+            console.log('Anki: Filled search box with card text using React-compatible events');
+            callBridge('tutorialEvent', 'shortcut_used');
+            callBridge('templateUsed', pending.keys.join('+'));
+        } else {
+            console.log('Anki: No card text available for this keybinding');
+        }
+    }
+
+    // ---- Public API (called from Python) ----
+
+    window.ankiPanel = {
+        version: VERSION,
+
+        isReady: function() {
+            return isReady;
+        },
+
+        // Watch for the signed-in UI; reports bridge.loggedIn() once
+        watchLogin: function() {
+            if (loginObserver || reportLoginIfDetected()) {
+                return;
+            }
+            loginObserver = new MutationObserver(function() {
+                if (loginCheckScheduled) {
+                    return;
+                }
+                loginCheckScheduled = true;
+                setTimeout(function() {
+                    loginCheckScheduled = false;
+                    if (loginObserver) {
+                        reportLoginIfDetected();
+                    }
+                }, LOGIN_CHECK_THROTTLE_MS);
+            });
+            loginObserver.observe(document.body || document.documentElement, {childList: true, subtree: true});
+        },
+
+        stopLoginWatch: stopLoginWatch,
+
+        setKeybindings: function(list) {
+            keybindings = list || [];
+        },
+
+        // Add to Chat: append text to the follow-up input (active conversation)
+        // or the main search input
+        addContext: function(newText) {
+            var selector = document.querySelector(FOLLOW_UP_SELECTOR) ? FOLLOW_UP_SELECTOR : SEARCH_INPUT_SELECTOR;
+            whenElement(selector, function(searchInput) {
+                var existingText = searchInput.value.trim();
+                var finalText = existingText ? existingText + ' ' + newText : newText;
+
+                setNativeValue(searchInput, finalText);
+                searchInput.dispatchEvent(new InputEvent('input', { bubbles: true, cancelable: true, inputType: 'insertText', data: finalText }));
+                searchInput.dispatchEvent(new Event('change', { bubbles: true }));
+                searchInput.focus();
+
+                console.log('Anki: Added context to search box');
+            });
+        },
+
+        // Unsent text in the chat box (saved before the page is frozen)
+        getDraft: function() {
+            var input = document.querySelector(FOLLOW_UP_SELECTOR) || document.querySelector(SEARCH_INPUT_SELECTOR);
+            return input ? input.value : '';
+        },
+
+        // Put a saved draft back after the page was discarded and reloaded
+        restoreDraft: function(text) {
+            var selector = document.querySelector(FOLLOW_UP_SELECTOR) ? FOLLOW_UP_SELECTOR : SEARCH_INPUT_SELECTOR;
+            whenElement(selector, function(input) {
+                if (input.value) {
+                    return;
+                }
+                setNativeValue(input, text);
+                input.dispatchEvent(new InputEvent('input', { bubbles: true, cancelable: true, inputType: 'insertText', data: text }));
+                input.dispatchEvent(new Event('change', { bubbles: true }));
+            });
+        },
+
+        // Ask Question: fill the search input and submit it
+        askQuery: function(text) {
+            whenElement(SEARCH_INPUT_SELECTOR, function(searchInput) {
+                setNativeValue(searchInput, text);
+                searchInput.dispatchEvent(new InputEvent('input', { bubbles: true, cancelable: true, inputType: 'insertText', data: text }));
+                searchInput.dispatchEvent(new Event('change', { bubbles: true }));
+                searchInput.focus();
+
+                // Submit after React has processed the input
+                setTimeout(function() {
+                    var form = searchInput.closest('form');
+                    var submitButton = document.querySelector('button[type="submit"]') ||
+                                       document.querySelector('button:has(svg)') ||
+                                       (form && form.querySelector('button'));
+
+                    if (submitButton) {
+                        submitButton.click();
+                        console.log('Anki: Auto-submitted query');
+                    } else {
+                        searchInput.dispatchEvent(new KeyboardEvent('keydown', {
+                            key: 'Enter',
+                            code: 'Enter',
+                            keyCode: 13,
+                            which: 13,
+                            bubbles: true,
+                            cancelable: true
+                        }));
+                        console.log('Anki: Simulated Enter key');
+                    }
+                }, 100);
+
+                console.log('Anki: Added query with context to search box');
+            });
+        },
+
+        // Replay actions queued while the page was loading, in order:
+        // [["context", text] | ["query", text], ...]
+        runActions: function(actions) {
+            var index = 0;
+            function next() {
+                if (index >= actions.length) {
+                    return;
+                }
+                var action = actions[index++];
+                if (action[0] === 'query') {
+                    window.ankiPanel.askQuery(action[1]);
+                    setTimeout(next, QUERY_SETTLE_MS);
+                } else {
+                    window.ankiPanel.addContext(action[1]);
+                    next();
+                }
+            }
+            next();
+        }
+    };
+})();
+""" % {"version": PANEL_API_VERSION, "bridge": BRIDGE_OBJECT_NAME}
+
+
+def call_js(function: str, *args) -> str:
+    """
+    Build a call into the page API, e.g. call_js("addContext", text).
+
+    Arguments are JSON-encoded, so any Python string is passed safely.
+    """
+    encoded = ", ".join(json.dumps(arg) for arg in args)
+    return f"window.ankiPanel && window.ankiPanel.{function}({encoded});"
+
+
+_qwebchannel_js = None
+
+
+def _load_qwebchannel_js() -> str:
+    """Read qwebchannel.js from the Qt resource system (cached)."""
+    global _qwebchannel_js
+    if _qwebchannel_js is None:
+        _qwebchannel_js = ""
+        try:
+            resource = QFile(_QWEBCHANNEL_JS_RESOURCE)
+            try:
+                opened = resource.open(QIODevice.OpenModeFlag.ReadOnly)
+            except AttributeError:
+                opened = resource.open(QIODevice.ReadOnly)
+            if opened:
+                _qwebchannel_js = bytes(resource.readAll()).decode("utf-8")
+                resource.close()
+        except Exception as e:
+            print(f"OpenEvidence: Could not load qwebchannel.js: {e}")
+    return _qwebchannel_js
+
+
+def install_panel_api(scripts) -> bool:
+    """
+    Register the page API in a QWebEngineScriptCollection (profile or page).
+
+    Safe to call more than once - any previously registered copy is replaced.
+
+    Returns:
+        True if the script was registered
+    """
+    if QWebEngineScript is None or scripts is None:
+        return False
+
+    try:
+        for existing in scripts.find(SCRIPT_NAME):
+            scripts.remove(existing)
+
+        script = QWebEngineScript()
+        script.setName(SCRIPT_NAME)
+        script.setSourceCode(_load_qwebchannel_js() + PANEL_API_JS)
+        try:
+            script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+        except AttributeError:
+            # PyQt5 enum style
+            script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+        script.setWorldId(PANEL_WORLD_ID)
+        script.setRunsOnSubFrames(False)
+        scripts.insert(script)
+        return True
+    except Exception as e:
+        print(f"OpenEvidence: Error installing panel API script: {e}")
+        return False
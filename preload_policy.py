@@ -0,0 +1,170 @@
+"""
+Preload Policy - Decide whether the panel is built at startup
+
+Building the dock creates the QWebEngineView and starts loading
+openevidence.com. The `preload_mode` config setting chooses when:
+- eager: shortly after Anki starts, so the panel is ready on first open
+- lazy: on first open (toolbar click, Add to Chat, Ask Question)
+- adaptive: eager for users who usually open the panel early in a session,
+  lazy otherwise, decided from recent session history
+
+Outcomes are accumulated per mode in the analytics key `preload_metrics`
+(sessions, dock build cost, and how long the first open waited for the page)
+so the default can be tuned from data.
+"""
+
+import time
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from . import diagnostics
+from .session_log import SessionLog
+
+# Sessions from this many recent days are considered
+ADAPTIVE_LOOKBACK_DAYS = 14
+# With fewer sessions than this, adaptive falls back to eager
+ADAPTIVE_MIN_SESSIONS = 3
+# An open within this many seconds of Anki starting counts as "early"
+EARLY_OPEN_SECONDS = 600
+# Preload if at least this share of recent sessions opened the panel early
+ADAPTIVE_EAGER_RATE = 0.3
+
+
+def opened_early(session: Dict) -> bool:
+    """Whether the panel was opened early in a session (SessionLog dict form)."""
+    opened = session.get("panel_opened_s")
+    if opened is not None:
+        return opened <= EARLY_OPEN_SECONDS
+    # Sessions recorded before open times were tracked: a sent message
+    # means the panel was used at some point
+    return session.get("messages", 0) > 0
+
+
+def decide_adaptive(sessions: SessionLog, today: str, current_index: int = -1) -> str:
+    """
+    Pick "eager" or "lazy" from recent sessions.
+
+    Args:
+        sessions: analytics session log
+        today: current day (YYYY-MM-DD)
+        current_index: index of this launch's session in today's list (skipped)
+    """
+    cutoff = (date.fromisoformat(today) - timedelta(days=ADAPTIVE_LOOKBACK_DAYS)).isoformat()
+    total = 0
+    early = 0
+    for session in sessions.sessions_since(cutoff):
+        if session["day"] == today and session["index"] == current_index:
+            continue
+        total += 1
+        if opened_early(session):
+            early += 1
+
+    if total < ADAPTIVE_MIN_SESSIONS:
+        return "eager"
+    return "eager" if early / total >= ADAPTIVE_EAGER_RATE else "lazy"
+
+
+class PreloadTracker:
+    """
+    Resolves the preload strategy for this session and records its outcome.
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.strategy: Optional[str] = None
+        self._opened_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+        self._open_recorded = False
+
+    @property
+    def metrics_key(self) -> str:
+        """Bucket in preload_metrics ("eager", "lazy", "adaptive:eager", ...)."""
+        if self.mode == "adaptive":
+            return f"adaptive:{self.strategy}"
+        return self.mode or "unknown"
+
+    def start(self, mode: str) -> str:
+        """
+        Resolve the configured mode for this session.
+
+        Returns:
+            "eager" or "lazy"
+        """
+        from .analytics import get_current_session
+        from .analytics_store import get_analytics_store
+
+        self.mode = mode
+        if mode == "adaptive":
+            day, index = get_current_session()
+            today = day or date.today().isoformat()
+            try:
+                self.strategy = decide_adaptive(get_analytics_store().sessions(), today, index)
+            except (ValueError, TypeError):
+                self.strategy = "eager"
+        else:
+            self.strategy = "lazy" if mode == "lazy" else "eager"
+
+        diagnostics.set_value("preload_mode", self.metrics_key)
+        self._update_metrics(sessions=1)
+        return self.strategy
+
+    def record_build(self, ms: float):
+        """Time spent building the dock (at startup when eager, on first open when lazy)."""
+        diagnostics.record_timing(f"panel_build_{self.strategy}_ms", ms)
+        self._update_metrics(builds=1, build_ms_total=round(ms))
+
+    def panel_opened(self, requested_at: Optional[float] = None):
+        """
+        The user opened the panel (only the first open is measured).
+
+        Args:
+            requested_at: time.perf_counter() of the click, so a lazy build
+                counts toward the wait
+        """
+        if self._opened_at is None:
+            self._opened_at = requested_at or time.perf_counter()
+            if self._ready_at is not None:
+                self._record_first_open(0.0)
+
+    def panel_ready(self):
+        """The panel page became ready."""
+        if self._ready_at is None:
+            self._ready_at = time.perf_counter()
+            if self._opened_at is not None:
+                self._record_first_open((self._ready_at - self._opened_at) * 1000)
+
+    def _record_first_open(self, wait_ms: float):
+        if self._open_recorded:
+            return
+        self._open_recorded = True
+        diagnostics.record_timing(f"first_open_wait_{self.strategy}_ms", wait_ms)
+        self._update_metrics(first_opens=1, first_open_wait_ms_total=round(wait_ms))
+
+    def _update_metrics(self, **increments):
+        if self.mode is None:
+            return
+        from .analytics_store import get_analytics_store
+        store = get_analytics_store()
+        metrics = dict(store.get("preload_metrics") or {})
+        bucket = dict(metrics.get(self.metrics_key) or {})
+        for name, amount in increments.items():
+            bucket[name] = bucket.get(name, 0) + amount
+        metrics[self.metrics_key] = bucket
+        store.set("preload_metrics", metrics)
+
+
+# Singleton instance
+_preload_tracker = None
+
+
+def get_preload_tracker() -> PreloadTracker:
+    """
+    Get the global PreloadTracker singleton.
+
+    Returns:
+        PreloadTracker instance
+    """
+    global _preload_tracker
+    if _preload_tracker is None:
+        _preload_tracker = PreloadTracker()
+    return _preload_tracker
@@ -0,0 +1,58 @@
+"""
+Pycmd Router - Dispatch of the add-on's pycmd messages from Anki webviews
+
+Messages have the form:
+- "openevidence"                      (toolbar button, no payload)
+- "openevidence:<command>:<json>"     (highlight bubble, JSON object payload)
+
+Every pycmd in Anki passes through the webview_did_receive_js_message hook,
+including the reviewer's own "ans" / "ease3" traffic, so routing is one
+prefix split and one dict lookup; anything else is returned untouched.
+"""
+
+import json
+from typing import Callable, Dict
+
+from . import diagnostics
+
+PYCMD_PREFIX = "openevidence"
+
+# command -> handler(payload: dict)
+_handlers: Dict[str, Callable[[dict], None]] = {}
+
+
+def register_pycmd(command: str, handler: Callable[[dict], None]):
+    """
+    Register a handler for "openevidence:<command>:<json>".
+
+    Use command "" for the bare "openevidence" message.
+    """
+    _handlers[command] = handler
+
+
+def on_webview_did_receive_js_message(handled, message, context):
+    """webview_did_receive_js_message hook"""
+    prefix, _, rest = message.partition(":")
+    if prefix != PYCMD_PREFIX:
+        return handled
+
+    command, _, raw_payload = rest.partition(":")
+    handler = _handlers.get(command)
+    if handler is None:
+        diagnostics.increment("pycmd_unknown")
+        return handled
+
+    payload = {}
+    if raw_payload:
+        try:
+            payload = json.loads(raw_payload)
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            diagnostics.increment("pycmd_malformed")
+            print(f"OpenEvidence: Malformed {command} payload")
+            return (True, None)
+
+    diagnostics.increment(f"pycmd_{command or 'toggle'}")
+    handler(payload)
+    return (True, None)
@@ -4,7 +4,6 @@ Shows to verified returning users (2+ days active, 2nd message of the day).
 """
 
 from datetime import datetime
-from aqt import mw
 
 try:
     from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QDialog, QGraphicsDropShadowEffect
@@ -18,7 +17,8 @@ except ImportError:
     from PyQt5.QtSvg import QSvgRenderer
 
     from PyQt5.QtSvg import QSvgRenderer
-from .utils import ADDON_NAME
+from .analytics_store import get_analytics_store
+from .engagement import get_engagement
 from .theme_manager import ThemeManager
 
 # Referral link (GitHub repo)
@@ -44,47 +44,21 @@ def should_show_referral() -> bool:
     """
     Check if we should show the referral modal.
     Trigger IF AND ONLY IF:
-    1. Days Active >= 2 (used addon on 2+ distinct days)
-    2. Just sent 2nd message today (messages == 2 in current session)
+    1. Days Active >= referral_days_threshold (used addon on that many distinct days)
+    2. Messages today >= referral_threshold
     3. Not shown yet (!has_shown_referral)
+
+    Counters and thresholds are kept in memory by the engagement service.
     """
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    analytics = config.get("analytics", {})
-    
-    # Check if already shown
-    if analytics.get("has_shown_referral", False):
-        return False
-    
-    # Check days active
-    daily_usage = analytics.get("daily_usage", {})
-    days_active = len(daily_usage.keys())
-    
-    if days_active < config.get("referral_days_threshold", 3):
-        return False
-    
-    # Check messages today
-    today = datetime.now().strftime("%Y-%m-%d")
-    todays_sessions = daily_usage.get(today, [])
-    
-    # Sum all messages across today's sessions
-    messages_today = sum(session.get("messages", 0) for session in todays_sessions)
-    
-    # Trigger on exact message count (configurable)
-    referral_threshold = config.get("referral_threshold", 4)
-    if messages_today < referral_threshold:
-        return False
-    
-    return True
+    return get_engagement().referral_eligible()
 
 
 def mark_referral_shown():
     """Mark that the referral modal has been shown."""
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    analytics = config.get("analytics", {})
-    analytics["has_shown_referral"] = True
-    analytics["referral_shown_date"] = datetime.now().isoformat()
-    config["analytics"] = analytics
-    mw.addonManager.writeConfig(ADDON_NAME, config)
+    store = get_analytics_store()
+    store.set("has_shown_referral", True)
+    get_engagement().mark_shown("referral")
+    store.set("referral_shown_date", datetime.now().isoformat())
 
 
 def track_referral_modal(status: str, seconds_open: float):
@@ -96,12 +70,9 @@ def track_referral_modal(status: str, seconds_open: float):
     - "explicit_reject": Clicked skip button
     - "ignored_quickly": Closed in < 10 seconds without action
     """
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    analytics = config.get("analytics", {})
-    analytics["referral_modal_status"] = status
-    analytics["referral_modal_seconds_open"] = round(seconds_open, 1)
-    config["analytics"] = analytics
-    mw.addonManager.writeConfig(ADDON_NAME, config)
+    store = get_analytics_store()
+    store.set("referral_modal_status", status)
+    store.set("referral_modal_seconds_open", round(seconds_open, 1))
     print(f"AI Panel: Referral modal tracked - {status} ({seconds_open:.1f}s)")
 
 
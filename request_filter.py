@@ -0,0 +1,167 @@
+"""
+Request Filter - Block non-essential third-party requests from the panel page
+
+The panel loads the full openevidence.com site, which pulls in analytics
+beacons, web fonts and third-party widgets that do nothing inside a side
+panel. A QWebEngineUrlRequestInterceptor on the persistent profile cancels
+requests to hosts on `request_block_list` unless the host is also on
+`request_allow_list` (the allow list wins). Entries match the host and all
+of its subdomains; top-level navigations are never blocked.
+
+interceptRequest runs for every sub-resource, so decisions are cached per
+host. Blocked requests and an estimate of the bytes they would have cost are
+counted in diagnostics (the interceptor never sees a response, so bytes
+saved use typical transfer sizes per resource type).
+"""
+
+from typing import Dict, FrozenSet, Iterable, Optional
+
+try:
+    from PyQt6.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+except ImportError:
+    from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+
+from . import diagnostics
+from .config_store import get_config, get_config_store
+
+# Forget cached host decisions past this many hosts
+HOST_CACHE_LIMIT = 512
+
+# Typical transfer sizes (KB) of blocked resources, for the bytes-saved estimate
+ESTIMATED_KB_BY_TYPE = {
+    "ResourceTypeScript": 40,
+    "ResourceTypeSubFrame": 50,
+    "ResourceTypeFontResource": 30,
+    "ResourceTypeStylesheet": 10,
+    "ResourceTypeImage": 2,
+    "ResourceTypeXhr": 1,
+    "ResourceTypePing": 1,
+}
+DEFAULT_ESTIMATED_KB = 1
+
+
+def _resource_type(name):
+    """QWebEngineUrlRequestInfo resource type member by name (PyQt5/6)."""
+    types = getattr(QWebEngineUrlRequestInfo, "ResourceType", QWebEngineUrlRequestInfo)
+    return getattr(types, name, None)
+
+
+def normalize_hosts(entries: Iterable[str]) -> FrozenSet[str]:
+    """Lower-case host entries, dropping schemes, paths and leading dots."""
+    hosts = set()
+    for entry in entries or ():
+        host = str(entry).strip().lower()
+        if "://" in host:
+            host = host.split("://", 1)[1]
+        host = host.split("/", 1)[0].lstrip(".")
+        if host:
+            hosts.add(host)
+    return frozenset(hosts)
+
+
+def match_host(host: str, rules: FrozenSet[str]) -> Optional[str]:
+    """Return the rule matching host or one of its parent domains, if any."""
+    while host:
+        if host in rules:
+            return host
+        _, _, host = host.partition(".")
+    return None
+
+
+class RequestFilter(QWebEngineUrlRequestInterceptor):
+    """
+    Profile-wide interceptor applying the configured block/allow lists.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.enabled = True
+        self._block: FrozenSet[str] = frozenset()
+        self._allow: FrozenSet[str] = frozenset()
+        # host -> matching block rule, or None if the host is allowed
+        self._decisions: Dict[str, Optional[str]] = {}
+
+        self._main_frame_type = _resource_type("ResourceTypeMainFrame")
+        self._estimated_kb = {}
+        for name, kb in ESTIMATED_KB_BY_TYPE.items():
+            member = _resource_type(name)
+            if member is not None:
+                self._estimated_kb[member] = kb
+
+        self.load_config()
+        get_config_store().changed.connect(self.on_config_changed)
+
+    def load_config(self):
+        config = get_config()
+        self.enabled = config.request_blocking_enabled
+        self._block = normalize_hosts(config.request_block_list)
+        self._allow = normalize_hosts(config.request_allow_list)
+        self._decisions = {}
+        diagnostics.set_value("request_blocking", "on" if self.enabled else "off")
+
+    def on_config_changed(self, changed_keys):
+        if changed_keys & {"request_blocking_enabled", "request_block_list", "request_allow_list"}:
+            self.load_config()
+
+    def blocking_rule(self, host: str) -> Optional[str]:
+        """Block rule that applies to host (None if the request may proceed)."""
+        try:
+            return self._decisions[host]
+        except KeyError:
+            pass
+        rule = None
+        if not match_host(host, self._allow):
+            rule = match_host(host, self._block)
+        if len(self._decisions) >= HOST_CACHE_LIMIT:
+            self._decisions.clear()
+        self._decisions[host] = rule
+        return rule
+
+    def interceptRequest(self, info):
+        if not self.enabled or not self._block:
+            return
+        resource_type = info.resourceType()
+        if resource_type == self._main_frame_type:
+            return
+
+        rule = self.blocking_rule(info.requestUrl().host().lower())
+        if rule is None:
+            return
+
+        info.block(True)
+        diagnostics.increment("requests_blocked")
+        diagnostics.increment(f"requests_blocked_{rule}")
+        diagnostics.increment(
+            "requests_blocked_est_kb", self._estimated_kb.get(resource_type, DEFAULT_ESTIMATED_KB)
+        )
+
+
+# Singleton instance - must stay alive as long as the profile uses it
+_request_filter = None
+
+
+def install_request_filter(profile) -> Optional[RequestFilter]:
+    """
+    Install the request filter on a profile (once per session).
+
+    Returns:
+        The installed RequestFilter, or None if the profile doesn't support it
+    """
+    global _request_filter
+    if _request_filter is None:
+        _request_filter = RequestFilter()
+
+    # setUrlRequestInterceptor needs Qt 5.13+; older Qt only has the
+    # IO-thread variant
+    if hasattr(profile, "setUrlRequestInterceptor"):
+        profile.setUrlRequestInterceptor(_request_filter)
+    elif hasattr(profile, "setRequestInterceptor"):
+        profile.setRequestInterceptor(_request_filter)
+    else:
+        return None
+    return _request_filter
+
+
+def get_request_filter() -> Optional[RequestFilter]:
+    """The installed RequestFilter, if any."""
+    return _request_filter
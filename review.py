@@ -4,7 +4,6 @@ Similar structure to referral.py but with different copy and destination.
 """
 
 from datetime import datetime
-from aqt import mw
 
 try:
     from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QGraphicsDropShadowEffect
@@ -15,7 +14,8 @@ except ImportError:
     from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QRect, QEasingCurve
     from PyQt5.QtGui import QCursor, QColor
 
-from .utils import ADDON_NAME
+from .analytics_store import get_analytics_store
+from .engagement import get_engagement
 from .theme_manager import ThemeManager
 
 # AnkiWeb review page for the addon
@@ -28,50 +28,20 @@ def should_show_review() -> bool:
     Trigger IF AND ONLY IF:
     1. Referral modal was already shown (has_shown_referral == True)
     2. Review modal not yet shown (!has_shown_review)
-    3. Days active >= review_days_threshold (default: 7)
+    3. Days active >= review_days_threshold (default: 8)
     4. Messages today >= review_message_threshold (default: 3)
+
+    Counters and thresholds are kept in memory by the engagement service.
     """
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    analytics = config.get("analytics", {})
-    
-    # Must have seen referral first
-    if not analytics.get("has_shown_referral", False):
-        return False
-    
-    # Check if already shown review
-    if analytics.get("has_shown_review", False):
-        return False
-    
-    # Check days active
-    daily_usage = analytics.get("daily_usage", {})
-    days_active = len(daily_usage.keys())
-    
-    if days_active < config.get("review_days_threshold", 8):
-        return False
-    
-    # Check messages today
-    today = datetime.now().strftime("%Y-%m-%d")
-    todays_sessions = daily_usage.get(today, [])
-    
-    # Sum all messages across today's sessions
-    messages_today = sum(session.get("messages", 0) for session in todays_sessions)
-    
-    # Trigger on message count threshold
-    review_threshold = config.get("review_message_threshold", 3)
-    if messages_today < review_threshold:
-        return False
-    
-    return True
+    return get_engagement().review_eligible()
 
 
 def mark_review_shown():
     """Mark that the review modal has been shown."""
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    analytics = config.get("analytics", {})
-    analytics["has_shown_review"] = True
-    analytics["review_shown_date"] = datetime.now().isoformat()
-    config["analytics"] = analytics
-    mw.addonManager.writeConfig(ADDON_NAME, config)
+    store = get_analytics_store()
+    store.set("has_shown_review", True)
+    get_engagement().mark_shown("review")
+    store.set("review_shown_date", datetime.now().isoformat())
 
 
 def track_review_modal(status: str, seconds_open: float):
@@ -83,12 +53,9 @@ def track_review_modal(status: str, seconds_open: float):
     - "explicit_reject": Clicked skip button
     - "ignored_quickly": Closed in < 10 seconds without action
     """
-    config = mw.addonManager.getConfig(ADDON_NAME) or {}
-    analytics = config.get("analytics", {})
-    analytics["review_modal_status"] = status
-    analytics["review_modal_seconds_open"] = round(seconds_open, 1)
-    config["analytics"] = analytics
-    mw.addonManager.writeConfig(ADDON_NAME, config)
+    store = get_analytics_store()
+    store.set("review_modal_status", status)
+    store.set("review_modal_seconds_open", round(seconds_open, 1))
     print(f"AI Panel: Review modal tracked - {status} ({seconds_open:.1f}s)")
 
 
@@ -3,8 +3,12 @@ Reviewer highlight feature - Cursor-style floating action bar
 Shows a floating action bar when text is highlighted on flashcards
 """
 
+import json
+import time
+
 from aqt import mw, gui_hooks
-from .utils import ADDON_NAME
+from . import diagnostics
+from .config_store import get_config, get_config_store
 from .theme_manager import ThemeManager
 
 
@@ -92,7 +96,7 @@ HIGHLIGHT_BUBBLE_JS = """
             
             // Notify tutorial that shortcut was used
             try {
-                pycmd('openevidence:tutorial_event:shortcut_used');
+                pycmd('openevidence:tutorial_event:' + JSON.stringify({event: 'shortcut_used'}));
             } catch (err) {
                 // Ignore if pycmd not available
             }
@@ -125,7 +129,7 @@ HIGHLIGHT_BUBBLE_JS = """
             
             // Notify tutorial that shortcut was used
             try {
-                pycmd('openevidence:tutorial_event:shortcut_used');
+                pycmd('openevidence:tutorial_event:' + JSON.stringify({event: 'shortcut_used'}));
             } catch (err) {
                 // Ignore if pycmd not available
             }
@@ -626,7 +630,7 @@ HIGHLIGHT_BUBBLE_JS = """
     function handleAddToChat() {
         console.log('Anki: Add to Chat clicked, text:', selectedText);
         // Send message to Python
-        pycmd('openevidence:add_context:' + encodeURIComponent(selectedText));
+        pycmd('openevidence:add_context:' + JSON.stringify({text: selectedText}));
         hideBubble();
     }
 
@@ -639,8 +643,8 @@ HIGHLIGHT_BUBBLE_JS = """
             // Use contextText if available, otherwise use selectedText
             const finalContext = contextText || selectedText;
             console.log('Anki: Question submitted:', query, 'Context:', finalContext);
-            // Send message to Python with format: query|context
-            pycmd('openevidence:ask_query:' + encodeURIComponent(query) + '|' + encodeURIComponent(finalContext));
+            // Send message to Python as a JSON payload
+            pycmd('openevidence:ask_query:' + JSON.stringify({query: query, context: finalContext}));
             hideBubble();
             // Clear context after submission
             contextText = '';
@@ -690,7 +694,7 @@ HIGHLIGHT_BUBBLE_JS = """
         
         // Notify tutorial that text was highlighted (Quick Action bar is showing)
         try {
-            pycmd('openevidence:tutorial_event:text_highlighted');
+            pycmd('openevidence:tutorial_event:' + JSON.stringify({event: 'text_highlighted'}));
         } catch (e) {
             // Ignore if pycmd not available
         }
@@ -791,6 +795,29 @@ HIGHLIGHT_BUBBLE_JS = """
     // Note: Bubble no longer auto-hides when clicking outside
     // Only the X button in the input state can close the bubble
 
+    // Report the first frame painted after each card swap (Anki replaces the
+    // children of #qa; its onUpdateHook list is reset per card, so a
+    // persistent observer is used instead). Python times it from card_will_show
+    var qa = document.getElementById('qa');
+    if (qa && window.MutationObserver) {
+        let paintPending = false;
+        new MutationObserver(function() {
+            if (paintPending) return;
+            paintPending = true;
+            // rAF runs before the frame; the timeout lands after it is painted
+            requestAnimationFrame(function() {
+                setTimeout(function() {
+                    paintPending = false;
+                    try {
+                        pycmd('openevidence:reviewer_paint:{}');
+                    } catch (e) {
+                        // Ignore if pycmd not available
+                    }
+                }, 0);
+            });
+        }).observe(qa, {childList: true});
+    }
+
     // Create the bubble on load
     bubble = createBubble();
     console.log('Anki: Highlight bubble ready');
@@ -798,8 +825,122 @@ HIGHLIGHT_BUBBLE_JS = """
 """
 
 
+def format_shortcut_display(keys):
+    """Create display text for the bubble buttons (e.g., "⌘F" or "Ctrl+Shift+F")"""
+    display_keys = []
+    for key in keys:
+        if key == "Meta":
+            display_keys.append("⌘")
+        elif key == "Control":
+            display_keys.append("Ctrl")
+        elif key == "Shift":
+            display_keys.append("Shift")
+        elif key == "Alt":
+            display_keys.append("Alt")
+        else:
+            display_keys.append(key)
+    return "".join(display_keys) if "⌘" in display_keys else "+".join(display_keys)
+
+
+def get_quick_actions_js_config():
+    """Get the quick action keys and display strings from the cached config"""
+    config = get_config()
+    add_to_chat_keys = list(config.quick_action_keys("add_to_chat"))
+    ask_question_keys = list(config.quick_action_keys("ask_question"))
+    return {
+        "addToChat": {"keys": add_to_chat_keys, "display": format_shortcut_display(add_to_chat_keys)},
+        "askQuestion": {"keys": ask_question_keys, "display": format_shortcut_display(ask_question_keys)},
+    }
+
+
+# Payload cache key parts. The version is bumped only when quick_actions
+# change; night mode is cached and refreshed by theme_did_change, so the
+# per-card hook makes no config or profile calls
+_quick_actions_version = 0
+_night_mode = None
+
+# Precomputed HTML/JS for the current key (only one key is ever live)
+_payload_cache = {}
+
+# perf_counter() when the last review question/answer left card_will_show,
+# until the reviewer reports its first painted frame
+_card_shown_at = None
+
+# Payload key the reviewer webview's bubble was last synced to.
+# None until the bubble has been installed in a reviewer page
+_installed_key = None
+
+
+def _payload_key():
+    global _night_mode
+    if _night_mode is None:
+        _night_mode = ThemeManager.is_night_mode()
+    return (_quick_actions_version, _night_mode)
+
+
+def _theme_css():
+    """The :root CSS variable rules for the current theme (without <style> tags)"""
+    css = ThemeManager.get_css_variables()
+    return css.replace("<style>", "").replace("</style>", "").strip()
+
+
+def _get_payload(key):
+    """Build (once per key) every string the reviewer hooks send"""
+    payload = _payload_cache.get(key)
+    if payload is not None:
+        return payload
+
+    theme_css = _theme_css()
+    config_js = f"window.quickActionsConfig = {json.dumps(get_quick_actions_js_config())};"
+
+    # Tiny script bringing an installed bubble up to date with config and theme
+    sync_js = (
+        f"{config_js}"
+        "(function() {"
+        "var style = document.getElementById('oa-theme-vars');"
+        f"if (style) {{ style.textContent = {json.dumps(theme_css)}; }}"
+        "})();"
+    )
+
+    payload = {
+        "install_head": f'<style id="oa-theme-vars">{theme_css}</style>',
+        "install_body": f"<script>{config_js}</script><script>{HIGHLIGHT_BUBBLE_JS}</script>",
+        "sync_js": sync_js,
+        "sync_html": f"<script>{sync_js}</script>",
+        # Full per-card suffix (script guards against running twice)
+        "legacy_suffix": f"<style>{theme_css}</style><script>{config_js}</script><script>{HIGHLIGHT_BUBBLE_JS}</script>",
+    }
+    # Encoded sizes for diagnostics, so the per-card hook doesn't re-encode
+    payload["bytes"] = {
+        name: len(payload[name].encode("utf-8")) for name in ("sync_html", "legacy_suffix")
+    }
+    _payload_cache.clear()
+    _payload_cache[key] = payload
+    return payload
+
+
+def install_highlight_bubble(web_content, context):
+    """Install the highlight bubble once, when the reviewer webview is set up
+
+    The reviewer page persists across cards (Anki swaps only the card HTML),
+    so the theme variables, config and the bubble script are sent once per
+    review session instead of with every question and answer.
+    """
+    global _installed_key
+
+    from aqt.reviewer import Reviewer
+    if not isinstance(context, Reviewer):
+        return
+
+    key = _payload_key()
+    payload = _get_payload(key)
+    web_content.head += payload["install_head"]
+    web_content.body += payload["install_body"]
+    _installed_key = key
+
+
 def inject_highlight_bubble(html, card, context):
-    """Inject the highlight bubble JavaScript into reviewer cards
+    """Per-card hook: append a config/theme delta only if something changed
 
     Args:
         html: The HTML of the question or answer
@@ -808,66 +949,132 @@ def inject_highlight_bubble(html, card, context):
                 "clayoutAnswer", "previewQuestion", "previewAnswer"
 
     Returns:
-        Modified HTML with injected JavaScript
+        HTML, with a small sync script appended when config or theme changed
     """
+    global _installed_key, _card_shown_at
+
     # Only inject in review context (not in card layout or preview)
-    if context in ("reviewQuestion", "reviewAnswer"):
-        # Load shortcuts from config
-        from aqt import mw
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        quick_actions = config.get("quick_actions", {
-            "add_to_chat": {"keys": ["Meta", "F"]},
-            "ask_question": {"keys": ["Meta", "R"]}
-        })
-
-        # Format shortcuts for JavaScript
-        add_to_chat_keys = quick_actions["add_to_chat"]["keys"]
-        ask_question_keys = quick_actions["ask_question"]["keys"]
-
-        # Create display text (e.g., "⌘F" or "Ctrl+Shift+F")
-        def format_shortcut_display(keys):
-            display_keys = []
-            for key in keys:
-                if key == "Meta":
-                    display_keys.append("⌘")
-                elif key == "Control":
-                    display_keys.append("Ctrl")
-                elif key == "Shift":
-                    display_keys.append("Shift")
-                elif key == "Alt":
-                    display_keys.append("Alt")
-                else:
-                    display_keys.append(key)
-            return "".join(display_keys) if "⌘" in display_keys else "+".join(display_keys)
-
-        add_to_chat_display = format_shortcut_display(add_to_chat_keys)
-        ask_question_display = format_shortcut_display(ask_question_keys)
-
-        # Prepend config and append main script
-        config_js = f"""
-        <script>
+    if context not in ("reviewQuestion", "reviewAnswer"):
+        return html
+
+    _card_shown_at = time.perf_counter()
+    key = _payload_key()
+    if key == _installed_key:
+        diagnostics.record_sample("reviewer_inject_bytes", 0)
+        return html
+
+    # Reviewer page was set up without the install hook - send everything
+    part = "legacy_suffix" if _installed_key is None else "sync_html"
+    if part == "sync_html":
+        _installed_key = key
+
+    payload = _get_payload(key)
+    diagnostics.record_sample("reviewer_inject_bytes", payload["bytes"][part])
+    return html + payload[part]
+
+
+def on_reviewer_paint_pycmd(payload):
+    """The reviewer painted its first frame since the last card was shown"""
+    global _card_shown_at
+
+    if _card_shown_at is None:
+        return
+    diagnostics.record_timing("reviewer_first_paint_ms", (time.perf_counter() - _card_shown_at) * 1000)
+    _card_shown_at = None
+
+
+def _eval_in_reviewer(js_code):
+    """Run JavaScript in the reviewer webview. Returns True if it was sent."""
+    if mw.reviewer and hasattr(mw.reviewer, 'web') and mw.reviewer.web:
+        # Try eval() first (Anki's webview method)
+        if hasattr(mw.reviewer.web, 'eval'):
+            mw.reviewer.web.eval(js_code)
+            return True
+        # Fallback to runJavaScript if available
+        if hasattr(mw.reviewer.web, 'page'):
+            mw.reviewer.web.page().runJavaScript(js_code)
+            return True
+    return False
+
+
+def on_theme_changed():
+    """Night mode toggled - rebuild payloads and restyle an open reviewer"""
+    global _night_mode, _installed_key
+
+    _night_mode = ThemeManager.is_night_mode()
+    if _installed_key is None:
+        return
+
+    key = _payload_key()
+    try:
+        if _eval_in_reviewer(_get_payload(key)["sync_js"]):
+            _installed_key = key
+    except Exception as e:
+        print(f"OpenEvidence: Could not update reviewer theme: {e}")
+        # Theme will be synced on next card
+
+
+def push_quick_actions_to_reviewer(changed_keys):
+    """Update the quick actions config in the reviewer's JavaScript context
+
+    Connected to the config store, so it only runs when quick_actions change.
+    """
+    global _installed_key, _quick_actions_version
+
+    if "quick_actions" not in changed_keys:
+        return
+
+    # Invalidate the memoized reviewer payloads
+    _quick_actions_version += 1
+
+    quick_actions = get_quick_actions_js_config()
+    add_to_chat_display = json.dumps(quick_actions["addToChat"]["display"])
+    ask_question_display = json.dumps(quick_actions["askQuestion"]["display"])
+
+    # Create JavaScript to update the config
+    js_code = f"""
+    (function() {{
+        // Initialize config if it doesn't exist
         if (!window.quickActionsConfig) {{
             window.quickActionsConfig = {{}};
         }}
-        window.quickActionsConfig.addToChat = {{
-            keys: {add_to_chat_keys},
-            display: "{add_to_chat_display}"
-        }};
-        window.quickActionsConfig.askQuestion = {{
-            keys: {ask_question_keys},
-            display: "{ask_question_display}"
-        }};
-        </script>
-        """
-
-        # Get CSS variables from ThemeManager
-        css_vars = ThemeManager.get_css_variables()
         
-        return html + css_vars + config_js + f"<script>{HIGHLIGHT_BUBBLE_JS}</script>"
-    
-    return html
+        window.quickActionsConfig.addToChat = {json.dumps(quick_actions["addToChat"])};
+        window.quickActionsConfig.askQuestion = {json.dumps(quick_actions["askQuestion"])};
+        
+        // If bubble is visible, update the display text in the buttons
+        var bubble = document.getElementById('anki-highlight-bubble');
+        if (bubble && bubble.style.display !== 'none') {{
+            var addToChatSpan = bubble.querySelector('#add-to-chat-btn span:last-child');
+            var askQuestionSpan = bubble.querySelector('#ask-question-btn span:last-child');
+            if (addToChatSpan) {{
+                addToChatSpan.textContent = {add_to_chat_display};
+            }}
+            if (askQuestionSpan) {{
+                askQuestionSpan.textContent = {ask_question_display};
+            }}
+        }}
+        
+        console.log('Anki: Quick Actions config updated:', window.quickActionsConfig);
+    }})();
+    """
+
+    # Try to inject into the reviewer webview
+    try:
+        if _eval_in_reviewer(js_code):
+            # Reviewer is current - no per-card delta needed for this change
+            if _installed_key is not None:
+                _installed_key = _payload_key()
+            print("OpenEvidence: Updated quick actions config in reviewer")
+    except Exception as e:
+        print(f"OpenEvidence: Could not update reviewer config: {e}")
+        # Config will be updated on next card review
 
 
 def setup_highlight_hooks():
-    """Register the highlight bubble injection hook"""
+    """Register the highlight bubble install and per-card hooks"""
+    gui_hooks.webview_will_set_content.append(install_highlight_bubble)
     gui_hooks.card_will_show.append(inject_highlight_bubble)
+    if hasattr(gui_hooks, "theme_did_change"):
+        gui_hooks.theme_did_change.append(on_theme_changed)
+    get_config_store().changed.connect(push_quick_actions_to_reviewer)
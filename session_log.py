@@ -0,0 +1,254 @@
+"""
+Session Log - Compact, array-backed replacement for analytics daily_usage
+
+daily_usage used to be a dict of "YYYY-MM-DD" strings to lists of
+{"time": "HH:MM:SS", "messages": n, "panel_opened_s": s} dicts, and nothing
+ever pruned it. The session log keeps the same information in four parallel
+arrays, one entry per session, sorted by day:
+- day: date ordinal
+- time: seconds since midnight
+- messages: messages sent in the session
+- opened: seconds from Anki open to the first panel open (-1 if never)
+
+Sessions older than RETENTION_DAYS are dropped whenever a session is started
+on a new day, so the log stays bounded without a separate cleanup pass. The
+number of distinct days ever active is kept as a running total, so pruning
+doesn't lower it; the last day added to it is kept too, so a day counted
+without sessions (a converted legacy entry) isn't counted again when its
+first session starts.
+
+Serialized form (stored in the analytics snapshot under "sessions"):
+    {"v": 1, "day0": <first ordinal>, "days": [day deltas],
+     "time": [...], "messages": [...], "opened": [...], "days_total": n,
+     "last_counted": <ordinal of the last day in days_total>}
+
+to_daily_usage() rebuilds the legacy dict for the upload payload.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, List, Optional
+
+FORMAT_VERSION = 1
+
+# Days of sessions kept (today included)
+RETENTION_DAYS = 90
+
+NOT_OPENED = -1
+
+
+def _ordinal(day: str) -> int:
+    return date.fromisoformat(day).toordinal()
+
+
+def _seconds(time_str: str) -> int:
+    hours, minutes, seconds = (int(part) for part in time_str.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _time_str(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class SessionLog:
+    """
+    Columnar session history with retention enforced on write.
+    """
+
+    __slots__ = ("_days", "_times", "_messages", "_opened", "days_total", "_last_counted")
+
+    def __init__(self):
+        self._days = array("l")
+        self._times = array("l")
+        self._messages = array("l")
+        self._opened = array("l")
+        self.days_total = 0
+        self._last_counted = 0
+
+    def __len__(self):
+        return len(self._days)
+
+    # ---- Writes ----
+
+    def start(self, day: str, time_str: str) -> int:
+        """Append a session. Returns its index within that day."""
+        ordinal = _ordinal(day)
+        lo, hi = self._day_range(ordinal)
+        if lo == hi:
+            self._count_day(ordinal)
+            self.prune(ordinal - RETENTION_DAYS + 1)
+            lo, hi = self._day_range(ordinal)
+
+        self._days.insert(hi, ordinal)
+        self._times.insert(hi, _seconds(time_str))
+        self._messages.insert(hi, 0)
+        self._opened.insert(hi, NOT_OPENED)
+        return hi - lo
+
+    def add_message(self, day: str, index: int) -> int:
+        """Count a message in a session. Returns its new count (0 if unknown)."""
+        position = self._position(day, index)
+        if position is None:
+            return 0
+        self._messages[position] += 1
+        return self._messages[position]
+
+    def mark_opened(self, day: str, index: int, seconds: int) -> bool:
+        """Record the first panel open of a session. Returns True if recorded."""
+        position = self._position(day, index)
+        if position is None or self._opened[position] != NOT_OPENED:
+            return False
+        self._opened[position] = seconds
+        return True
+
+    def prune(self, cutoff_ordinal: int):
+        """Drop sessions on days before cutoff_ordinal."""
+        count = bisect_left(self._days, cutoff_ordinal)
+        if count:
+            for column in (self._days, self._times, self._messages, self._opened):
+                del column[:count]
+
+    # ---- Reads ----
+
+    def session_count(self, day: str) -> int:
+        lo, hi = self._day_range(_ordinal(day))
+        return hi - lo
+
+    def messages_on(self, day: str) -> int:
+        """Messages sent across all sessions of a day."""
+        lo, hi = self._day_range(_ordinal(day))
+        return sum(self._messages[lo:hi])
+
+    def session_messages(self, day: str, index: int) -> int:
+        position = self._position(day, index)
+        return self._messages[position] if position is not None else 0
+
+    def has_session(self, day: str, index: int) -> bool:
+        return self._position(day, index) is not None
+
+    def has_opened(self, day: str, index: int) -> bool:
+        position = self._position(day, index)
+        return position is not None and self._opened[position] != NOT_OPENED
+
+    def last_day(self) -> Optional[str]:
+        """Most recent day with a session (None if empty)."""
+        return date.fromordinal(self._days[-1]).isoformat() if self._days else None
+
+    def sessions_since(self, day: str) -> List[Dict]:
+        """Sessions on or after day, oldest first, as legacy session dicts."""
+        start = bisect_left(self._days, _ordinal(day))
+        sessions = []
+        previous_day = None
+        index = 0
+        for position in range(start, len(self._days)):
+            ordinal = self._days[position]
+            index = index + 1 if ordinal == previous_day else 0
+            previous_day = ordinal
+            session = self._session_dict(position)
+            session["day"] = date.fromordinal(ordinal).isoformat()
+            session["index"] = index
+            sessions.append(session)
+        return sessions
+
+    def to_daily_usage(self) -> Dict[str, List[Dict]]:
+        """Legacy {day: [session, ...]} form (used for uploads)."""
+        daily_usage: Dict[str, List[Dict]] = {}
+        day_str = None
+        previous_day = None
+        for position, ordinal in enumerate(self._days):
+            if ordinal != previous_day:
+                previous_day = ordinal
+                day_str = date.fromordinal(ordinal).isoformat()
+                daily_usage[day_str] = []
+            daily_usage[day_str].append(self._session_dict(position))
+        return daily_usage
+
+    # ---- Serialization ----
+
+    def to_json(self) -> Dict:
+        deltas = []
+        previous = self._days[0] if self._days else 0
+        for ordinal in self._days:
+            deltas.append(ordinal - previous)
+            previous = ordinal
+        return {
+            "v": FORMAT_VERSION,
+            "day0": self._days[0] if self._days else 0,
+            "days": deltas,
+            "time": self._times.tolist(),
+            "messages": self._messages.tolist(),
+            "opened": self._opened.tolist(),
+            "days_total": self.days_total,
+            "last_counted": self._last_counted,
+        }
+
+    @classmethod
+    def from_json(cls, data: Optional[Dict]) -> "SessionLog":
+        log = cls()
+        if not isinstance(data, dict) or data.get("v") != FORMAT_VERSION:
+            return log
+        ordinal = data.get("day0", 0)
+        for delta in data.get("days", []):
+            ordinal += delta
+            log._days.append(ordinal)
+        log._times.extend(data.get("time", []))
+        log._messages.extend(data.get("messages", []))
+        log._opened.extend(data.get("opened", []))
+        log.days_total = data.get("days_total", len(set(log._days)))
+        log._last_counted = data.get("last_counted", log._days[-1] if log._days else 0)
+        return log
+
+    @classmethod
+    def from_daily_usage(cls, daily_usage: Optional[Dict]) -> "SessionLog":
+        """Convert a legacy daily_usage dict (legacy dict/int days count as active, no sessions)."""
+        log = cls()
+        if not isinstance(daily_usage, dict):
+            return log
+        for day in sorted(daily_usage):
+            try:
+                ordinal = _ordinal(day)
+            except ValueError:
+                continue
+            log._count_day(ordinal)
+            sessions = daily_usage[day]
+            if not isinstance(sessions, list):
+                continue
+            for session in sessions:
+                if not isinstance(session, dict):
+                    continue
+                try:
+                    seconds = _seconds(session.get("time", "00:00:00"))
+                except (ValueError, AttributeError):
+                    seconds = 0
+                log._days.append(ordinal)
+                log._times.append(seconds)
+                log._messages.append(int(session.get("messages", 0) or 0))
+                opened = session.get("panel_opened_s")
+                log._opened.append(int(opened) if opened is not None else NOT_OPENED)
+        if log._days:
+            log.prune(log._days[-1] - RETENTION_DAYS + 1)
+        return log
+
+    # ---- Internals ----
+
+    def _count_day(self, ordinal: int):
+        """Add a day to days_total (once)."""
+        if ordinal != self._last_counted:
+            self.days_total += 1
+            self._last_counted = ordinal
+
+    def _day_range(self, ordinal: int):
+        return bisect_left(self._days, ordinal), bisect_right(self._days, ordinal)
+
+    def _position(self, day: str, index: int) -> Optional[int]:
+        lo, hi = self._day_range(_ordinal(day))
+        if 0 <= index < hi - lo:
+            return lo + index
+        return None
+
+    def _session_dict(self, position: int) -> Dict:
+        session = {"time": _time_str(self._times[position]), "messages": self._messages[position]}
+        if self._opened[position] != NOT_OPENED:
+            session["panel_opened_s"] = self._opened[position]
+        return session
@@ -0,0 +1,213 @@
+"""
+Settings Diagnostics View - In-memory performance metrics and web storage upkeep.
+"""
+
+import time
+
+from aqt.utils import tooltip
+
+from . import diagnostics
+from . import webengine_storage
+from .theme_manager import ThemeManager
+
+try:
+    from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QScrollArea
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtGui import QCursor
+except ImportError:
+    from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QScrollArea
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QCursor
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def _mb(size_bytes):
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+def _storage_summary(report):
+    """Lines describing the web profile's disk usage from the last maintenance pass."""
+    if not report:
+        return []
+    days_ago = (time.time() - report.get("ran_at", 0)) / 86400
+    return [
+        f"Location: {webengine_storage.get_storage_path()}",
+        f"Total {_mb(report.get('storage_bytes', 0))}, HTTP cache {_mb(report.get('cache_bytes', 0))}",
+        f"Last maintenance {days_ago:.1f} days ago, trimmed {_mb(report.get('trimmed_bytes', 0))}",
+    ]
+
+
+def _memory_summary(samples):
+    """Lines describing memory released by freezing/discarding the hidden page."""
+    lines = []
+    for label in ("frozen", "discarded"):
+        stats = samples.get(f"lifecycle_{label}_freed_mb")
+        if stats:
+            lines.append(
+                f"{label.capitalize()} {stats['count']}x, freed {stats['total']:.1f} MB "
+                f"(last {stats['last']:.1f} MB)"
+            )
+    return lines
+
+
+def _blocking_summary(values, counters):
+    """Lines describing third-party requests dropped by the request filter."""
+    if "request_blocking" not in values:
+        return []
+    lines = [
+        f"Blocking {values['request_blocking']}: {counters.get('requests_blocked', 0)} requests blocked, "
+        f"~{counters.get('requests_blocked_est_kb', 0) / 1024:.1f} MB saved (estimated)"
+    ]
+    prefix = "requests_blocked_"
+    by_rule = sorted(
+        ((count, name[len(prefix):]) for name, count in counters.items()
+         if name.startswith(prefix) and name != "requests_blocked_est_kb"),
+        reverse=True,
+    )
+    lines.extend(f"{rule}: {count}" for count, rule in by_rule[:5])
+    return lines
+
+
+class DiagnosticsSettingsView(QWidget):
+    """View showing counters, timings and memory figures for this session"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parent_panel = parent
+        self.setup_ui()
+
+    def setup_ui(self):
+        # Main layout
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        c = ThemeManager.get_palette()
+
+        # Scrollable content area
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setStyleSheet(ThemeManager.get_scroll_area_style())
+
+        content = QWidget()
+        content.setStyleSheet(f"background: {c['background']};")
+        self.content_layout = QVBoxLayout(content)
+        self.content_layout.setContentsMargins(16, 16, 16, 16)
+        self.content_layout.setSpacing(12)
+
+        # Header
+        header = QLabel("Diagnostics")
+        header.setStyleSheet(f"""
+            color: {c['text']};
+            font-size: 20px;
+            font-weight: 700;
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+        """)
+        self.content_layout.addWidget(header)
+
+        # Description
+        desc = QLabel("Performance figures for this Anki session. Nothing here is sent anywhere.")
+        desc.setStyleSheet(f"""
+            color: {c['text_secondary']};
+            font-size: 13px;
+            margin-bottom: 8px;
+        """)
+        desc.setWordWrap(True)
+        self.content_layout.addWidget(desc)
+
+        # Filled in by refresh()
+        self.sections_container = QWidget()
+        self.sections_layout = QVBoxLayout(self.sections_container)
+        self.sections_layout.setContentsMargins(0, 0, 0, 0)
+        self.sections_layout.setSpacing(12)
+        self.content_layout.addWidget(self.sections_container)
+
+        self.content_layout.addStretch()
+
+        scroll.setWidget(content)
+        layout.addWidget(scroll)
+
+        # Bottom section with Clear Cache and Refresh buttons
+        bottom_section = QWidget()
+        bottom_section.setStyleSheet(ThemeManager.get_bottom_section_style())
+        bottom_layout = QVBoxLayout(bottom_section)
+        bottom_layout.setContentsMargins(16, 12, 16, 12)
+
+        clear_cache_btn = QPushButton("Clear Cache")
+        clear_cache_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        clear_cache_btn.setFixedHeight(44)
+        clear_cache_btn.setStyleSheet(ThemeManager.get_button_style("primary"))
+        clear_cache_btn.clicked.connect(self.clear_cache)
+        bottom_layout.addWidget(clear_cache_btn)
+
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        refresh_btn.setFixedHeight(44)
+        refresh_btn.setStyleSheet(ThemeManager.get_button_style("primary"))
+        refresh_btn.clicked.connect(self.refresh)
+        bottom_layout.addWidget(refresh_btn)
+
+        layout.addWidget(bottom_section)
+
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the sections from a fresh diagnostics snapshot"""
+        while self.sections_layout.count():
+            item = self.sections_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+
+        snapshot = diagnostics.snapshot()
+
+        self._add_section("Web storage", _storage_summary(webengine_storage.last_report()))
+        self._add_section("Request blocking", _blocking_summary(snapshot["values"], snapshot["counters"]))
+        self._add_section("Hidden panel memory", _memory_summary(snapshot["samples"]) or ["Not frozen or discarded yet"])
+        self._add_section("Values", [
+            f"{name}: {_format_number(value)}" for name, value in sorted(snapshot["values"].items())
+        ])
+        self._add_section("Timings (ms)", [
+            f"{name}: avg {stats['avg_ms']:.1f}, max {stats['max_ms']:.1f}, last {stats['last_ms']:.1f} ({stats['count']}x)"
+            for name, stats in sorted(snapshot["timings"].items())
+        ])
+        self._add_section("Samples", [
+            f"{name}: avg {stats['avg']:.1f}, max {_format_number(stats['max'])}, last {_format_number(stats['last'])} ({stats['count']}x)"
+            for name, stats in sorted(snapshot["samples"].items())
+        ])
+        self._add_section("Counters", [
+            f"{name}: {value}" for name, value in sorted(snapshot["counters"].items())
+        ])
+
+    def clear_cache(self):
+        """Clear the panel's HTTP cache (cookies and logins are kept)"""
+        from .panel import get_persistent_profile
+        cleared = webengine_storage.clear_http_cache(get_persistent_profile())
+        if cleared is None:
+            tooltip("Cache can't be cleared on this version of Anki")
+        else:
+            tooltip(f"Cleared {_mb(cleared)} of cached web data")
+        self.refresh()
+
+    def _add_section(self, title, lines):
+        c = ThemeManager.get_palette()
+
+        title_label = QLabel(title)
+        title_label.setStyleSheet(f"color: {c['text']}; font-size: 14px; font-weight: bold; margin-top: 12px;")
+        self.sections_layout.addWidget(title_label)
+
+        body = QLabel("\n".join(lines) if lines else "None recorded")
+        body.setWordWrap(True)
+        try:
+            body.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        except AttributeError:
+            body.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        body.setStyleSheet(f"""
+            color: {c['text_secondary']};
+            font-size: 12px;
+            font-family: Menlo, Consolas, monospace;
+        """)
+        self.sections_layout.addWidget(body)
@@ -3,11 +3,10 @@ Settings Editor View - Editor for a single keybinding.
 """
 
 import sys
-from aqt import mw
 from aqt.utils import tooltip
 
 from aqt.utils import tooltip
-from .utils import ADDON_NAME
+from .config_store import get_config, get_config_store
 
 try:
     from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QScrollArea, QTextEdit
@@ -368,8 +367,7 @@ class SettingsEditorView(KeyRecorderMixin, QWidget):
         answer_template = self.answer_template.toPlainText().strip()
 
         # Check for duplicate keybindings
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        keybindings = config.get("keybindings", [])
+        keybindings = get_config().keybinding_dicts()
         current_keys = self.keybinding.get("keys", [])
 
         for i, kb in enumerate(keybindings):
@@ -401,25 +399,9 @@ class SettingsEditorView(KeyRecorderMixin, QWidget):
             # Edit existing
             keybindings[self.index] = self.keybinding
 
-        config["keybindings"] = keybindings
-        mw.addonManager.writeConfig(ADDON_NAME, config)
-
-        # Refresh JavaScript in panel
-        self._refresh_panel_javascript()
+        # Panel JavaScript is refreshed by the config store's change signal
+        get_config_store().update(keybindings=keybindings)
 
         # Go back to list
         if self.parent_panel and hasattr(self.parent_panel, 'show_list_view'):
             self.parent_panel.show_list_view()
-
-    def _refresh_panel_javascript(self):
-        """Helper to refresh JavaScript in the main panel"""
-        # Import here to avoid circular imports
-        from . import dock_widget
-        if dock_widget and dock_widget.widget():
-            panel = dock_widget.widget()
-            # Only update keybindings, don't re-inject the entire listener
-            if hasattr(panel, 'update_keybindings_in_js'):
-                panel.update_keybindings_in_js()
-                # Also update card texts to match new keybindings
-                if hasattr(panel, 'update_card_text_in_js'):
-                    panel.update_card_text_in_js()
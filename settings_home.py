@@ -85,6 +85,16 @@ class SettingsHomeView(QWidget):
         )
         cards_layout.addWidget(quick_actions_card)
 
+        # Card 3: Diagnostics
+        diagnostics_card = self.create_nav_card(
+            title="Diagnostics",
+            icon_svg=f"""<svg width="48" height="48" viewBox="0 0 48 48" fill="none" xmlns="http://www.w3.org/2000/svg">
+                <path d="M4 24h9l5-12 8 24 5-12h13" stroke="{icon_color}" stroke-width="3" stroke-linecap="round" stroke-linejoin="round"/>
+            </svg>""",
+            on_click=self.open_diagnostics
+        )
+        cards_layout.addWidget(diagnostics_card)
+
         content_layout.addWidget(cards_container)
         content_layout.addStretch()
 
@@ -349,6 +359,11 @@ class SettingsHomeView(QWidget):
             except:
                 pass
 
+    def open_diagnostics(self):
+        """Navigate to Diagnostics view"""
+        if self.parent_panel and hasattr(self.parent_panel, 'show_diagnostics_view'):
+            self.parent_panel.show_diagnostics_view()
+
     def restart_tutorial(self):
         """Restart the tutorial from the beginning"""
         try:
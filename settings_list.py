@@ -3,12 +3,11 @@ Settings List View - List of keybindings with edit/delete functionality.
 """
 
 import sys
-from aqt import mw
 from aqt.utils import tooltip
 
 # Addon name for config storage (must match folder name, not __name__)
 from aqt.utils import tooltip
-from .utils import ADDON_NAME
+from .config_store import get_config, get_config_store
 
 try:
     from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QScrollArea
@@ -74,32 +73,12 @@ class SettingsListView(QWidget):
 
     def load_keybindings(self):
         """Load and display keybindings"""
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        self.keybindings = config.get("keybindings", [])
-
-        if not self.keybindings:
-            self.keybindings = [
-                {
-                    "name": "Standard Explain",
-                    "keys": ["Control", "Shift", "S"],
-                    "question_template": "Can you explain this to me:\n\n{front}",
-                    "answer_template": "Can you explain this to me:\n\nQuestion:\n{front}\n\nAnswer:\n{back}"
-                },
-                {
-                    "name": "Front/Back",
-                    "keys": ["Control", "Shift", "Q"],
-                    "question_template": "{front}",
-                    "answer_template": "{front}"
-                },
-                {
-                    "name": "Back Only",
-                    "keys": ["Control", "Shift", "A"],
-                    "question_template": "",
-                    "answer_template": "{back}"
-                }
-            ]
-            config["keybindings"] = self.keybindings
-            mw.addonManager.writeConfig(ADDON_NAME, config)
+        config = get_config()
+        self.keybindings = config.keybinding_dicts()
+
+        if not config.get("keybindings"):
+            # Persist the defaults the store fell back to
+            get_config_store().update(keybindings=self.keybindings)
 
         self.refresh_list()
 
@@ -295,8 +274,7 @@ class SettingsListView(QWidget):
 
         elif state == "confirm":
             # Second click - check if this is the last keybinding before attempting delete
-            config = mw.addonManager.getConfig(ADDON_NAME) or {}
-            keybindings = config.get("keybindings", [])
+            keybindings = get_config().keybindings
 
             if len(keybindings) <= 1:
                 # Cannot delete the last keybinding - show error and revert button
@@ -384,16 +362,15 @@ class SettingsListView(QWidget):
 
     def delete_keybinding(self, index):
         """Delete a keybinding"""
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        keybindings = config.get("keybindings", [])
+        keybindings = get_config().keybinding_dicts()
 
         if len(keybindings) <= 1:
             tooltip("Cannot delete the last keybinding")
             return
 
+        # Panel JavaScript is refreshed by the config store's change signal
         del keybindings[index]
-        config["keybindings"] = keybindings
-        mw.addonManager.writeConfig(ADDON_NAME, config)
+        get_config_store().update(keybindings=keybindings)
 
         # Track template deletion in analytics
         try:
@@ -405,21 +382,6 @@ class SettingsListView(QWidget):
         # Refresh the list
         self.load_keybindings()
 
-        # Refresh JavaScript in panel
-        self._refresh_panel_javascript()
-
-    def _refresh_panel_javascript(self):
-        """Helper to refresh JavaScript in the main panel"""
-        from . import dock_widget
-        if dock_widget and dock_widget.widget():
-            panel = dock_widget.widget()
-            # Only update keybindings, don't re-inject the entire listener
-            if hasattr(panel, 'update_keybindings_in_js'):
-                panel.update_keybindings_in_js()
-                # Also update card texts to match new keybindings
-                if hasattr(panel, 'update_card_text_in_js'):
-                    panel.update_card_text_in_js()
-
     def add_keybinding(self):
         """Add a new keybinding"""
         if self.parent_panel and hasattr(self.parent_panel, 'show_editor_view'):
@@ -0,0 +1,18 @@
+"""
+Import add-on modules outside Anki.
+
+The add-on's __init__ needs a running Anki, so the tests register the add-on
+folder as a bare "ai_side_panel" package and import only the modules under
+test (those without aqt imports).
+"""
+
+import os
+import sys
+import types
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "ai_side_panel" not in sys.modules:
+    package = types.ModuleType("ai_side_panel")
+    package.__path__ = [ADDON_DIR]
+    sys.modules["ai_side_panel"] = package
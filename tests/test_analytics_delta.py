@@ -0,0 +1,58 @@
+"""
+Delta encoding of the analytics payload.
+"""
+
+from ai_side_panel.analytics_delta import acknowledged_state, encode_payload, reset_state
+
+PAYLOAD = {
+    "user_id": "u1",
+    "add_to_chat_count": 3,
+    "platform": "darwin",
+    "daily_usage": {
+        "2026-10-14": [{"time": "08:00:00", "messages": 2}],
+        "2026-10-15": [{"time": "09:00:00", "messages": 5}],
+    },
+}
+
+
+def test_full_payload_without_cursor():
+    body = encode_payload(PAYLOAD, None)
+
+    assert body == {"format": "full", **PAYLOAD}
+
+
+def test_delta_keeps_user_id_at_top_level():
+    state = acknowledged_state(PAYLOAD, {"cursor": "c1"}, None)
+    body = encode_payload(PAYLOAD, state)
+
+    assert body == {
+        "format": "delta",
+        "user_id": "u1",
+        "base_cursor": "c1",
+        "fields": {},
+        "daily_usage": {},
+        "removed_days": [],
+    }
+
+
+def test_delta_carries_only_changes():
+    state = acknowledged_state(PAYLOAD, {"cursor": "c1"}, None)
+    changed = dict(PAYLOAD, add_to_chat_count=4, daily_usage={
+        "2026-10-15": [{"time": "09:00:00", "messages": 6}],
+        "2026-10-16": [{"time": "10:00:00", "messages": 1}],
+    })
+
+    body = encode_payload(changed, state)
+
+    assert body["fields"] == {"add_to_chat_count": 4}
+    assert body["daily_usage"] == changed["daily_usage"]
+    assert body["removed_days"] == ["2026-10-14"]
+
+
+def test_reset_state_sends_full_next():
+    state = acknowledged_state(PAYLOAD, {"cursor": "c1"}, None)
+
+    body = encode_payload(PAYLOAD, reset_state(state))
+
+    assert body["format"] == "full"
+    assert reset_state(state)["gzip"] is True
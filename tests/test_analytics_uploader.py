@@ -0,0 +1,328 @@
+"""
+Analytics uploader against a local stand-in HTTP server.
+"""
+
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_side_panel import analytics_uploader, diagnostics
+from ai_side_panel.analytics_delta import acknowledged_state, encode_payload, reset_state
+from ai_side_panel.analytics_uploader import AnalyticsUploader, UploadJob
+
+WAIT_S = 5
+
+
+class StandInServer:
+    """Records every POST and answers with scripted statuses (200 once they run out)."""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = []
+        # Cleared to hold responses (keeps the worker busy in a request)
+        self.gate = threading.Event()
+        self.gate.set()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                server.requests.append({
+                    "payload": json.loads(body),
+                    "headers": dict(self.headers),
+                    "client_port": self.client_address[1],
+                })
+                server.gate.wait(WAIT_S)
+                status = server.statuses.pop(0) if server.statuses else 200
+                response = b'{"cursor": "c1"}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/analytics"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def payloads(self):
+        return [request["payload"] for request in self.requests]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    stand_in = StandInServer()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def uploaders():
+    created = []
+
+    def make(**kwargs):
+        kwargs.setdefault("backoff_base", 0.01)
+        uploader = AnalyticsUploader(**kwargs)
+        created.append(uploader)
+        return uploader
+
+    yield make
+    for uploader in created:
+        uploader.stop(timeout=WAIT_S)
+
+
+def send_and_wait(uploader, url, payload, **kwargs):
+    """Submit a job and wait until the server accepted it. Returns the response."""
+    sent = threading.Event()
+    responses = []
+
+    def on_sent(response):
+        responses.append(response)
+        sent.set()
+
+    uploader.submit(UploadJob(url, payload, on_sent=on_sent, **kwargs))
+    assert sent.wait(WAIT_S)
+    return responses[0]
+
+
+def counter(name):
+    return diagnostics.snapshot()["counters"].get(name, 0)
+
+
+def wait_for(predicate):
+    deadline = time.monotonic() + WAIT_S
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_uploads_reuse_one_connection(server, uploaders):
+    uploader = uploaders()
+    for i in range(3):
+        send_and_wait(uploader, server.url, {"i": i}, headers={"Authorization": "Bearer k"})
+
+    assert server.payloads() == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert len({request["client_port"] for request in server.requests}) == 1
+    assert server.requests[0]["headers"]["Authorization"] == "Bearer k"
+
+
+def test_server_errors_are_retried(server, uploaders):
+    server.statuses = [500, 503, 429]
+    uploader = uploaders()
+
+    response = send_and_wait(uploader, server.url, {"i": 1})
+
+    assert response == {"cursor": "c1"}
+    assert server.payloads() == [{"i": 1}] * 4
+
+
+def test_client_errors_are_not_retried(server, uploaders):
+    server.statuses = [400]
+    uploader = uploaders()
+    uploader.submit(UploadJob(server.url, {"i": 1}))
+    # Jobs run in order, so once this one is sent the first is finished
+    send_and_wait(uploader, server.url, {"i": 2})
+
+    assert server.payloads() == [{"i": 1}, {"i": 2}]
+
+
+def test_gives_up_after_max_attempts(server, uploaders):
+    server.statuses = [500] * 3
+    dropped = counter("analytics_upload_dropped")
+    uploader = uploaders(max_attempts=3)
+    uploader.submit(UploadJob(server.url, {"i": 1}))
+    wait_for(lambda: counter("analytics_upload_dropped") == dropped + 1)
+
+    assert server.payloads() == [{"i": 1}] * 3
+
+
+def test_conflict_is_handed_back_not_retried(server, uploaders):
+    server.statuses = [409]
+    conflicted = threading.Event()
+    uploader = uploaders()
+    uploader.submit(UploadJob(server.url, {"i": 1}, on_conflict=conflicted.set))
+    assert conflicted.wait(WAIT_S)
+    send_and_wait(uploader, server.url, {"i": 2})
+
+    assert server.payloads() == [{"i": 1}, {"i": 2}]
+
+
+def test_conflict_without_handler_is_permanent(server, uploaders):
+    server.statuses = [409]
+    dropped = counter("analytics_upload_dropped")
+    uploader = uploaders()
+    uploader.submit(UploadJob(server.url, {"i": 1}))
+    wait_for(lambda: counter("analytics_upload_dropped") == dropped + 1)
+    send_and_wait(uploader, server.url, {"i": 2})
+
+    assert server.payloads() == [{"i": 1}, {"i": 2}]
+
+
+def test_newer_job_replaces_one_in_backoff(server, uploaders, monkeypatch):
+    # A long backoff: only a newer job can end the wait
+    monkeypatch.setattr(analytics_uploader, "backoff_delay", lambda attempt, base: 60.0)
+    server.statuses = [500]
+    uploader = uploaders()
+    uploader.submit(UploadJob(server.url, {"i": 1}))
+    send_and_wait(uploader, server.url, {"i": 2})
+
+    assert server.payloads() == [{"i": 1}, {"i": 2}]
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    for attempt in range(10):
+        ceiling = min(8.0, 1.0 * 2 ** attempt)
+        delays = [analytics_uploader.backoff_delay(attempt, 1.0, 8.0) for _ in range(50)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+
+
+def test_single_worker_for_concurrent_submits(server, uploaders, monkeypatch):
+    started_workers = []
+
+    class CountingThread(threading.Thread):
+        def start(self):
+            if self.name == "AnalyticsUploader":
+                started_workers.append(self)
+            super().start()
+
+    monkeypatch.setattr(analytics_uploader.threading, "Thread", CountingThread)
+    uploader = uploaders(queue_size=64)
+    done = threading.Semaphore(0)
+    submitters = [
+        threading.Thread(target=lambda i=i: uploader.submit(
+            UploadJob(server.url, {"i": i}, on_sent=lambda response: done.release())
+        ))
+        for i in range(20)
+    ]
+    for submitter in submitters:
+        submitter.start()
+    for submitter in submitters:
+        submitter.join()
+    for _ in range(20):
+        assert done.acquire(timeout=WAIT_S)
+
+    assert len(started_workers) == 1
+    assert len({request["client_port"] for request in server.requests}) == 1
+    assert sorted(payload["i"] for payload in server.payloads()) == list(range(20))
+
+
+def test_full_queue_drops_oldest_without_blocking(server, uploaders):
+    uploader = uploaders(queue_size=2)
+    server.gate.clear()
+    uploader.submit(UploadJob(server.url, {"i": "in flight"}))
+    wait_for(lambda: uploader._queue.empty())
+
+    started = time.perf_counter()
+    for i in range(9):
+        uploader.submit(UploadJob(server.url, {"i": i}))
+    assert time.perf_counter() - started < 0.5
+    assert uploader._queue.qsize() == 2
+
+    server.gate.set()
+    send_and_wait(uploader, server.url, {"i": 9})
+    assert server.payloads() == [{"i": "in flight"}, {"i": 8}, {"i": 9}]
+
+
+def test_stop_ends_the_idle_worker(server, uploaders):
+    uploader = uploaders()
+    send_and_wait(uploader, server.url, {"i": 1})
+    worker = uploader._thread
+
+    uploader.stop(timeout=WAIT_S)
+
+    assert not worker.is_alive()
+    # A later submit starts a new worker
+    send_and_wait(uploader, server.url, {"i": 2})
+    assert uploader._thread is not worker
+
+
+def test_compressed_bodies_are_gzipped(server, uploaders):
+    uploader = uploaders()
+    send_and_wait(uploader, server.url, {"i": 1}, compress=True)
+
+    assert server.requests[0]["headers"]["Content-Encoding"] == "gzip"
+    assert server.payloads() == [{"i": 1}]
+
+
+def upload(uploader, url, payload, state, done):
+    """send_analytics_background without Anki: `state` stands in for the store."""
+    body = encode_payload(payload, state.get("upload_state"))
+
+    def on_sent(response):
+        state["upload_state"] = acknowledged_state(payload, response, state.get("upload_state"))
+        done.set()
+
+    def resend_full():
+        state["upload_state"] = reset_state(state.get("upload_state"))
+        upload(uploader, url, payload, state, done)
+
+    uploader.submit(UploadJob(
+        url,
+        body,
+        on_sent=on_sent,
+        on_conflict=resend_full if body.get("base_cursor") else None,
+        compress=bool((state.get("upload_state") or {}).get("gzip")),
+    ))
+
+
+def test_delta_cycle_falls_back_to_full_on_conflict(server, uploaders):
+    uploader = uploaders()
+    state = {}
+    first = payload = {
+        "user_id": "u1",
+        "add_to_chat_count": 3,
+        "daily_usage": {"2026-10-14": [{"time": "08:00:00", "messages": 2}]},
+    }
+
+    def upload_and_wait(payload):
+        done = threading.Event()
+        upload(uploader, server.url, payload, state, done)
+        assert done.wait(WAIT_S)
+
+    # No cursor yet: full snapshot, the response's cursor is kept
+    upload_and_wait(payload)
+    assert state["upload_state"]["cursor"] == "c1"
+
+    # Cursor acknowledged: only the new day and the changed counter, gzipped
+    payload = dict(payload, add_to_chat_count=4, daily_usage={
+        **payload["daily_usage"], "2026-10-15": [{"time": "09:00:00", "messages": 1}],
+    })
+    upload_and_wait(payload)
+
+    # Server lost the cursor: 409 to the delta, then the full snapshot again
+    server.statuses = [409]
+    payload = dict(payload, add_to_chat_count=5)
+    upload_and_wait(payload)
+
+    full, delta, rejected, resent = server.requests
+    assert full["payload"] == {"format": "full", **first}
+    assert "Content-Encoding" not in full["headers"]
+    assert delta["payload"] == {
+        "format": "delta",
+        "user_id": "u1",
+        "base_cursor": "c1",
+        "fields": {"add_to_chat_count": 4},
+        "daily_usage": {"2026-10-15": [{"time": "09:00:00", "messages": 1}]},
+        "removed_days": [],
+    }
+    assert delta["headers"]["Content-Encoding"] == "gzip"
+    assert rejected["payload"]["format"] == "delta"
+    assert rejected["payload"]["user_id"] == "u1"
+    assert resent["payload"] == {"format": "full", **payload}
+    assert resent["headers"]["Content-Encoding"] == "gzip"
+    assert state["upload_state"]["cursor"] == "c1"
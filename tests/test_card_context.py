@@ -0,0 +1,89 @@
+"""
+Splitting the back text out of rendered cards.
+"""
+
+import pytest
+
+# card_context reads the config through aqt
+pytest.importorskip("aqt")
+
+from anki.consts import MODEL_CLOZE, MODEL_STD
+
+from ai_side_panel import card_context
+
+STYLE = "<style>.card { font-family: arial; }</style>"
+
+# Anki's stock "Cloze" note type
+CLOZE_TEMPLATE = {"qfmt": "{{cloze:Text}}", "afmt": "{{cloze:Text}}<br>\n{{Back Extra}}"}
+
+
+class FakeNote(dict):
+    def __init__(self, note_id, fields):
+        super().__init__(fields)
+        self.id = note_id
+        self.mod = 1
+
+
+class FakeCard:
+    def __init__(self, note, model_type, template, question_html, answer_html):
+        self._note = note
+        self._model = {"type": model_type, "mod": 1}
+        self._template = template
+        self._question = question_html
+        self._answer = answer_html
+        self.ord = 0
+
+    def note(self):
+        return self._note
+
+    def note_type(self):
+        return self._model
+
+    def template(self):
+        return self._template
+
+    def question(self):
+        return self._question
+
+    def answer(self):
+        return self._answer
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    card_context.get_cache().clear()
+
+
+def test_default_cloze_sends_the_revealed_answer():
+    note = FakeNote(1, {"Text": "{{c1::Paris}} is the capital of France", "Back Extra": "Geography"})
+    card = FakeCard(
+        note, MODEL_CLOZE, CLOZE_TEMPLATE,
+        STYLE + '<span class="cloze" data-cloze="Paris">[...]</span> is the capital of France',
+        STYLE + '<span class="cloze">Paris</span> is the capital of France<br>\nGeography',
+    )
+
+    assert card_context.get_answer_text(card) == "Paris is the capital of France\nGeography"
+
+
+def test_cloze_filter_on_a_standard_note_type_skips_fields_mode():
+    note = FakeNote(2, {"Text": "{{c1::Mitochondria}} make ATP", "Extra": "Cell biology"})
+    template = {"qfmt": "{{cloze:Text}}", "afmt": "{{cloze:Text}}<div>{{Extra}}</div>"}
+    card = FakeCard(
+        note, MODEL_STD, template,
+        STYLE + '<span class="cloze">[...]</span> make ATP',
+        STYLE + '<span class="cloze">Mitochondria</span> make ATP<div>Cell biology</div>',
+    )
+
+    assert card_context.get_answer_text(card) == "Mitochondria make ATP\nCell biology"
+
+
+def test_basic_without_divider_uses_answer_only_fields():
+    note = FakeNote(3, {"Front": "Capital of France?", "Back": "Paris"})
+    template = {"qfmt": "{{Front}}", "afmt": "<div>{{Front}}</div><div>{{Back}}</div>"}
+    card = FakeCard(
+        note, MODEL_STD, template,
+        STYLE + "Capital of France?",
+        STYLE + "<div>Capital of France?</div><div>Paris</div>",
+    )
+
+    assert card_context.get_answer_text(card) == "Paris"
@@ -0,0 +1,36 @@
+"""
+Auth cookie recognition.
+"""
+
+import pytest
+
+# login_detector is a QObject
+pytest.importorskip("PyQt6.QtCore")
+
+from ai_side_panel.login_detector import is_auth_cookie
+
+
+@pytest.mark.parametrize("domain", [
+    "openevidence.com",
+    ".openevidence.com",
+    "www.openevidence.com",
+    "API.OpenEvidence.com",
+])
+def test_session_cookie_on_openevidence_hosts(domain):
+    assert is_auth_cookie("appSession", domain)
+    assert is_auth_cookie("__Secure-next-auth.session-token", domain)
+
+
+@pytest.mark.parametrize("domain", [
+    "openevidence.com.evil.net",
+    "notopenevidence.com",
+    ".evil-openevidence.com",
+    "openevidence.co",
+])
+def test_session_cookie_on_lookalike_hosts_is_ignored(domain):
+    assert not is_auth_cookie("appSession", domain)
+
+
+def test_non_auth_cookies_are_ignored():
+    assert not is_auth_cookie("_ga", ".openevidence.com")
+    assert not is_auth_cookie("__Host-next-auth.csrf-token", "openevidence.com")
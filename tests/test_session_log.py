@@ -0,0 +1,69 @@
+"""
+Session log: legacy conversion, day counting and retention.
+"""
+
+import json
+from datetime import date, timedelta
+
+from ai_side_panel.session_log import RETENTION_DAYS, SessionLog
+
+TODAY = "2026-10-16"
+
+
+def day(offset):
+    return (date.fromisoformat(TODAY) + timedelta(days=offset)).isoformat()
+
+
+def test_legacy_entry_for_today_is_counted_once():
+    # Legacy formats stored an int or dict per day instead of sessions
+    log = SessionLog.from_daily_usage({day(-1): 4, TODAY: {"messages": 2}})
+    assert log.days_total == 2
+
+    log.start(TODAY, "09:00:00")
+
+    assert log.days_total == 2
+    assert log.session_count(TODAY) == 1
+
+
+def test_legacy_entry_for_today_survives_serialization():
+    log = SessionLog.from_daily_usage({TODAY: 3})
+    log = SessionLog.from_json(json.loads(json.dumps(log.to_json())))
+
+    log.start(TODAY, "09:00:00")
+
+    assert log.days_total == 1
+
+
+def test_new_days_are_counted():
+    log = SessionLog.from_daily_usage({day(-1): [{"time": "08:00:00", "messages": 1}]})
+
+    log.start(day(-1), "10:00:00")
+    log.start(TODAY, "09:00:00")
+    log.start(TODAY, "11:00:00")
+
+    assert log.days_total == 2
+    assert log.session_count(day(-1)) == 2
+    assert log.session_count(TODAY) == 2
+
+
+def test_round_trip_matches_legacy_form():
+    daily_usage = {
+        day(-2): [{"time": "08:00:00", "messages": 3, "panel_opened_s": 12}],
+        day(-1): [{"time": "07:30:00", "messages": 0}, {"time": "21:05:09", "messages": 7}],
+    }
+    log = SessionLog.from_daily_usage(daily_usage)
+
+    assert log.to_daily_usage() == daily_usage
+    assert SessionLog.from_json(json.loads(json.dumps(log.to_json()))).to_daily_usage() == daily_usage
+
+
+def test_retention_is_enforced_on_write_without_lowering_days_total():
+    log = SessionLog()
+    for offset in range(-2 * RETENTION_DAYS, 1):
+        index = log.start(day(offset), "12:00:00")
+        log.add_message(day(offset), index)
+
+    assert log.days_total == 2 * RETENTION_DAYS + 1
+    assert len(log) == RETENTION_DAYS
+    assert log.to_daily_usage().keys() == {day(offset) for offset in range(1 - RETENTION_DAYS, 1)}
+    assert log.messages_on(TODAY) == 1
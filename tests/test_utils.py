@@ -0,0 +1,35 @@
+"""
+clean_html_text edge cases.
+"""
+
+from ai_side_panel.utils import clean_html_text
+
+
+def test_block_tags_become_lines():
+    html = "<style>x</style><div>Front &amp; <b>bold</b></div><ul><li>one</li><li> two </li></ul>tail<br>end"
+
+    assert clean_html_text(html) == "Front & bold\none\ntwo\ntail\nend"
+
+
+def test_mixed_case_block_tags_become_lines():
+    assert clean_html_text("one<dIv>two<bR>three</DiV>four") == "one\ntwo\nthree\nfour"
+
+
+def test_unterminated_tag_is_kept_as_text():
+    assert clean_html_text("a<b then c") == "a<b then c"
+
+
+def test_base64_in_text_is_kept():
+    assert clean_html_text("I like base64, it is cool") == "I like base64, it is cool"
+    assert clean_html_text("text data:image/png;base64,AAAA stays") == "text data:image/png;base64,AAAA stays"
+
+
+def test_data_uri_payloads_are_dropped():
+    payload = "QUJD" * 1000
+    html = (
+        f'<img src="data:image/png;base64,{payload}">one'
+        f"<img src='data:image/svg+xml;charset=utf-8;base64,{payload}' alt=x>two"
+        f'<div style="background: url(data:image/png;base64,{payload})">three</div>'
+    )
+
+    assert clean_html_text(html) == "onetwo\nthree"
@@ -147,76 +147,6 @@ class ThemeManager:
         c = cls.get_palette()
         return f"background: {c['background']}; border-top: 1px solid {c['border_subtle']};"
     
-    @classmethod
-    def get_loading_html(cls):
-        """Get the HTML for the loading spinner with correct colors."""
-        c = cls.get_palette()
-        bg = c['background']
-        dot_color = c['text'] # Use text color for dots so they are visible on white
-        
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    margin: 0;
-                    padding: 0;
-                    background: {bg};
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    height: 100vh;
-                    overflow: hidden;
-                }}
-                .loader {{
-                    width: 10px;
-                    height: 10px;
-                    border-radius: 50%;
-                    display: block;
-                    position: relative;
-                    color: {dot_color};
-                    left: -100px;
-                    box-sizing: border-box;
-                    animation: shadowRolling 2s linear infinite;
-                }}
-                @keyframes shadowRolling {{
-                    0% {{
-                        box-shadow: 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0);
-                    }}
-                    12% {{
-                        box-shadow: 100px 0 {dot_color}, 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0);
-                    }}
-                    25% {{
-                        box-shadow: 110px 0 {dot_color}, 100px 0 {dot_color}, 0px 0 rgba(255, 255, 255, 0), 0px 0 rgba(255, 255, 255, 0);
-                    }}
-                    36% {{
-                        box-shadow: 120px 0 {dot_color}, 110px 0 {dot_color}, 100px 0 {dot_color}, 0px 0 rgba(255, 255, 255, 0);
-                    }}
-                    50% {{
-                        box-shadow: 130px 0 {dot_color}, 120px 0 {dot_color}, 110px 0 {dot_color}, 100px 0 {dot_color};
-                    }}
-                    62% {{
-                        box-shadow: 200px 0 rgba(255, 255, 255, 0), 130px 0 {dot_color}, 120px 0 {dot_color}, 110px 0 {dot_color};
-                    }}
-                    75% {{
-                        box-shadow: 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 130px 0 {dot_color}, 120px 0 {dot_color};
-                    }}
-                    87% {{
-                        box-shadow: 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 130px 0 {dot_color};
-                    }}
-                    100% {{
-                        box-shadow: 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0), 200px 0 rgba(255, 255, 255, 0);
-                    }}
-                }}
-            </style>
-        </head>
-        <body>
-            <span class="loader"></span>
-        </body>
-        </html>
-        """
-
     @classmethod
     def get_css_variables(cls):
         """Get CSS variables block for current theme."""
@@ -7,6 +7,7 @@ It was previously missing, causing all tutorial_event() calls to fail.
 Public Functions:
 - start_tutorial(): Start the tutorial from beginning or resume
 - tutorial_event(event_name): Handle tutorial events for progression
+- tutorial_target_rect(target, rect): Target rect pushed by a page observer
 - skip_tutorial(): Skip the tutorial entirely
 """
 
@@ -50,6 +51,25 @@ def tutorial_event(event_name: str):
         print(f"Tutorial event error: {e}")
 
 
+def tutorial_target_rect(target: str, rect):
+    """
+    Handle a target rect pushed by a page observer.
+
+    The toolbar page reports the tutorial icon's rect whenever it changes,
+    so the coach mark follows it without polling.
+
+    Args:
+        target: Which page element the rect belongs to (e.g., "toolbar")
+        rect: [x, y, width, height] in page coordinates, or None if hidden
+    """
+    try:
+        manager = get_tutorial_manager()
+        manager.on_page_rect(target, rect)
+    except Exception as e:
+        # Fail silently to avoid breaking addon functionality
+        print(f"Tutorial rect error: {e}")
+
+
 def skip_tutorial():
     """
     Skip the tutorial entirely.
@@ -8,6 +8,8 @@ of various UI elements for tutorial coach marks.
 from PyQt6.QtCore import QPoint, QRect
 from aqt import mw
 
+from .pycmd_router import PYCMD_PREFIX
+
 
 def get_toolbar_icon_rect_async(callback):
     """
@@ -62,6 +64,125 @@ def get_toolbar_icon_rect_async(callback):
     mw.toolbar.web.page().runJavaScript(js_code, on_result)
 
 
+# Installed in the toolbar page while a step points at the toolbar icon: a
+# ResizeObserver (layout), IntersectionObserver (visibility) and a
+# MutationObserver (toolbar re-rendered) each schedule one check per frame,
+# and the icon's rect is sent to Python only when it changed
+_TOOLBAR_RECT_WATCH_JS = """
+(function() {
+    if (window.ankiPanelTutorialRect) {
+        window.ankiPanelTutorialRect.report(true);
+        return;
+    }
+    var last = null;
+    var scheduled = false;
+    var observed = null;
+
+    function findIcon() {
+        var links = document.querySelectorAll('a.hitem');
+        for (var i = 0; i < links.length; i++) {
+            if (links[i].onclick && links[i].onclick.toString().includes('openevidence')) {
+                return links[i];
+            }
+        }
+        return null;
+    }
+
+    function report(force) {
+        scheduled = false;
+        var icon = findIcon();
+        var rect = icon ? icon.getBoundingClientRect() : null;
+        var value = rect && rect.width ? [Math.round(rect.x), Math.round(rect.y), Math.round(rect.width), Math.round(rect.height)] : null;
+        var key = JSON.stringify(value);
+        if (!force && key === last) {
+            return;
+        }
+        last = key;
+        pycmd('%(prefix)s:tutorial_rect:' + JSON.stringify({target: 'toolbar', rect: value}));
+    }
+
+    function schedule() {
+        if (!scheduled) {
+            scheduled = true;
+            requestAnimationFrame(function() { report(false); });
+        }
+    }
+
+    var resizeObserver = new ResizeObserver(schedule);
+    var intersectionObserver = new IntersectionObserver(schedule);
+    function observeIcon() {
+        var icon = findIcon();
+        if (icon && icon !== observed) {
+            if (observed) {
+                resizeObserver.unobserve(observed);
+                intersectionObserver.unobserve(observed);
+            }
+            observed = icon;
+            resizeObserver.observe(icon);
+            intersectionObserver.observe(icon);
+        }
+    }
+    var mutationObserver = new MutationObserver(function() {
+        observeIcon();
+        schedule();
+    });
+
+    resizeObserver.observe(document.documentElement);
+    observeIcon();
+    mutationObserver.observe(document.body, {childList: true, subtree: true});
+
+    window.ankiPanelTutorialRect = {
+        report: report,
+        stop: function() {
+            resizeObserver.disconnect();
+            intersectionObserver.disconnect();
+            mutationObserver.disconnect();
+            window.ankiPanelTutorialRect = null;
+        }
+    };
+    report(true);
+})();
+""" % {"prefix": PYCMD_PREFIX}
+
+
+def watch_toolbar_icon_rect():
+    """
+    Have the toolbar page push the icon's rect (pycmd "tutorial_rect")
+    whenever it changes. Safe to call again, e.g. after the toolbar reloads;
+    an existing watcher just re-reports.
+    """
+    if not mw or not mw.toolbar or not mw.toolbar.web:
+        return
+    mw.toolbar.web.page().runJavaScript(_TOOLBAR_RECT_WATCH_JS)
+
+
+def unwatch_toolbar_icon_rect():
+    """Disconnect the toolbar page's rect observers."""
+    if not mw or not mw.toolbar or not mw.toolbar.web:
+        return
+    mw.toolbar.web.page().runJavaScript(
+        "window.ankiPanelTutorialRect && window.ankiPanelTutorialRect.stop();"
+    )
+
+
+def toolbar_rect_to_global(rect):
+    """
+    Map a rect reported by the toolbar page ([x, y, width, height] in page
+    coordinates) to global screen coordinates.
+
+    Returns:
+        QRect, or None if no rect or no toolbar
+    """
+    if not rect or not mw or not mw.toolbar or not mw.toolbar.web:
+        return None
+    try:
+        x, y, width, height = (int(value) for value in rect)
+        toolbar_global = mw.toolbar.web.mapToGlobal(QPoint(0, 0))
+        return QRect(toolbar_global.x() + x, toolbar_global.y() + y, width, height)
+    except (TypeError, ValueError):
+        return None
+
+
 def get_toolbar_icon_rect():
     """
     Synchronous fallback for toolbar icon rect (uses approximation).
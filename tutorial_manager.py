@@ -3,17 +3,37 @@ Tutorial Manager - Core orchestration for the tutorial system
 
 This module manages the tutorial flow, including step progression,
 UI coordination, state persistence, and event handling.
+
+Coach mark positioning is event-driven: the target rect is cached and only
+re-resolved after something that can move it - a Move/Resize/Show/Hide of
+the main window, toolbar, reviewer, panel dock or gear button, a tutorial
+event, or a rect pushed by the toolbar page's observers (see
+tutorial_helpers.watch_toolbar_icon_rect). An idle step runs no timers.
 """
 
 from PyQt6.QtCore import QTimer, QEvent, QObject
 from PyQt6.QtWidgets import QApplication
-from aqt import mw
+from aqt import mw, gui_hooks
 
 from .tutorial_coach_mark import CoachMark
 from .tutorial_overlay import TutorialOverlay
 from .tutorial_steps import get_tutorial_steps, get_step_target_rect
-from . import analytics
-from .utils import ADDON_NAME
+from .tutorial_helpers import (
+    get_gear_button_widget,
+    toolbar_rect_to_global,
+    unwatch_toolbar_icon_rect,
+    watch_toolbar_icon_rect,
+)
+from . import analytics, diagnostics
+from .config_store import get_config, get_config_store
+
+# Coalesce a burst of geometry events into one reposition
+REPOSITION_DEBOUNCE_MS = 50
+
+# Skip a step whose target hasn't appeared after this long
+TARGET_WAIT_MS = 10000
+
+GEOMETRY_EVENTS = (QEvent.Type.Move, QEvent.Type.Resize, QEvent.Type.Show, QEvent.Type.Hide)
 
 
 class TutorialManager(QObject):
@@ -40,24 +60,28 @@ class TutorialManager(QObject):
         self.coach_mark = None
         self.overlay = None
 
-        # Retry mechanism for widget availability
-        self.retry_timer = QTimer()
-        self.retry_timer.timeout.connect(self._retry_show_step)
-        self.retry_count = 0
-        self.max_retries = 50  # Max 10 seconds (50 * 200ms)
+        # Cached target of the current step (global QRect, None until found)
+        self.target_rect = None
+        self.step_displayed = False
+        # Toolbar icon rect in toolbar page coordinates, pushed by the page
+        self.toolbar_page_rect = None
 
-        # Window resize handling
+        # Skip the step if its target never shows up
+        self.target_wait_timer = QTimer()
+        self.target_wait_timer.setSingleShot(True)
+        self.target_wait_timer.timeout.connect(self._on_target_wait_expired)
+
+        # Geometry change handling (debounced)
         self.resize_timer = QTimer()
         self.resize_timer.setSingleShot(True)
         self.resize_timer.timeout.connect(self._update_positions)
 
-        # Periodic position check (for layout changes that don't trigger resize)
-        self.position_check_timer = QTimer()
-        self.position_check_timer.timeout.connect(self._update_positions)
-
         # Install event filter for window resize
         if mw:
             mw.installEventFilter(self)
+            gui_hooks.state_did_change.append(self._on_state_change)
+            if mw.toolbar and mw.toolbar.web:
+                mw.toolbar.web.loadFinished.connect(self._on_toolbar_loaded)
 
     def start_tutorial(self):
         """
@@ -67,8 +91,7 @@ class TutorialManager(QObject):
         progress and displays the appropriate step.
         """
         # Check if tutorial is already completed
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        if config.get("tutorial_completed", False):
+        if get_config().tutorial_completed:
             print("Tutorial already completed")
             return
 
@@ -76,8 +99,7 @@ class TutorialManager(QObject):
         self.tutorial_steps = get_tutorial_steps()
 
         # Mark tutorial as complete immediately so it won't restart if user closes Anki mid-tutorial
-        config["tutorial_completed"] = True
-        mw.addonManager.writeConfig(ADDON_NAME, config)
+        get_config_store().update(tutorial_completed=True)
 
         # Start from step 0 (don't resume mid-tutorial)
         self.current_step_index = 0
@@ -89,9 +111,6 @@ class TutorialManager(QObject):
         self.tutorial_active = True
         self.is_paused = False
 
-        # Start periodic position updates (every 500ms)
-        self.position_check_timer.start(500)
-
         # Show first/current step
         self._show_current_step()
 
@@ -109,7 +128,7 @@ class TutorialManager(QObject):
         analytics.track_tutorial_step(self.current_step_index, len(self.tutorial_steps))
         
         self.tutorial_active = False
-        self.position_check_timer.stop()
+        self._stop_tracking()
         self._hide_all()
         self._save_completion()
 
@@ -121,17 +140,14 @@ class TutorialManager(QObject):
         """
         # Stop any existing tutorial activity
         self.tutorial_active = False
-        self.position_check_timer.stop()
+        self._stop_tracking()
         self._hide_all()
 
         # Regenerate tutorial steps with current shortcuts from config
         self.tutorial_steps = get_tutorial_steps()
 
         # Reset config to start fresh
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        config["tutorial_completed"] = False
-        config["tutorial_step_index"] = 0
-        mw.addonManager.writeConfig(ADDON_NAME, config)
+        get_config_store().update(tutorial_completed=False, tutorial_step_index=0)
 
         # Reset internal state
         self.current_step_index = 0
@@ -140,7 +156,6 @@ class TutorialManager(QObject):
         # Start the tutorial
         self._create_ui_components()
         self.tutorial_active = True
-        self.position_check_timer.start(500)
         self._show_current_step()
 
     def handle_event(self, event_name: str):
@@ -171,6 +186,23 @@ class TutorialManager(QObject):
         current_step = self.tutorial_steps[self.current_step_index]
         if current_step.advance_on_event == event_name:
             self.advance_to_next_step()
+        else:
+            # Whatever happened may have moved or revealed the target
+            self._watch_geometry()
+            self._invalidate_target()
+
+    def on_page_rect(self, target: str, rect):
+        """
+        Handle a rect pushed by a page observer.
+
+        Args:
+            target: Which page element the rect belongs to ("toolbar")
+            rect: [x, y, width, height] in page coordinates, or None if hidden
+        """
+        if target != "toolbar" or not self._is_toolbar_step():
+            return
+        self.toolbar_page_rect = rect
+        self._apply_target_rect(toolbar_rect_to_global(rect))
 
     def advance_to_next_step(self):
         """
@@ -202,15 +234,14 @@ class TutorialManager(QObject):
         if self.overlay is None:
             self.overlay = TutorialOverlay(mw)
 
-    def _show_current_step(self, retry_count=0):
+    def _show_current_step(self):
         """
         Display the current tutorial step.
 
-        Handles target resolution, CoachMark positioning, and overlay highlighting.
-        Implements retry logic for widgets that may not be available immediately.
-
-        Args:
-            retry_count: Number of retries attempted (for internal use)
+        Resolves the target once and shows the coach mark when it is found.
+        A missing target is looked up again on the next geometry change or
+        tutorial event; if it is still missing after TARGET_WAIT_MS the step
+        is skipped.
         """
         if not self.tutorial_active:
             return
@@ -221,29 +252,77 @@ class TutorialManager(QObject):
 
         step = self.tutorial_steps[self.current_step_index]
 
-        # Get target rectangle
-        def on_target_rect_ready(target_rect):
-            # If target is None and step requires a target, retry
-            if target_rect is None and step.target_type != "none":
-                if retry_count < self.max_retries:
-                    # Retry after delay
-                    self.retry_count = retry_count
-                    QTimer.singleShot(200, lambda: self._show_current_step(retry_count + 1))
-                else:
-                    # Max retries reached, skip this step
-                    print(f"Could not find target for step {step.step_id}, skipping...")
-                    self.advance_to_next_step()
-                return
+        self.target_rect = None
+        self.step_displayed = False
+        self.toolbar_page_rect = None
+        self.resize_timer.stop()
+        self.target_wait_timer.stop()
+        unwatch_toolbar_icon_rect()
 
-            # Display the step
-            self._display_step(step, target_rect)
+        if step.target_type == "none":
+            self._display_step(step, None)
+            self.step_displayed = True
+            return
+
+        self.target_wait_timer.start(TARGET_WAIT_MS)
+        self._watch_geometry()
+        if self._is_toolbar_step():
+            # The page reports the rect now and again whenever it changes
+            watch_toolbar_icon_rect()
+        else:
+            self._resolve_target()
+
+    def _is_toolbar_step(self) -> bool:
+        """Whether the current step points at the toolbar icon (page-observed)."""
+        if self.current_step_index >= len(self.tutorial_steps):
+            return False
+        step = self.tutorial_steps[self.current_step_index]
+        return step.target_type == "html" and step.target_ref[0] == "toolbar"
+
+    def _resolve_target(self):
+        """Look up the current step's target rect (may be async for HTML elements)."""
+        step_index = self.current_step_index
+        step = self.tutorial_steps[step_index]
+
+        def on_target_rect_ready(target_rect):
+            # Ignore answers for a step that is no longer showing
+            if step_index == self.current_step_index:
+                self._apply_target_rect(target_rect)
 
-        # Get target rect (may be async for HTML elements)
+        diagnostics.increment("tutorial_target_lookups")
         get_step_target_rect(step, on_target_rect_ready)
 
-    def _retry_show_step(self):
-        """Retry showing current step (used by QTimer)."""
-        self._show_current_step(self.retry_count + 1)
+    def _apply_target_rect(self, target_rect):
+        """
+        Show or move the coach mark for a freshly resolved target.
+
+        Args:
+            target_rect: QRect in global coordinates, or None if not found
+        """
+        if not self.tutorial_active or self.is_paused:
+            return
+
+        if target_rect is None:
+            # Keep the last position; the next event looks again
+            if not self.step_displayed and not self.target_wait_timer.isActive():
+                self.target_wait_timer.start(TARGET_WAIT_MS)
+            return
+
+        self.target_wait_timer.stop()
+        if not self.step_displayed:
+            self._display_step(self.tutorial_steps[self.current_step_index], target_rect)
+            self.step_displayed = True
+        elif target_rect != self.target_rect:
+            self.coach_mark.position_at_target(target_rect)
+        self.target_rect = target_rect
+
+    def _on_target_wait_expired(self):
+        """Skip a step whose target never appeared."""
+        if not self.tutorial_active or self.is_paused or self.step_displayed:
+            return
+        step = self.tutorial_steps[self.current_step_index]
+        print(f"Could not find target for step {step.step_id}, skipping...")
+        self.advance_to_next_step()
 
     def _display_step(self, step, target_rect):
         """
@@ -352,6 +431,7 @@ class TutorialManager(QObject):
         Hides UI but maintains state for later resumption.
         """
         self.is_paused = True
+        self._stop_tracking()
         self._hide_all()
 
     def _resume_tutorial(self):
@@ -361,10 +441,10 @@ class TutorialManager(QObject):
 
     def _update_positions(self):
         """
-        Update positions of coach mark and overlay (e.g., after window resize).
+        Re-resolve the target after a geometry change and move the coach mark.
 
-        Re-queries the target location and repositions UI components.
-        This forces a fresh JavaScript query for HTML elements to get current coordinates.
+        Toolbar targets are re-mapped from the last rect the page pushed, so
+        moving or resizing the window doesn't query the page.
         """
         if not self.tutorial_active or self.is_paused:
             return
@@ -373,18 +453,56 @@ class TutorialManager(QObject):
             return
 
         step = self.tutorial_steps[self.current_step_index]
+        if step.target_type == "none":
+            return
 
-        def on_target_rect_ready(target_rect):
-            if target_rect:
-                # Just update coach mark position, no overlay
-                self.coach_mark.position_at_target(target_rect)
-            else:
-                # If target not found, try again after delay
-                from PyQt6.QtCore import QTimer
-                QTimer.singleShot(100, self._update_positions)
+        if self._is_toolbar_step():
+            self._apply_target_rect(toolbar_rect_to_global(self.toolbar_page_rect))
+        else:
+            self._resolve_target()
 
-        # This will re-run JavaScript queries for HTML targets
-        get_step_target_rect(step, on_target_rect_ready)
+    def _invalidate_target(self):
+        """Drop the cached target rect; it is resolved again after the debounce."""
+        if self.tutorial_active and not self.is_paused:
+            self.resize_timer.start(REPOSITION_DEBOUNCE_MS)
+
+    def _watch_geometry(self):
+        """
+        Filter geometry events of the widgets a target can sit in.
+
+        Called on every step show, since the panel dock and gear button may
+        not exist when the tutorial starts. Installing the filter twice on
+        the same object is a no-op.
+        """
+        from . import dock_widget
+
+        widgets = [
+            mw.toolbar.web if mw.toolbar else None,
+            mw.reviewer.web if mw.reviewer else None,
+            dock_widget,
+            get_gear_button_widget(),
+        ]
+        for widget in widgets:
+            if widget is not None:
+                widget.installEventFilter(self)
+
+    def _stop_tracking(self):
+        """Stop timers and page observers for the current step."""
+        self.resize_timer.stop()
+        self.target_wait_timer.stop()
+        self.toolbar_page_rect = None
+        unwatch_toolbar_icon_rect()
+
+    def _on_state_change(self, new_state, old_state):
+        """Anki switched screens (deck browser, overview, review)."""
+        if self.tutorial_active:
+            self._watch_geometry()
+            self._invalidate_target()
+
+    def _on_toolbar_loaded(self, ok):
+        """The toolbar page was redrawn; its observers are gone with the old page."""
+        if self.tutorial_active and not self.is_paused and self._is_toolbar_step():
+            watch_toolbar_icon_rect()
 
     def _hide_all(self):
         """Hide all tutorial UI components."""
@@ -395,16 +513,14 @@ class TutorialManager(QObject):
 
     def _save_progress(self):
         """Save current tutorial progress to Anki config."""
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        config["tutorial_step_index"] = self.current_step_index
-        mw.addonManager.writeConfig(ADDON_NAME, config)
+        get_config_store().update(tutorial_step_index=self.current_step_index)
 
     def _save_completion(self):
         """Mark tutorial as completed in Anki config."""
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        config["tutorial_completed"] = True
-        config["tutorial_step_index"] = len(self.tutorial_steps)
-        mw.addonManager.writeConfig(ADDON_NAME, config)
+        get_config_store().update(
+            tutorial_completed=True,
+            tutorial_step_index=len(self.tutorial_steps)
+        )
 
     def _complete_tutorial(self):
         """
@@ -416,21 +532,22 @@ class TutorialManager(QObject):
         analytics.track_tutorial_status("completed")
         
         self.tutorial_active = False
-        self.position_check_timer.stop()
+        self._stop_tracking()
         self._hide_all()
         self._save_completion()
         print("Tutorial completed!")
 
     def eventFilter(self, obj, event):
         """
-        Qt event filter to detect window resizes and moves.
+        Qt event filter to detect moves, resizes and visibility changes of
+        the main window and the widgets targets live in.
 
         Triggers position update after a short delay to avoid excessive updates.
         """
-        if self.tutorial_active:
-            if event.type() in [QEvent.Type.Resize, QEvent.Type.Move]:
-                # Debounce: wait 50ms after resize/move before updating
-                self.resize_timer.start(50)
+        if self.tutorial_active and not self.is_paused:
+            if event.type() in GEOMETRY_EVENTS:
+                # Debounce: wait after the last geometry event before updating
+                self.resize_timer.start(REPOSITION_DEBOUNCE_MS)
 
         return False  # Don't consume the event
 
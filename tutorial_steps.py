@@ -9,7 +9,6 @@ import sys
 from dataclasses import dataclass
 from typing import Optional, Callable, Any
 from PyQt6.QtCore import QRect, QPoint
-from aqt import mw
 
 from .tutorial_helpers import (
     get_toolbar_icon_rect_async,
@@ -17,7 +16,7 @@ from .tutorial_helpers import (
     get_gear_button_rect,
     get_chat_input_rect_async,
 )
-from .utils import ADDON_NAME
+from .config_store import get_config
 
 # Platform detection
 IS_MAC = sys.platform == "darwin"
@@ -59,11 +58,9 @@ def format_keys(keys: list) -> str:
 def get_quick_action_shortcut(action_name: str) -> str:
     """Get the formatted shortcut for a quick action (add_to_chat or ask_question)"""
     try:
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        quick_actions = config.get("quick_actions", {})
+        quick_actions = get_config().quick_actions
         if action_name in quick_actions:
-            keys = quick_actions[action_name].get("keys", [])
-            return format_keys(keys)
+            return format_keys(quick_actions[action_name])
     except:
         pass
     # Platform-appropriate defaults
@@ -83,12 +80,9 @@ def get_quick_action_shortcut(action_name: str) -> str:
 def get_template_shortcut(template_name: str) -> str:
     """Get the formatted shortcut for a template by name"""
     try:
-        config = mw.addonManager.getConfig(ADDON_NAME) or {}
-        keybindings = config.get("keybindings", [])
-        for kb in keybindings:
-            if kb.get("name") == template_name:
-                keys = kb.get("keys", [])
-                return format_keys(keys)
+        for kb in get_config().keybindings:
+            if kb.name == template_name:
+                return format_keys(kb.keys)
     except:
         pass
     # Platform-appropriate defaults
@@ -2,36 +2,116 @@
 Utility functions for AI Side Panel add-on.
 """
 
-import re
+import html
 import os
+import re
 
 # Addon name for config storage (dynamically detected from folder name)
 ADDON_NAME = os.path.basename(os.path.dirname(__file__))
 
 
+# Elements whose contents are never readable card text
+_SKIP_CONTENT_TAGS = frozenset({"style", "script", "noscript", "template"})
+
+# Elements that start a new line in the extracted text
+_BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "ol", "p", "pre", "section", "table",
+    "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+})
+
+
+# Comments and the contents of skipped elements (unclosed ones run to the end,
+# so a stray <style> can't make the pattern rescan the rest of the card)
+_SKIP_RE = re.compile(
+    r'<!--.*?(?:-->|\Z)|<(%s)\b[^>]*>.*?(?:</\1\s*>|\Z)' % '|'.join(sorted(_SKIP_CONTENT_TAGS)),
+    re.IGNORECASE | re.DOTALL
+)
+_SKIP_PROBE_RE = re.compile(
+    r'<(?:!--|%s)' % '|'.join(sorted(_SKIP_CONTENT_TAGS)), re.IGNORECASE
+)
+
+# Every tag is one split point; the captured name tells block tags from inline ones.
+# Tag bodies stop at the next "<" so an unterminated tag never scans past it,
+# and a "<" without a closing ">" (e.g. "a<b then c") stays as text
+_TAG_SPLIT_RE = re.compile(r'<[!?][^<>]*>|<(/?[a-zA-Z][^\s/<>]*)[^<>]*>')
+
+# Lower-cased tag name -> replacement text
+_TAG_REPLACEMENTS = {
+    prefix + tag: "\n"
+    for tag in _BLOCK_TAGS
+    for prefix in ("", "/")
+}
+
+# What must precede a "base64," payload for it to be cut: a data URI that
+# starts an attribute value or a CSS url(...)
+_DATA_URI_PREFIX_RE = re.compile(
+    r"""(?:=\s*["']?|url\(\s*["']?)data:[\w.+-]+/[\w.+-]+(?:;[\w.+-]+=[\w.+-]+)*;base64,\Z""",
+    re.IGNORECASE
+)
+# How far back from "base64," the data URI prefix is looked for
+_DATA_URI_PREFIX_MAX = 256
+
+
+def _drop_data_uris(html_text):
+    """Cut inline base64 payloads (often megabytes) using plain substring search."""
+    parts = []
+    pos = 0
+    search_from = 0
+    while True:
+        start = html_text.find("base64,", search_from)
+        if start < 0:
+            break
+        payload = start + len("base64,")
+        search_from = payload
+        window = max(pos, start - _DATA_URI_PREFIX_MAX)
+        if not _DATA_URI_PREFIX_RE.search(html_text, window, payload):
+            continue
+        # The payload ends at the closing quote/paren, always before the tag's ">"
+        end = html_text.find(">", payload)
+        if end < 0:
+            end = len(html_text)
+        for terminator in ('"', "'", ")"):
+            found = html_text.find(terminator, payload, end)
+            if found >= 0:
+                end = found
+        parts.append(html_text[pos:payload])
+        pos = search_from = end
+    if not parts:
+        return html_text
+    parts.append(html_text[pos:])
+    return "".join(parts)
+
+
 def clean_html_text(html_text):
-    """Clean HTML text by removing tags and normalizing"""
-    # Remove style tags and their contents first
-    text = re.sub(r'<style[^>]*>.*?</style>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
+    """
+    Convert card HTML to readable plain text (one line per block element).
 
-    # Remove script tags and their contents
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    Inline images are cut before tokenizing, style/script contents are
+    dropped, and every tag is removed in a single pre-compiled split.
+    Block elements (<br>, <div>, <li>, ...) become line breaks so the AI
+    gets readable structure; whitespace within each line is collapsed.
+    """
+    if not html_text:
+        return ""
 
-    # Strip remaining HTML tags
-    text = re.sub('<[^<]+?>', '', text)
+    if "base64," in html_text:
+        html_text = _drop_data_uris(html_text)
+    if _SKIP_PROBE_RE.search(html_text):
+        html_text = _SKIP_RE.sub("", html_text)
 
-    # Decode HTML entities
-    try:
-        import html
-        text = html.unescape(text)
-    except:
-        pass
+    # tokens alternate: text, tag name, text, tag name, ..., text
+    tokens = _TAG_SPLIT_RE.split(html_text)
+    replacement = _TAG_REPLACEMENTS.get
+    tokens[1::2] = [replacement(name.lower(), "") if name else "" for name in tokens[1::2]]
+    text = "".join(tokens)
 
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
+    if "&" in text:
+        text = html.unescape(text)
 
-    return text
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return "\n".join([line for line in lines if line])
 
 
 def format_keys_display(keys):
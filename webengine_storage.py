@@ -0,0 +1,198 @@
+"""
+WebEngine Storage - Location, quota and maintenance of the panel's profile data
+
+Cookies, local storage and the HTTP cache used to live in `webengine_data/`
+inside the add-on folder, with no size limit, and were copied along with every
+add-on update. They now live next to Anki's own data (mw.pm.base) and:
+- the HTTP cache is capped at `http_cache_max_mb` (Chromium evicts itself)
+- Chromium's other regenerable caches (service worker CacheStorage, code and
+  GPU caches) are trimmed by a maintenance pass when they exceed their budget
+- the maintenance pass runs at most every MAINTENANCE_INTERVAL_DAYS, before
+  the profile opens its files, so a normal cold start reads one small JSON file
+
+The last maintenance report is kept in maintenance.json and shown in the
+Diagnostics view, which also offers a clear-cache action.
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+from . import diagnostics
+
+STORAGE_DIR_NAME = "ai_side_panel_webengine"
+LEGACY_DIR_NAME = "webengine_data"
+MAINTENANCE_FILE = "maintenance.json"
+
+MAINTENANCE_INTERVAL_DAYS = 7
+
+# Regenerable Chromium caches (relative to the storage path) and the size
+# each may reach before the maintenance pass deletes it
+TRIMMABLE_CACHES_MB = {
+    os.path.join("Service Worker", "CacheStorage"): 100,
+    os.path.join("Service Worker", "ScriptCache"): 50,
+    "Code Cache": 50,
+    "GPUCache": 20,
+}
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_storage_path() -> str:
+    """Profile storage directory, outside the add-on folder when possible."""
+    try:
+        from aqt import mw
+        base = mw.pm.base
+    except Exception:
+        base = None
+    if not base:
+        return os.path.join(ADDON_DIR, LEGACY_DIR_NAME)
+    return os.path.join(base, STORAGE_DIR_NAME)
+
+
+def get_cache_path(storage_path: str) -> str:
+    return os.path.join(storage_path, "cache")
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files under path (0 if missing)."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def migrate_legacy_storage(storage_path: str) -> bool:
+    """
+    Move webengine_data/ out of the add-on folder (once, before the profile
+    opens it). The old HTTP cache is dropped rather than moved.
+
+    Returns:
+        True if data was migrated
+    """
+    legacy_path = os.path.join(ADDON_DIR, LEGACY_DIR_NAME)
+    if storage_path == legacy_path or not os.path.isdir(legacy_path) or os.path.exists(storage_path):
+        return False
+
+    try:
+        shutil.rmtree(get_cache_path(legacy_path), ignore_errors=True)
+        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+        shutil.move(legacy_path, storage_path)
+        print(f"OpenEvidence: Moved web storage to {storage_path}")
+        return True
+    except OSError as e:
+        print(f"OpenEvidence: Could not move web storage: {e}")
+        return False
+
+
+def _read_report(storage_path: str) -> Dict:
+    try:
+        with open(os.path.join(storage_path, MAINTENANCE_FILE), "r", encoding="utf-8") as f:
+            report = json.load(f)
+        return report if isinstance(report, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_report(storage_path: str, report: Dict):
+    try:
+        with open(os.path.join(storage_path, MAINTENANCE_FILE), "w", encoding="utf-8") as f:
+            json.dump(report, f)
+    except OSError as e:
+        print(f"OpenEvidence: Could not save storage report: {e}")
+
+
+def run_maintenance(storage_path: str, max_cache_mb: int, force: bool = False) -> Dict:
+    """
+    Measure the profile storage and trim oversized regenerable caches.
+
+    Must run before the profile is created (nothing may hold the files).
+    Skipped, returning the previous report, if the last pass was recent.
+    """
+    report = _read_report(storage_path)
+    if not force and time.time() - report.get("ran_at", 0) < MAINTENANCE_INTERVAL_DAYS * 86400:
+        return report
+
+    started = time.perf_counter()
+    trimmed = {}
+    for relative_path, budget_mb in TRIMMABLE_CACHES_MB.items():
+        path = os.path.join(storage_path, relative_path)
+        size = directory_size(path)
+        if size > budget_mb * 1024 * 1024:
+            shutil.rmtree(path, ignore_errors=True)
+            trimmed[relative_path] = size
+
+    # Chromium keeps the HTTP cache near its cap while running; a cache far
+    # over it (e.g. the cap was lowered) is dropped and rebuilt
+    cache_path = get_cache_path(storage_path)
+    cache_size = directory_size(cache_path)
+    if cache_size > 2 * max_cache_mb * 1024 * 1024:
+        shutil.rmtree(cache_path, ignore_errors=True)
+        trimmed["cache"] = cache_size
+        cache_size = 0
+
+    report = {
+        "ran_at": time.time(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "storage_bytes": directory_size(storage_path),
+        "cache_bytes": cache_size,
+        "trimmed_bytes": sum(trimmed.values()),
+        "trimmed": trimmed,
+    }
+    _write_report(storage_path, report)
+    diagnostics.record_timing("storage_maintenance_ms", report["duration_ms"])
+    return report
+
+
+def prepare_storage(max_cache_mb: int) -> str:
+    """
+    Resolve, migrate and maintain the storage directory for a new profile.
+
+    Returns:
+        Storage path to pass to setPersistentStoragePath
+    """
+    storage_path = get_storage_path()
+    migrate_legacy_storage(storage_path)
+    os.makedirs(storage_path, exist_ok=True)
+
+    try:
+        report = run_maintenance(storage_path, max_cache_mb)
+    except Exception as e:
+        print(f"OpenEvidence: Storage maintenance failed: {e}")
+        report = {}
+    _publish(report)
+    return storage_path
+
+
+def last_report() -> Dict:
+    """Most recent maintenance report for the current storage path."""
+    return _read_report(get_storage_path())
+
+
+def clear_http_cache(profile) -> Optional[int]:
+    """
+    Clear the profile's HTTP cache (safe while pages are open).
+
+    Returns:
+        Approximate bytes cleared, or None if the profile can't clear its cache
+    """
+    if profile is None or not hasattr(profile, "clearHttpCache"):
+        return None
+    cache_path = profile.cachePath()
+    before = directory_size(cache_path) if cache_path else 0
+    profile.clearHttpCache()
+    diagnostics.increment("http_cache_cleared")
+    return before
+
+
+def _publish(report: Dict):
+    """Mirror a report into diagnostics."""
+    for key in ("storage_bytes", "cache_bytes", "trimmed_bytes"):
+        if key in report:
+            diagnostics.set_value(f"webengine_{key[:-6]}_mb", round(report[key] / (1024 * 1024), 1))